@@ -0,0 +1,81 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark for cleaner.clean with a large custom schema.
+
+Cleans the ECS schemas plus a synthetic custom schema (10k fields by default, a third of
+them with a `pattern` and a matching example) and prints the per-rule timing counters.
+
+Usage (from the repository root):
+    python scripts/benchmarks/bench_cleaner.py [--fields 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from schema import cleaner
+from schema import loader
+
+PATTERNS = ['^[a-z0-9_-]+$', '^[0-9]{1,5}$', '^[A-F0-9]{64}$']
+EXAMPLES = ['acme_field', '8080', 'A' * 64]
+
+
+def custom_schema(nr_fields):
+    """Build a raw custom schema with nr_fields keyword fields in 100 groups."""
+    fields = []
+    for i in range(nr_fields):
+        field = {
+            'name': 'group_{}.field_{}'.format(i % 100, i),
+            'level': 'custom',
+            'type': 'keyword',
+            'description': 'Custom field {}.'.format(i),
+            'example': EXAMPLES[i % 3],
+        }
+        if i % 3 == 0:
+            field['pattern'] = PATTERNS[(i // 3) % 3]
+            field['example'] = EXAMPLES[(i // 3) % 3]
+        fields.append(field)
+    return {'acme': {'name': 'acme', 'title': 'Acme', 'description': 'Custom fields.', 'fields': fields}}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fields', type=int, default=10000, help='number of custom fields to clean')
+    args = parser.parse_args()
+
+    raw = loader.load_schema_files(loader.ecs_helpers.ecs_files())
+    raw.update(custom_schema(args.fields))
+    fields = loader.deep_nesting_representation(raw)
+
+    cleaner.enable_rule_stats()
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        cleaner.clean(fields)
+    elapsed = time.perf_counter() - start
+
+    print('Cleaned ECS and {} custom fields in {:.3f}s'.format(args.fields, elapsed))
+    print(cleaner.format_rule_stats())
+
+
+if __name__ == '__main__':
+    main()
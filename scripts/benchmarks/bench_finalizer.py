@@ -0,0 +1,108 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark for finalizer.finalize on the ECS schemas.
+
+Compares the previous reuse implementation, which deep copied the reused fields for every
+reuse location, with the current one (finalizer.reuse_copy), which shares everything that
+isn't modified per location, and with its compact mode (finalize(compact=True)), where reused
+field_details are CompactFieldDetails. Each implementation runs in its own process, so the
+reported peak RSS (ru_maxrss) isn't skewed by the other ones.
+
+Usage (from the repository root):
+    python scripts/benchmarks/bench_finalizer.py [--repeat 5]
+"""
+
+import argparse
+import copy
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from schema import cleaner
+from schema import finalizer
+from schema import loader
+from schema import visitor
+
+
+def legacy_reuse_copy(fields, original_fieldset, prefix=None, with_otel_reuse=None, dashed_prefix=None,
+                      compact=False):
+    """Reuse copy as it was before structural sharing: a deep copy, then stamp original_fieldset.
+
+    Names the copies under prefix, like finalizer.reuse_copy. compact is ignored.
+    """
+    reused_fields = copy.deepcopy(fields)
+
+    def func(details):
+        details['field_details'].setdefault('original_fieldset', original_fieldset)
+    visitor.visit_fields(reused_fields, field_func=func)
+    if prefix is not None:
+        finalizer.name_fields(reused_fields, prefix, dashed_prefix or finalizer.dashed(prefix), with_otel_reuse)
+    return reused_fields
+
+
+def run(mode, repeat):
+    """Finalize a freshly cleaned copy of ECS repeat times.
+
+    Return (best seconds, peak traced MiB allocated by one finalize, peak RSS of the process in MiB).
+    """
+    if mode == 'legacy':
+        finalizer.reuse_copy = legacy_reuse_copy
+    compact = mode == 'compact'
+    cleaned = loader.load_schemas()
+    cleaner.clean(cleaned)
+    best = None
+    for _ in range(repeat):
+        fields = copy.deepcopy(cleaned)
+        start = time.perf_counter()
+        finalizer.finalize(fields, compact=compact)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    fields = copy.deepcopy(cleaned)
+    tracemalloc.start()
+    finalizer.finalize(fields, compact=compact)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Linux reports ru_maxrss in KiB
+    return best, traced_peak / 1024 / 1024, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='number of finalize runs, the best one is reported')
+    parser.add_argument('--mode', choices=['legacy', 'current', 'compact'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print('{} {} {}'.format(*run(args.mode, args.repeat)))
+        return
+
+    print('Finalizing ECS (best of {})'.format(args.repeat))
+    for (label, mode) in [('deepcopy (before)', 'legacy'), ('structural sharing', 'current'),
+                          ('compact fields', 'compact')]:
+        output = subprocess.check_output([sys.executable, __file__, '--mode', mode, '--repeat', str(args.repeat)])
+        elapsed, traced, rss = (float(value) for value in output.split())
+        print('{:<20} {:>8.3f}s {:>8.1f} MiB allocated {:>8.1f} MiB peak RSS'.format(label, elapsed, traced, rss))
+
+
+if __name__ == '__main__':
+    main()
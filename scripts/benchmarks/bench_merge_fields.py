@@ -0,0 +1,145 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark for loader.merge_fields with a large --include custom tree.
+
+Merges a synthetic custom tree (20k fields by default, half of them going into existing
+ECS fieldsets) into the ECS schemas, with the previous deepcopy-per-level implementation
+and with the current copy-on-write one. Reports wall-clock time and peak traced memory.
+
+Usage (from the repository root):
+    python scripts/benchmarks/bench_merge_fields.py [--fields 20000]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from schema import loader
+
+
+def legacy_merge_fields(a, b):
+    """merge_fields as it was before copy-on-write: deep copies both inputs at every level."""
+    a = copy.deepcopy(a)
+    b = copy.deepcopy(b)
+    for key in b:
+        if key not in a:
+            a[key] = b[key]
+            continue
+        if 'normalize' in b[key]['field_details']:
+            a[key].setdefault('field_details', {})
+            a[key]['field_details'].setdefault('normalize', [])
+            a[key]['field_details']['normalize'].extend(b[key]['field_details'].pop('normalize'))
+        if 'multi_fields' in b[key]['field_details']:
+            a[key].setdefault('field_details', {})
+            a[key]['field_details'].setdefault('multi_fields', [])
+            a[key]['field_details']['multi_fields'] = loader.dedup_and_merge_lists(
+                a[key]['field_details']['multi_fields'], b[key]['field_details']['multi_fields'])
+            del b[key]['field_details']['multi_fields']
+        a[key]['field_details'].update(b[key]['field_details'])
+        if 'schema_details' in b[key]:
+            asd = a[key]['schema_details']
+            bsd = b[key]['schema_details']
+            if 'reusable' in b[key]['schema_details']:
+                asd.setdefault('reusable', {})
+                if 'top_level' in bsd['reusable']:
+                    asd['reusable']['top_level'] = bsd['reusable']['top_level']
+                else:
+                    asd['reusable'].setdefault('top_level', True)
+                if 'order' in bsd['reusable']:
+                    asd['reusable']['order'] = bsd['reusable']['order']
+                asd['reusable'].setdefault('expected', [])
+                asd['reusable']['expected'].extend(bsd['reusable']['expected'])
+                bsd.pop('reusable')
+            asd.update(bsd)
+        if 'fields' in b[key]:
+            a[key].setdefault('fields', {})
+            a[key]['fields'] = legacy_merge_fields(a[key]['fields'], b[key]['fields'])
+    return a
+
+
+def custom_schemas(ecs_raw, nr_fields):
+    """Build raw custom schemas: half the fields go into existing ECS fieldsets, half into new ones.
+
+    A quarter of all fields redefine an existing ECS field, adding normalize and multi_fields to it.
+    """
+    schemas = {}
+    fieldset_names = sorted(ecs_raw)
+    for i in range(nr_fields):
+        if i % 2 == 0:
+            fieldset_name = fieldset_names[i % len(fieldset_names)]
+        else:
+            fieldset_name = 'custom_{}'.format(i % 50)
+        ecs_fields = ecs_raw.get(fieldset_name, {}).get('fields', [])
+        if i % 4 == 0 and ecs_fields:
+            field_name = ecs_fields[(i // 4) % len(ecs_fields)]['name']
+        else:
+            field_name = 'acme.group_{}.field_{}'.format(i % 20, i)
+        schema = schemas.setdefault(fieldset_name, {
+            'name': fieldset_name,
+            'title': fieldset_name,
+            'description': 'Custom fields for {}.'.format(fieldset_name),
+            'fields': [],
+        })
+        schema['fields'].append({
+            'name': field_name,
+            'level': 'custom',
+            'type': 'keyword',
+            'description': 'Custom field {}.'.format(i),
+            'normalize': ['array'],
+            'multi_fields': [{'type': 'match_only_text', 'name': 'text'}],
+        })
+    return schemas
+
+
+def measure(func, *args):
+    """Return (seconds, peak traced bytes) of func(*args). Time is taken on a separate, untraced call."""
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fields', type=int, default=20000, help='number of custom fields to merge')
+    args = parser.parse_args()
+
+    ecs_raw = loader.load_schema_files(loader.ecs_helpers.ecs_files())
+    ecs = loader.deep_nesting_representation(ecs_raw)
+    custom = loader.deep_nesting_representation(custom_schemas(ecs_raw, args.fields))
+
+    if legacy_merge_fields(ecs, custom) != loader.merge_fields(ecs, custom):
+        raise AssertionError('copy-on-write merge_fields result differs from the deepcopy implementation')
+
+    print('Merging {} custom fields into ECS'.format(args.fields))
+    for (label, func) in [('deepcopy (before)', legacy_merge_fields), ('copy-on-write', loader.merge_fields)]:
+        elapsed, peak = measure(func, ecs, custom)
+        print('{:<20} {:>8.3f}s {:>10.2f} MiB peak'.format(label, elapsed, peak / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
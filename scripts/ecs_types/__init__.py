@@ -34,6 +34,8 @@ from .otel_types import (
     OTelMappingSummary,
 )
 
+from .compact_fields import CompactFieldDetails
+
 __all__ = [
     "AllowedValues",
     "Field",
@@ -48,4 +50,5 @@ __all__ = [
     "OTelGroup",
     "OTelModelFile",
     "OTelMappingSummary",
+    "CompactFieldDetails",
 ]
@@ -0,0 +1,147 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import copy
+from collections.abc import MutableMapping
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Optional,
+    Set,
+)
+
+from .schema_fields import Field
+
+# Attributes that differ between the locations of a reused field, stored in slots
+LOCATION_KEYS = ('original_fieldset', 'multi_fields', 'flat_name', 'dashed_name', 'otel')
+_LOCATION_KEYS = frozenset(LOCATION_KEYS)
+_UNSET = object()
+
+
+class CompactFieldDetails(MutableMapping):
+    """The field_details of a reused field, as a mapping over the field_details it was copied from.
+
+    A reused field only differs from its definition by a few attributes (LOCATION_KEYS), kept in
+    slots; all others are read from the shared base dict, which must not be modified once copies
+    of it are made. Other attributes set on the copy are kept in a small dict of its own.
+
+    Behaves like the dict it replaces, except for the order of keys that were removed and set again.
+    copy() and deepcopy() return plain dicts, as does unpickling.
+    """
+
+    __slots__ = ('base', 'extra', 'removed') + LOCATION_KEYS
+
+    def __init__(self, base: Field):
+        if isinstance(base, CompactFieldDetails):
+            # A copy of a copy shares the same base
+            self.base: Field = base.base
+            self.extra: Optional[Dict[str, Any]] = dict(base.extra) if base.extra else None
+            self.removed: Optional[Set[str]] = set(base.removed) if base.removed else None
+            for key in LOCATION_KEYS:
+                setattr(self, key, getattr(base, key))
+        else:
+            self.base = base
+            self.extra = None
+            self.removed = None
+            for key in LOCATION_KEYS:
+                setattr(self, key, _UNSET)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _LOCATION_KEYS:
+            value = getattr(self, key)
+            if value is not _UNSET:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        if self.removed and key in self.removed:
+            raise KeyError(key)
+        return self.base[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _LOCATION_KEYS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        if key in _LOCATION_KEYS:
+            setattr(self, key, _UNSET)
+        elif self.extra:
+            self.extra.pop(key, None)
+        if key in self.base:
+            if self.removed is None:
+                self.removed = set()
+            self.removed.add(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.base:
+            if key in self:
+                yield key
+        for key in LOCATION_KEYS:
+            if getattr(self, key) is not _UNSET and key not in self.base:
+                yield key
+        if self.extra:
+            for key in self.extra:
+                if key not in self.base:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _LOCATION_KEYS and getattr(self, key) is not _UNSET:
+            return True
+        if self.extra and key in self.extra:
+            return True
+        return key in self.base and not (self.removed and key in self.removed)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> Field:
+        return dict(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Field:
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def materialize(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the nested fields with all CompactFieldDetails as plain dicts, e.g. to dump them.
+
+    Nodes holding none are returned as is; everything else is shared with fields.
+    """
+    materialized: Dict[str, Any] = {}
+    changed: bool = False
+    for (name, details) in fields.items():
+        copied: Dict[str, Any] = details
+        if isinstance(details.get('field_details'), CompactFieldDetails):
+            copied = dict(details, field_details=dict(details['field_details']))
+        if 'fields' in details:
+            nested: Dict[str, Any] = materialize(details['fields'])
+            if nested is not details['fields']:
+                copied = dict(copied, fields=nested)
+        changed = changed or copied is not details
+        materialized[name] = copied
+    return materialized if changed else fields
@@ -27,39 +27,55 @@ Usage:
     python scripts/generator.py --semconv-version v1.24.0
     python scripts/generator.py --ref v8.10.0 --semconv-version v1.24.0
     python scripts/generator.py --subset subsets/minimal.yml --semconv-version v1.24.0
+    python scripts/generator.py --refs v8.11.0,v8.17.0,main --semconv-version v1.24.0
 
 See scripts/docs/schema-pipeline.md for complete documentation.
 """
 
 import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
+    Dict,
+    List,
     Optional,
+    Tuple,
 )
 
+from generators import artifacts
 from generators import markdown_fields
 from generators import beats
 from generators import csv_generator
 from generators import es_template
+from generators import field_table
 from generators import ecs_helpers
 from generators import intermediate_files
 from generators import otel
 
 from schema import loader
+from schema import parse_cache
 from schema import cleaner
+from schema import field_budget
 from schema import finalizer
+from schema import pipeline_context
 from schema import subset_filter
+from schema import validation_report
 from schema import exclude_filter
 from ecs_types import (
     FieldEntry
 )
 
+# Root of the per-ref output directories when --refs is used without --out
+REFS_OUT_DIR = 'build/refs'
+
 
 def main() -> None:
     """Main entry point for ECS artifact generation.
 
     Runs the complete pipeline: load schemas → clean → finalize (reuse) → filter →
     validate OTel → generate intermediate files → generate all artifacts.
+    With --refs, runs it once per git ref, sharing the OTel model and parse caches.
 
     Raises:
         KeyError: If --semconv-version not provided
@@ -69,51 +85,194 @@ def main() -> None:
     if not args.semconv_version:
         raise KeyError("OTel Semantic Conventions version has not been provided as a config option '--semconv-version'")
 
-    ecs_generated_version: str = read_version(args.ref)
+    if not args.no_cache:
+        parse_cache.enable()
+
+    otel_generator = otel.OTelGenerator(args.semconv_version)
+
+    try:
+        if args.refs:
+            reports = generate_refs(args, otel_generator)
+        else:
+            reports = [generate(args, args.ref, args.out, otel_generator)]
+    except artifacts.ArtifactsOutOfDate as e:
+        print(e)
+        sys.exit(1)
+
+    if args.report:
+        report = validation_report.combine(reports)
+        report.write(args.report)
+        print(report.summary() + ', written to ' + args.report)
+        if report.errors:
+            sys.exit(1)
+
+
+def generate(
+    args: argparse.Namespace,
+    ref: Optional[str],
+    out: Optional[str],
+    otel_generator: otel.OTelGenerator
+) -> Optional[validation_report.ValidationReport]:
+    """Generate all artifacts for one version of the schemas (a git ref, or the local files if ref is None).
+
+    With --report, validation problems are collected instead of raised, and returned as a report.
+    Artifacts are only generated if the report has no errors.
+
+    Each build runs in a pipeline context of its own (see schema/pipeline_context.py), so builds
+    can also run concurrently in threads of one process, e.g. sharing one OTel generator.
+
+    Artifacts are only written when their content changed, and listed in generated/MANIFEST.json
+    (see generators/artifacts.py). With --check, nothing is written: ArtifactsOutOfDate is raised
+    if anything would change.
+    """
+    with pipeline_context.PipelineContext(strict=bool(args.strict)).activate() as context:
+        out_dir: str = output_dirs(out)[0]
+        context.artifacts = artifacts.ArtifactWriter(out or '.', os.path.join(out_dir, artifacts.MANIFEST_FILE),
+                                                     check=bool(args.check))
+        report: Optional[validation_report.ValidationReport] = generate_artifacts(args, ref, out, otel_generator)
+        if report is None or not report.errors:
+            context.artifacts.finish()
+            print(context.artifacts.summary())
+        return report
+
+
+def generate_artifacts(
+    args: argparse.Namespace,
+    ref: Optional[str],
+    out: Optional[str],
+    otel_generator: otel.OTelGenerator
+) -> Optional[validation_report.ValidationReport]:
+    """Body of generate(), in the pipeline context of the build."""
+    ecs_generated_version: str = read_version(ref)
     print('Running generator. ECS version ' + ecs_generated_version)
 
-    # default location to save files
-    out_dir = 'generated'
-    docs_dir = 'docs/reference'
-    if args.out:
-        default_dirs = False
-        out_dir = os.path.join(args.out, out_dir)
-        docs_dir = os.path.join(args.out, docs_dir)
-    else:
-        default_dirs = True
+    out_dir, docs_dir = output_dirs(out)
+    default_dirs: bool = not out
 
     ecs_helpers.make_dirs(out_dir)
 
+    report: Optional[validation_report.ValidationReport] = None
+    if args.report:
+        report = validation_report.enable(ref)
+        try:
+            fields, docs_only_fields = build_fields(args, ref, out_dir, otel_generator)
+        except (KeyError, ValueError) as e:
+            # Problems the stages can't step over end the sweep; the report keeps what was found so far
+            report.error('generator', 'Generation stopped: {}'.format(e))
+        finally:
+            validation_report.disable()
+        if report.errors:
+            return report
+    else:
+        fields, docs_only_fields = build_fields(args, ref, out_dir, otel_generator)
+
+    nested, flat = intermediate_files.generate(fields, os.path.join(out_dir, 'ecs'), default_dirs)
+
+    if args.intermediate_only:
+        return report
+
+    table = field_table.FieldTable(nested)
+    csv_generator.generate(flat, ecs_generated_version, out_dir, table)
+    es_template.generate(nested, ecs_generated_version, out_dir, args.mapping_settings, args.template_settings, table)
+    es_template.generate_legacy(flat, ecs_generated_version, out_dir,
+                                args.mapping_settings, args.template_settings_legacy, table)
+    beats.generate(nested, ecs_generated_version, out_dir, table)
+    if (args.include or args.subset or args.exclude) and not args.force_docs:
+        return report
+
+    ecs_helpers.make_dirs(docs_dir)
+    docs_only_nested = intermediate_files.generate_nested_fields(docs_only_fields)
+    markdown_fields.generate(nested, docs_only_nested, ecs_generated_version,
+                             args.semconv_version, otel_generator, docs_dir, table)
+    return report
+
+
+def output_dirs(out: Optional[str]) -> Tuple[str, str]:
+    """Return the directories of the generated artifacts and of the docs, under out or in the default locations."""
+    out_dir: str = 'generated'
+    docs_dir: str = 'docs/reference'
+    if out:
+        out_dir = os.path.join(out, out_dir)
+        docs_dir = os.path.join(out, docs_dir)
+    return out_dir, docs_dir
+
+
+def build_fields(
+    args: argparse.Namespace,
+    ref: Optional[str],
+    out_dir: str,
+    otel_generator: otel.OTelGenerator
+) -> Tuple[Dict[str, FieldEntry], Dict[str, FieldEntry]]:
+    """Load, clean, finalize, filter and validate the fields. Return (fields, docs_only_fields)."""
     # To debug issues in the gradual building up of the nested structure, insert
     # statements like this after any step of interest.
     # ecs_helpers.yaml_dump('ecs.yml', fields)
 
-    fields: dict[str, FieldEntry] = loader.load_schemas(ref=args.ref, included_files=args.include)
-    cleaner.clean(fields, strict=args.strict)
-    finalizer.finalize(fields)
+    fields: Dict[str, FieldEntry] = loader.load_schemas(ref=ref, included_files=args.include, jobs=args.jobs)
+    lazy_subset: bool = bool(args.lazy_subset and args.subset)
+    if lazy_subset:
+        fields = subset_filter.prune_unused_fieldsets(fields, args.subset)
+    cleaner.clean(fields, strict=args.strict, jobs=args.jobs)
+    if args.max_fields is not None:
+        counts: field_budget.FieldCounts = field_budget.check(fields, args.max_fields, partial=lazy_subset)
+        print('Reuse will produce {} fields (budget: {})'.format(counts.total, args.max_fields))
+    if args.reuse_profile:
+        finalizer.enable_reuse_stats()
+        finalizer.finalize(fields, partial=lazy_subset, compact=args.compact_fields)
+        write_reuse_profile(args.reuse_profile if not args.refs else ref_file_name(args.reuse_profile, ref))
+        finalizer.disable_reuse_stats()
+    else:
+        finalizer.finalize(fields, partial=lazy_subset, compact=args.compact_fields)
     fields, docs_only_fields = subset_filter.filter(fields, args.subset, out_dir)
     fields = exclude_filter.exclude(fields, args.exclude)
 
-    otel_generator = otel.OTelGenerator(args.semconv_version)
     otel_generator.validate_otel_mapping(fields)
+    return fields, docs_only_fields
 
-    nested, flat = intermediate_files.generate(fields, os.path.join(out_dir, 'ecs'), default_dirs)
 
-    if args.intermediate_only:
-        exit()
+def write_reuse_profile(path: str) -> None:
+    """Print the most expensive reuses, and write the whole reuse profile to path as JSON."""
+    print(finalizer.format_reuse_stats(limit=20))
+    finalizer.write_reuse_stats(path)
+    print('Reuse profile written to ' + path)
 
-    csv_generator.generate(flat, ecs_generated_version, out_dir)
-    es_template.generate(nested, ecs_generated_version, out_dir, args.mapping_settings, args.template_settings)
-    es_template.generate_legacy(flat, ecs_generated_version, out_dir,
-                                args.mapping_settings, args.template_settings_legacy)
-    beats.generate(nested, ecs_generated_version, out_dir)
-    if (args.include or args.subset or args.exclude) and not args.force_docs:
-        exit()
 
-    ecs_helpers.make_dirs(docs_dir)
-    docs_only_nested = intermediate_files.generate_nested_fields(docs_only_fields)
-    markdown_fields.generate(nested, docs_only_nested, ecs_generated_version,
-                             args.semconv_version, otel_generator, docs_dir)
+def generate_refs(
+    args: argparse.Namespace,
+    otel_generator: otel.OTelGenerator
+) -> List[Optional[validation_report.ValidationReport]]:
+    """Generate the artifacts of each of args.refs into its own directory, <out>/<ref>/.
+
+    Refs are built one after the other, or by up to --ref-jobs worker processes.
+    The OTel model is loaded once and handed to every build. Returns the reports of the refs, in order.
+    """
+    out_root: str = args.out or REFS_OUT_DIR
+    out_dirs: List[str] = [os.path.join(out_root, ref_dir_name(ref)) for ref in args.refs]
+    if not args.ref_jobs or args.ref_jobs <= 1 or len(args.refs) == 1:
+        return [generate(args, ref, out, otel_generator) for (ref, out) in zip(args.refs, out_dirs)]
+    with ProcessPoolExecutor(max_workers=args.ref_jobs, initializer=init_ref_worker,
+                             initargs=(parse_cache.active,)) as pool:
+        futures = [pool.submit(generate, args, ref, out, otel_generator) for (ref, out) in zip(args.refs, out_dirs)]
+        # Surface the first failure, in ref order
+        return [future.result() for future in futures]
+
+
+def init_ref_worker(cache: Optional[parse_cache.ParseCache]) -> None:
+    """Set up a --ref-jobs worker process, with the parse cache of its parent (None without one)."""
+    # A forked worker must not talk to the git processes of its parent's repositories
+    ecs_helpers.forget_git_repos()
+    parse_cache.use(cache)
+
+
+def ref_dir_name(ref: str) -> str:
+    """Directory name for the artifacts of ref (e.g. 'origin/main' -> 'origin_main')."""
+    return ref.replace('/', '_')
+
+
+def ref_file_name(path: str, ref: str) -> str:
+    """File name for the output of ref with --refs (e.g. 'profile.json' -> 'profile-origin_main.json')."""
+    (root, extension) = os.path.splitext(path)
+    return root + '-' + ref_dir_name(ref) + extension
 
 
 def argument_parser() -> argparse.Namespace:
@@ -121,6 +280,10 @@ def argument_parser() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument('--ref', action='store',
                         help='Loads fields definitions from `./schemas` subdirectory from specified git reference.')
+    parser.add_argument('--refs', action='store', type=lambda refs: [ref for ref in refs.split(',') if ref],
+                        help='comma-separated git references to generate, each into its own directory under --out')
+    parser.add_argument('--ref-jobs', action='store', type=int, default=None,
+                        help='with --refs, number of worker processes building refs in parallel (default: serial)')
     parser.add_argument('--include', nargs='+',
                         help='include user specified directory of custom field definitions')
     parser.add_argument('--exclude', nargs='+',
@@ -142,7 +305,31 @@ def argument_parser() -> argparse.Namespace:
                         help='generate ECS docs even if --subset, --include, or --exclude are set')
     parser.add_argument('--semconv-version', action='store',
                         help='Load OpenTelemetry Semantic Conventions from this specified version')
+    parser.add_argument('--jobs', action='store', type=int, default=None,
+                        help='number of worker processes used to parse schema files and clean field sets ' +
+                        '(default: serial)')
+    parser.add_argument('--lazy-subset', action='store_true',
+                        help='with --subset, only clean and finalize the field sets needed by the subsets')
+    parser.add_argument('--report', action='store',
+                        help='collect all validation errors and warnings into this file (JSON if it ends with .json, ' +
+                        'text otherwise) instead of stopping at the first one; exits non-zero if there are errors')
+    parser.add_argument('--reuse-profile', action='store',
+                        help='write the fields, bytes and time of each field reuse to this JSON file, ' +
+                        'and print the most expensive ones')
+    parser.add_argument('--max-fields', action='store', type=int, default=None,
+                        help='fail before field reuse if it would produce more than this many fields ' +
+                        '(compare with index.mapping.total_fields.limit)')
+    parser.add_argument('--compact-fields', action='store_true',
+                        help='keep reused fields as compact views of their definitions instead of copies, ' +
+                        'to lower memory use on large schemas')
+    parser.add_argument('--check', action='store_true',
+                        help='verify that the generated artifacts and generated/MANIFEST.json are up to date ' +
+                        'without writing any of them; exits non-zero listing what would change')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='parse all YAML files again instead of reusing parse results cached in build/parse-cache')
     args = parser.parse_args()
+    if args.ref and args.refs:
+        parser.error('--ref and --refs are mutually exclusive')
     # Clean up empty include of the Makefile
     if args.include and [''] == args.include:
         args.include.clear()
@@ -0,0 +1,251 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Artifact Writer Module.
+
+All generators save their artifacts through write(): the content is rendered to memory
+first, and the file is only replaced (atomically, through a temporary file and a rename)
+when its content changed. Unchanged artifacts keep their modification time, so make,
+rsync and the like don't redo work for them.
+
+During a build, generator.py puts an ArtifactWriter in the pipeline context of the build.
+It maintains generated/MANIFEST.json, the SHA-256 of each artifact written by the generator:
+
+    {
+      "files": {
+        "generated/csv/fields.csv": "3f1c...",
+        ...
+      },
+      "version": 1
+    }
+
+Paths are relative to the output root (the repository, or --out). Debugging output and
+the sidecars of the intermediate files are left out (tracked=False).
+
+In check mode (generator.py --check), nothing is written: finish() raises ArtifactsOutOfDate
+listing the artifacts a run would change, the artifacts modified or removed since they were
+generated, and the manifest entries that no longer match.
+
+Outside of a build, write() still only replaces files whose content changed.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from schema import pipeline_context
+
+MANIFEST_FILE = 'MANIFEST.json'
+# Bump when the layout of the manifest changes
+MANIFEST_VERSION = 1
+
+# New files get the permissions open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class ArtifactsOutOfDate(Exception):
+    """Raised by ArtifactWriter.finish() in check mode when artifacts or the manifest would change."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__(problems)
+        self.problems: List[str] = problems
+
+    def __str__(self) -> str:
+        return '{} generated artifact(s) out of date:\n  {}'.format(len(self.problems), '\n  '.join(self.problems))
+
+
+class ArtifactWriter:
+    """Writes the artifacts of one build, and keeps their manifest (see the module docstring)."""
+
+    def __init__(self, root: str, manifest_path: str, check: bool = False):
+        self.root: str = root
+        self.manifest_path: str = manifest_path
+        self.check: bool = check
+        self.manifest: Dict[str, str] = load_manifest(manifest_path)
+        # SHA-256 of the tracked artifacts rendered by this build, by manifest path
+        self.rendered: Dict[str, str] = {}
+        # Manifest paths of the artifacts this build wrote with tracked=False
+        self.untracked: Set[str] = set()
+        # Number of artifacts written (in check mode: that would be written), and left as they were
+        self.written: int = 0
+        self.unchanged: int = 0
+        self.problems: List[str] = []
+
+    def manifest_key(self, path: str) -> str:
+        """Return the manifest path of the artifact at path: relative to the root, with forward slashes."""
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def write(self, path: str, content: Union[str, bytes], tracked: bool = True) -> bool:
+        """Save content (text is encoded as UTF-8) to path unless it already holds it. Return True if it didn't."""
+        data: bytes = content.encode('utf-8') if isinstance(content, str) else content
+        key: str = self.manifest_key(path)
+        digest: Optional[str] = None
+        if tracked:
+            digest = sha256(data)
+            self.rendered[key] = digest
+        else:
+            self.untracked.add(key)
+        if self.check:
+            if not tracked:
+                return False
+            changed: bool = not file_holds(path, data)
+            if changed:
+                self.problems.append('{}: {}'.format(key, 'out of date' if os.path.exists(path) else 'missing'))
+            elif self.manifest.get(key) != digest:
+                self.problems.append('{}: out of date in the manifest'.format(key))
+        else:
+            # A file whose stored hash differs can't hold the content: skip reading it
+            changed = not ((digest is None or self.manifest.get(key) == digest) and file_holds(path, data))
+            if changed:
+                replace_file(path, data)
+        if changed:
+            self.written += 1
+        else:
+            self.unchanged += 1
+        return changed
+
+    def finish(self) -> None:
+        """Save the manifest, or in check mode raise ArtifactsOutOfDate if anything would change.
+
+        Artifacts the build didn't render (e.g. with --intermediate-only) keep their entries
+        while their files are unchanged. Entries of artifacts it wrote with tracked=False are dropped.
+        """
+        manifest: Dict[str, str] = dict(self.rendered)
+        for (key, digest) in self.manifest.items():
+            if key in self.rendered:
+                continue
+            if key in self.untracked:
+                if self.check:
+                    self.problems.append('{}: listed in the manifest, but not tracked'.format(key))
+                continue
+            path: str = os.path.join(self.root, key)
+            if not os.path.exists(path):
+                # Dropped from the manifest
+                self.problems.append('{}: listed in the manifest, but missing'.format(key))
+                continue
+            if self.check and file_sha256(path) != digest:
+                self.problems.append('{}: modified since it was generated'.format(key))
+            manifest[key] = digest
+        if self.check:
+            if self.problems:
+                raise ArtifactsOutOfDate(self.problems)
+            return
+        replace_file_if_changed(self.manifest_path, render_manifest(manifest))
+        self.manifest = manifest
+
+    def summary(self) -> str:
+        """Return a one-line summary of what the build wrote."""
+        if self.check:
+            return 'Checked {} artifacts against {}'.format(self.written + self.unchanged, self.manifest_path)
+        return 'Artifacts: {} written, {} unchanged'.format(self.written, self.unchanged)
+
+
+def write(path: str, content: Union[str, bytes], tracked: bool = True) -> bool:
+    """Save content to path through the artifact writer of the current build, if any. Return True if it changed.
+
+    tracked=False leaves the file out of the manifest and of checks, e.g. for debugging output.
+    """
+    writer: Optional[ArtifactWriter] = pipeline_context.current().artifacts
+    if writer is not None:
+        return writer.write(path, content, tracked)
+    data: bytes = content.encode('utf-8') if isinstance(content, str) else content
+    return replace_file_if_changed(path, data)
+
+
+def checking() -> bool:
+    """Return True if the current build only checks its artifacts (nothing must be written)."""
+    writer: Optional[ArtifactWriter] = pipeline_context.current().artifacts
+    return writer is not None and writer.check
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    """Return {path: sha256} of the manifest at path, or {} if it's missing or unreadable."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return dict(manifest.get('files', {}))
+
+
+def render_manifest(files: Dict[str, str]) -> bytes:
+    """Return the content of the manifest listing files ({path: sha256})."""
+    manifest = {'files': files, 'version': MANIFEST_VERSION}
+    return (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode('utf-8')
+
+
+# File helpers
+
+
+def sha256(data: bytes) -> str:
+    """Return the hex SHA-256 of data."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 of the contents of path."""
+    with open(path, 'rb') as f:
+        return sha256(f.read())
+
+
+def file_holds(path: str, data: bytes) -> bool:
+    """Return True if the file at path exists and its content is data."""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def replace_file_if_changed(path: str, data: bytes) -> bool:
+    """Atomically replace the file at path with data, unless it already holds it. Return True if it didn't."""
+    if file_holds(path, data):
+        return False
+    replace_file(path, data)
+    return True
+
+
+def replace_file(path: str, data: bytes) -> None:
+    """Atomically replace (or create) the file at path with data, creating parent directories as needed.
+
+    Readers see either the old or the new content, never a partially written file.
+    """
+    directory: str = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
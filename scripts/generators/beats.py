@@ -28,10 +28,12 @@ from collections import OrderedDict
 from typing import (
     Dict,
     List,
+    Optional,
     OrderedDict,
 )
 
 from generators import ecs_helpers
+from generators import field_table
 from ecs_types import (
     Field,
     FieldNestedEntry,
@@ -41,32 +43,36 @@ from ecs_types import (
 def generate(
     ecs_nested: Dict[str, FieldNestedEntry],
     ecs_version: str,
-    out_dir: str
+    out_dir: str,
+    table: Optional[field_table.FieldTable] = None
 ) -> None:
-    """Generate Beats field definitions from ECS nested schemas.
+    """Generate Beats field definitions from ECS nested schemas (their fields are looked up in table, if given).
 
     Process: filter non-root reusables → process base fieldset → process other
     fieldsets (root=true fields added directly, others wrapped in groups) → apply
     default_field allowlist → write YAML.
     """
+    if table is None:
+        table = field_table.FieldTable(ecs_nested)
     # base first
-    ecs_nested = ecs_helpers.remove_top_level_reusable_false(ecs_nested)
-    beats_fields: List[OrderedDict] = fieldset_field_array(ecs_nested['base']['fields'], ecs_nested['base']['prefix'])
+    beats_fields: List[OrderedDict] = fieldset_field_array(
+        table.fields(table.by_fieldset['base']), ecs_nested['base']['prefix'])
 
     allowed_fieldset_keys: List[str] = ['name', 'title', 'group', 'description', 'footnote', 'type']
     # other fieldsets
-    for fieldset_name in sorted(ecs_nested):
+    for fieldset_name in sorted(table.top_level_fieldsets):
         if 'base' == fieldset_name:
             continue
         fieldset: FieldNestedEntry = ecs_nested[fieldset_name]
+        fields: Dict[str, Field] = table.fields(table.by_fieldset[fieldset_name])
 
         # Handle when `root:true`
         if fieldset.get('root', False):
-            beats_fields.extend(fieldset_field_array(fieldset['fields'], fieldset['prefix']))
+            beats_fields.extend(fieldset_field_array(fields, fieldset['prefix']))
             continue
 
         beats_field = ecs_helpers.dict_copy_keys_ordered(fieldset, allowed_fieldset_keys)
-        beats_field['fields'] = fieldset_field_array(fieldset['fields'], fieldset['prefix'])
+        beats_field['fields'] = fieldset_field_array(fields, fieldset['prefix'])
         beats_fields.append(beats_field)
 
     # Load temporary allowlist for default_fields workaround.
@@ -24,24 +24,37 @@ Base fields (no dots in name) are sorted first; all others alphabetically.
 
 import _csv
 import csv
-import sys
+import io
 from typing import (
     Dict,
     List,
+    Optional,
 )
 
 from os.path import join
 from generator import ecs_helpers
+from generators import artifacts
+from generators import field_table
 from ecs_types import (
     Field,
 )
 
 
-def generate(ecs_flat: Dict[str, Field], version: str, out_dir: str) -> None:
-    """Generate generated/csv/fields.csv from the flat field dictionary."""
+def generate(
+    ecs_flat: Dict[str, Field],
+    version: str,
+    out_dir: str,
+    table: Optional[field_table.FieldTable] = None
+) -> None:
+    """Generate generated/csv/fields.csv from the flat field dictionary, through its rows in table if given.
+
+    Raises ValueError if table doesn't hold the fields of ecs_flat.
+    """
     ecs_helpers.make_dirs(join(out_dir, 'csv'))
-    sorted_fields = base_first(ecs_flat)
-    save_csv(join(out_dir, 'csv/fields.csv'), sorted_fields, version)
+    if table is None:
+        table = field_table.FieldTable.from_flat(ecs_flat)
+    rows: List[int] = base_first_rows(table, table.top_level_rows_of(ecs_flat))
+    save_csv(join(out_dir, 'csv/fields.csv'), [table.field[row] for row in rows], version)
 
 
 def base_first(ecs_flat: Dict[str, Field]) -> List[Field]:
@@ -56,17 +69,20 @@ def base_first(ecs_flat: Dict[str, Field]) -> List[Field]:
     return base_list + sorted_list
 
 
+def base_first_rows(table: field_table.FieldTable, rows: List[int]) -> List[int]:
+    """Sort rows of table like base_first(): base fields (no dots) first, then all others alphabetically."""
+    sorted_rows: List[int] = table.sorted_by_name(rows)
+    return ([row for row in sorted_rows if '.' not in table.flat_name[row]] +
+            [row for row in sorted_rows if '.' in table.flat_name[row]])
+
+
 def save_csv(file: str, sorted_fields: List[Field], version: str) -> None:
     """Write sorted fields to CSV. Multi-fields get their own rows with empty normalization.
 
     Field_Set is 'base' for fields with no dots, otherwise the first path segment.
     Indexed is 'true'/'false' (lowercase). Normalization is comma-separated or empty.
     """
-    open_mode: str = "wb"
-    if sys.version_info >= (3, 0):
-        open_mode: str = "w"
-
-    with open(file, open_mode) as csvfile:
+    with io.StringIO() as csvfile:
         schema_writer: _csv._writer = csv.writer(csvfile,
                                                  delimiter=',',
                                                  quoting=csv.QUOTE_MINIMAL,
@@ -107,3 +123,5 @@ def save_csv(file: str, sorted_fields: List[Field], version: str) -> None:
                         field.get('example', ''),
                         field['short'],
                     ])
+
+        artifacts.write(file, csvfile.getvalue())
@@ -26,6 +26,8 @@ import os
 import yaml
 import git
 import pathlib
+import re
+import threading
 from typing import (
     Any,
     Dict,
@@ -33,17 +35,24 @@ from typing import (
     Optional,
     OrderedDict,
     Set,
+    Tuple,
     Union,
 )
 import warnings
 
 from collections import OrderedDict
 from copy import deepcopy
+from yaml.emitter import Emitter
 from ecs_types import (
     Field,
     FieldEntry,
     FieldNestedEntry,
 )
+from generators import artifacts
+
+# libyaml bindings are optional: fall back to the pure-Python classes when PyYAML was built without them
+HAS_LIBYAML: bool = getattr(yaml, '__with_libyaml__', False)
+YamlSafeLoader = yaml.CSafeLoader if HAS_LIBYAML else yaml.SafeLoader
 
 # Dictionary helpers
 
@@ -151,6 +160,41 @@ def yaml_ordereddict(dumper, data):
 
 # Register the representer globally
 yaml.add_representer(OrderedDict, yaml_ordereddict)
+if HAS_LIBYAML:
+    yaml.add_representer(OrderedDict, yaml_ordereddict, Dumper=yaml.CSafeDumper)
+
+
+# Read-only mapping types dumped like dicts (see register_unshared_mapping)
+_unshared_mapping_types: Tuple[type, ...] = ()
+
+
+def yaml_unshared_mapping(dumper, data):
+    """YAML representer for registered mapping views: like a dict, without anchors/aliases for what they hold."""
+    if 'ignore_aliases' in vars(dumper):
+        # Already within a registered mapping
+        return dumper.represent_dict(data)
+    dumper.ignore_aliases = _ignore_all_aliases
+    try:
+        return dumper.represent_dict(data)
+    finally:
+        del dumper.ignore_aliases
+
+
+def _ignore_all_aliases(data: Any) -> bool:
+    return True
+
+
+def register_unshared_mapping(mapping_type: type) -> None:
+    """Dump instances of mapping_type like dicts, each as if it were a deep copy of its own.
+
+    Values shared with other instances (or anything else) are written out again instead of as
+    anchors and aliases, as they would be if each instance were a copy.
+    """
+    global _unshared_mapping_types
+    _unshared_mapping_types += (mapping_type,)
+    yaml.add_representer(mapping_type, yaml_unshared_mapping)
+    if HAS_LIBYAML:
+        yaml.add_representer(mapping_type, yaml_unshared_mapping, Dumper=yaml.CSafeDumper)
 
 
 def dict_clean_string_values(dict: Dict[Any, Any]) -> None:
@@ -192,10 +236,31 @@ def glob_yaml_files(paths: List[str]) -> List[str]:
     return sorted(all_files)
 
 
+# Open repositories by path, in each thread (attribute repos). Reusing the Repo object means all
+# object reads of a run go through its single persistent `git cat-file --batch` process, which
+# can't be shared by concurrent builds: each thread opens its own.
+_git_repos: threading.local = threading.local()
+
+
+def get_repo() -> git.repo.base.Repo:
+    """Return the git repository of the current directory, opened once per thread."""
+    path: str = os.getcwd()
+    repos: Optional[Dict[str, git.repo.base.Repo]] = getattr(_git_repos, 'repos', None)
+    if repos is None:
+        repos = _git_repos.repos = {}
+    if path not in repos:
+        repos[path] = git.Repo(path)
+    return repos[path]
+
+
+def forget_git_repos() -> None:
+    """Drop the repositories opened by this thread, e.g. in a forked process (they share the git processes)."""
+    _git_repos.repos = {}
+
+
 def get_tree_by_ref(ref: str) -> git.objects.tree.Tree:
     """Get git tree object for a specific branch, tag, or commit SHA."""
-    repo: git.repo.base.Repo = git.Repo(os.getcwd())
-    commit: git.objects.commit.Commit = repo.commit(ref)
+    commit: git.objects.commit.Commit = get_repo().commit(ref)
     return commit.tree
 
 
@@ -239,19 +304,219 @@ def make_dirs(path: str) -> None:
 def yaml_dump(
     filename: str,
     data: Dict[str, FieldNestedEntry],
-    preamble: Optional[str] = None
+    preamble: Optional[str] = None,
+    tracked: bool = True,
+    unshared: bool = False
 ) -> None:
-    """Write data to a YAML file, optionally prepending preamble text."""
-    with open(filename, 'w') as outfile:
-        if preamble:
-            outfile.write(preamble)
-        yaml.dump(data, outfile, default_flow_style=False, allow_unicode=True)
+    """Write data to a YAML file, optionally prepending preamble text, unless it already holds it.
+
+    tracked=False leaves the file out of the artifact manifest (see generators/artifacts.py).
+    unshared is passed on to yaml_dumps.
+    """
+    artifacts.write(filename, (preamble or '') + yaml_dumps(data, unshared), tracked)
 
 
 def yaml_load(filename: str) -> Set[str]:
     """Load and parse a YAML file using safe_load."""
     with open(filename) as f:
-        return yaml.safe_load(f.read())
+        return yaml_safe_load(f.read())
+
+
+# YAML I/O helpers
+
+
+def yaml_safe_load(content: str) -> Any:
+    """Parse a YAML string with the libyaml safe loader when available."""
+    return yaml.load(content, Loader=YamlSafeLoader)
+
+
+def yaml_dumps(data: Any, unshared: bool = False) -> str:
+    """Render data as block-style YAML, byte-identical to yaml.dump(data, default_flow_style=False, allow_unicode=True).
+
+    With unshared=True, values referenced more than once are written out again instead of as
+    anchors and aliases, as yaml.dump would write a deep copy of data without any sharing.
+
+    The libyaml emitter wraps double-quoted scalars differently from the pure-Python one,
+    escapes some characters the latter writes as is (beyond the BMP, NEL, ...), may write
+    other keys as explicit '? key' entries, and numbers anchors per document. Mappings are
+    therefore split into runs of entries: entries holding such text or keys (see
+    _libyaml_emittable), shared (anchored) nodes or non-plain types go through the pure-Python
+    dumper, all others through libyaml. Each run is rendered nested under its parent keys so
+    wrapping columns are unchanged, and the parent key lines already written by the previous
+    run are dropped; only mappings whose keys are short printable ASCII are split.
+
+    This is byte-identical because:
+
+    - for dicts, lists, strings, numbers, booleans and None, both dumpers represent the same
+      nodes and emit the same characters, except for the text and keys above (which never
+      reach libyaml) and anchor names (anchored entries stay in one python run);
+    - in block style, a mapping is written as its entries one after the other, each depending
+      only on its key, its value and its indentation, so the runs written at the same
+      indentation and in the same (sorted) order concatenate to the whole mapping. Mappings
+      whose keys can't be sorted keep their insertion order, and aren't split.
+    """
+    if not HAS_LIBYAML:
+        return _yaml_dump_python(data, unshared)
+    if type(data) not in (dict, OrderedDict) or not data:
+        if (not unshared and _indexes_with_shared_nodes([data])) or not _libyaml_emittable(data):
+            return _yaml_dump_python(data, unshared)
+        return _yaml_dump_libyaml(data, unshared)
+
+    output: List[str] = []
+    previous_path: List[Any] = []
+    for (path, chunk, use_python) in _yaml_chunks(data, [], unshared):
+        for key in reversed(path):
+            chunk = {key: chunk}
+        text: str = _yaml_dump_python(chunk, unshared) if use_python else _yaml_dump_libyaml(chunk, unshared)
+        shared_depth: int = 0
+        while shared_depth < min(len(path), len(previous_path)) and path[shared_depth] == previous_path[shared_depth]:
+            shared_depth += 1
+        if shared_depth:
+            text = text.split('\n', shared_depth)[-1]
+        output.append(text)
+        previous_path = path
+    return ''.join(output)
+
+
+def _yaml_chunks(data: Dict[Any, Any], path: List[Any], unshared: bool = False) -> List[Any]:
+    """Split the mapping data (found at path) into (path, sub-mapping, use_python) runs, in output order."""
+    items: List[Any] = list(data.items())
+    if type(data) is not OrderedDict:
+        # Mirror the representer's sort_keys behaviour
+        try:
+            items = sorted(items)
+        except TypeError:
+            # Keys that can't be compared stay in insertion order, but the runs of a split
+            # mapping would be sorted each: keep it whole
+            shared: bool = not unshared and bool(_indexes_with_shared_nodes([data]))
+            return [(path, data, shared or not _libyaml_emittable(data))]
+    anchored: List[int] = [] if unshared else _indexes_with_shared_nodes([v for _, v in items])
+
+    chunks: List[Any] = []
+    run: List[Any] = []
+    run_python: bool = False
+    for idx, (key, value) in enumerate(items):
+        if anchored and anchored[0] <= idx <= anchored[-1]:
+            # Anchors are numbered per document. All aliased entries go in one python run, unless a
+            # single entry holds all of them: then it is split further with its own numbering.
+            splittable: bool = anchored == [idx]
+            use_python: bool = True
+        else:
+            splittable = True
+            use_python = not (_libyaml_emittable_key(key) and _libyaml_emittable(value))
+        if use_python and splittable and _yaml_splittable(key, value):
+            if run:
+                chunks.append((path, _same_mapping_type(data, run), run_python))
+                run = []
+            chunks.extend(_yaml_chunks(value, path + [key], unshared))
+            continue
+        if run and use_python != run_python:
+            chunks.append((path, _same_mapping_type(data, run), run_python))
+            run = []
+        run.append((key, value))
+        run_python = use_python
+    if run:
+        chunks.append((path, _same_mapping_type(data, run), run_python))
+    return chunks
+
+
+def _yaml_splittable(key: Any, value: Any) -> bool:
+    """Return True if value is a non-empty mapping whose key is always written as a single simple key line."""
+    return type(value) in (dict, OrderedDict) and len(value) > 0 and type(key) is str and _libyaml_emittable_key(key)
+
+
+def _same_mapping_type(data: Dict[Any, Any], items: List[Any]) -> Dict[Any, Any]:
+    """Build a mapping of the same kind as data, so the representer keeps or sorts keys alike."""
+    return OrderedDict(items) if type(data) is OrderedDict else dict(items)
+
+
+def _yaml_dump_python(data: Any, unshared: bool = False) -> str:
+    """Render data with the pure-Python dumper (without anchors and aliases if unshared)."""
+    dumper: type = _UnsharedDumper if unshared else yaml.Dumper
+    return yaml.dump(data, Dumper=dumper, default_flow_style=False, allow_unicode=True)
+
+
+def _yaml_dump_libyaml(data: Any, unshared: bool = False) -> str:
+    """Render data with the libyaml safe dumper (without anchors and aliases if unshared)."""
+    dumper: type = _UnsharedCSafeDumper if unshared else yaml.CSafeDumper
+    return yaml.dump(data, Dumper=dumper, default_flow_style=False, allow_unicode=True)
+
+
+class _UnsharedDumper(yaml.Dumper):
+    """Pure-Python dumper writing shared values out again (the representers of yaml.Dumper still apply)."""
+
+    def ignore_aliases(self, data: Any) -> bool:
+        return True
+
+
+if HAS_LIBYAML:
+    class _UnsharedCSafeDumper(yaml.CSafeDumper):
+        """libyaml safe dumper writing shared values out again (the representers of CSafeDumper still apply)."""
+
+        def ignore_aliases(self, data: Any) -> bool:
+            return True
+
+
+class _ScalarAnalyzer:
+    """Minimal stand-in for an Emitter instance, as needed by Emitter.analyze_scalar."""
+    allow_unicode: bool = True
+
+
+_LIBYAML_SCALAR_TYPES = (type(None), bool, int, float)
+# Printable ASCII text without space/line break pairs can always be single-quoted
+_MAYBE_DOUBLE_QUOTED = re.compile('[^\n\x20-\x7e]| \n|\n ')
+# Text both emitters write as is. Outside of it, libyaml escapes characters the pure-Python
+# emitter writes as is (e.g. characters beyond the BMP, NEL) or breaks lines elsewhere
+_LIBYAML_TEXT = re.compile('[\n\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd]*')
+# Keys both emitters write as the same simple key: short printable ASCII, without surrounding
+# spaces. Others (empty, long, multiline, ...) may be written as explicit '? key' entries
+_LIBYAML_KEY = re.compile('[\x21-\x7e](?:[\x20-\x7e]{0,96}[\x21-\x7e])?')
+
+
+def _libyaml_emittable(data: Any) -> bool:
+    """Return True if libyaml emits data exactly like the pure-Python dumper would."""
+    if type(data) is str:
+        if not _LIBYAML_TEXT.fullmatch(data):
+            return False
+        # Only double-quoted scalars are wrapped differently by the two emitters
+        if not _MAYBE_DOUBLE_QUOTED.search(data):
+            return True
+        return Emitter.analyze_scalar(_ScalarAnalyzer(), data).allow_single_quoted
+    if type(data) in (dict, OrderedDict) or type(data) in _unshared_mapping_types:
+        return all(_libyaml_emittable_key(k) and _libyaml_emittable(v) for k, v in data.items())
+    if type(data) is list:
+        return all(_libyaml_emittable(v) for v in data)
+    return type(data) in _LIBYAML_SCALAR_TYPES
+
+
+def _libyaml_emittable_key(key: Any) -> bool:
+    """Return True if libyaml emits the mapping key exactly like the pure-Python dumper would."""
+    if type(key) is str:
+        return bool(_LIBYAML_KEY.fullmatch(key)) and _libyaml_emittable(key)
+    return type(key) in _LIBYAML_SCALAR_TYPES
+
+
+def _indexes_with_shared_nodes(values: List[Any]) -> List[int]:
+    """Return indexes of values that hold a container also referenced elsewhere (dumped as anchor/alias).
+
+    Registered mapping views aren't looked into: what they hold is never aliased.
+    """
+    first_seen: Dict[int, int] = {}
+    anchored: Set[int] = set()
+    for idx, value in enumerate(values):
+        stack: List[Any] = [value]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, (dict, list)):
+                continue
+            if id(node) in first_seen:
+                anchored.add(first_seen[id(node)])
+                anchored.add(idx)
+                continue
+            first_seen[id(node)] = idx
+            stack.extend(node.values() if isinstance(node, dict) else node)
+    return sorted(anchored)
+
 
 # List helpers
 
@@ -25,7 +25,6 @@ Output: generated/elasticsearch/composable/ and generated/elasticsearch/legacy/
 """
 
 import json
-import sys
 from typing import (
     Dict,
     List,
@@ -35,7 +34,9 @@ from typing import (
 
 from os.path import join
 
+from generators import artifacts
 from generators import ecs_helpers
+from generators import field_table
 from ecs_types import (
     Field,
     FieldNestedEntry,
@@ -49,11 +50,14 @@ def generate(
     ecs_version: str,
     out_dir: str,
     mapping_settings_file: str,
-    template_settings_file: str
+    template_settings_file: str,
+    table: Optional[field_table.FieldTable] = None
 ) -> None:
     """Generate composable component templates (one per fieldset) and main template.json."""
-    all_component_templates(ecs_nested, ecs_version, out_dir)
-    component_names = component_name_convention(ecs_version, ecs_nested)
+    if table is None:
+        table = field_table.FieldTable(ecs_nested)
+    all_component_templates(ecs_nested, ecs_version, out_dir, table)
+    component_names = component_name_convention(ecs_version, ecs_nested, table)
     save_composable_template(ecs_version, component_names, out_dir, mapping_settings_file, template_settings_file)
 
 
@@ -69,19 +73,24 @@ def save_composable_template(ecs_version, component_names, out_dir, mapping_sett
 def all_component_templates(
     ecs_nested: Dict[str, FieldNestedEntry],
     ecs_version: str,
-    out_dir: str
+    out_dir: str,
+    table: Optional[field_table.FieldTable] = None
 ) -> None:
     """Generate one component template JSON per fieldset in elasticsearch/composable/component/."""
     component_dir: str = join(out_dir, 'elasticsearch/composable/component')
     ecs_helpers.make_dirs(component_dir)
+    if table is None:
+        table = field_table.FieldTable(ecs_nested)
 
-    for (fieldset_name, fieldset) in ecs_helpers.remove_top_level_reusable_false(ecs_nested).items():
+    field_level: Optional[str] = None
+    for fieldset_name in table.top_level_fieldsets:
         field_mappings = {}
-        for (flat_name, field) in fieldset['fields'].items():
-            name_parts = flat_name.split('.')
-            dict_add_nested(field_mappings, name_parts, entry_for(field))
+        for row in table.by_fieldset[fieldset_name]:
+            dict_add_nested(field_mappings, table.flat_name[row].split('.'), entry_for(table.field[row]))
+            # The level of the fieldset's last field tells custom fieldsets apart
+            field_level = table.level[row]
 
-        save_component_template(fieldset_name, field['level'], ecs_version, component_dir, field_mappings)
+        save_component_template(fieldset_name, field_level, ecs_version, component_dir, field_mappings)
 
 
 def save_component_template(
@@ -111,12 +120,17 @@ def save_component_template(
 
 def component_name_convention(
     ecs_version: str,
-    ecs_nested: Dict[str, FieldNestedEntry]
+    ecs_nested: Dict[str, FieldNestedEntry],
+    table: Optional[field_table.FieldTable] = None
 ) -> List[str]:
     """Return list of component template names as 'ecs_{version}_{fieldset}' ('+' → '-' in version)."""
     version: str = ecs_version.replace('+', '-')
+    if table is None:
+        fieldset_names = ecs_helpers.remove_top_level_reusable_false(ecs_nested)
+    else:
+        fieldset_names = table.top_level_fieldsets
     names: List[str] = []
-    for (fieldset_name, fieldset) in ecs_helpers.remove_top_level_reusable_false(ecs_nested).items():
+    for fieldset_name in fieldset_names:
         names.append("ecs_{}_{}".format(version, fieldset_name.lower()))
     return names
 
@@ -129,14 +143,18 @@ def generate_legacy(
     ecs_version: str,
     out_dir: str,
     mapping_settings_file: str,
-    template_settings_file: str
+    template_settings_file: str,
+    table: Optional[field_table.FieldTable] = None
 ) -> None:
-    """Generate elasticsearch/legacy/template.json with all fields in a single monolithic template."""
+    """Generate elasticsearch/legacy/template.json with all fields in a single monolithic template.
+
+    Raises ValueError if table (the FieldTable of the build, if given) doesn't hold the fields of ecs_flat.
+    """
+    if table is None:
+        table = field_table.FieldTable.from_flat(ecs_flat)
     field_mappings = {}
-    for flat_name in sorted(ecs_flat):
-        field = ecs_flat[flat_name]
-        name_parts = flat_name.split('.')
-        dict_add_nested(field_mappings, name_parts, entry_for(field))
+    for row in table.sorted_by_name(table.top_level_rows_of(ecs_flat)):
+        dict_add_nested(field_mappings, table.flat_name[row].split('.'), entry_for(table.field[row]))
 
     mappings_section: Dict = mapping_settings(mapping_settings_file)
     mappings_section['properties'] = field_mappings
@@ -301,13 +319,8 @@ def finalize_template(
 
 
 def save_json(file: str, data: Dict) -> None:
-    """Write data to file as JSON with 2-space indent, sorted keys, and trailing newline."""
-    open_mode = "wb"
-    if sys.version_info >= (3, 0):
-        open_mode = "w"
-    with open(file, open_mode) as jsonfile:
-        json.dump(data, jsonfile, indent=2, sort_keys=True)
-        jsonfile.write('\n')
+    """Write data to file as JSON with 2-space indent, sorted keys, and trailing newline (if it changed)."""
+    artifacts.write(file, json.dumps(data, indent=2, sort_keys=True) + '\n')
 
 
 def default_template_settings(ecs_version: str) -> Dict:
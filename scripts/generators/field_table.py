@@ -0,0 +1,182 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Field Table.
+
+Columnar view of the intermediate fields, built once and queried by the generators
+(csv_generator, es_template, beats, and OTelGenerator.get_mapping_summaries) instead of
+each of them walking the nested dicts again.
+
+One row per field of each fieldset of ecs_nested, in the order of ecs_nested. Columns are
+parallel lists indexed by row; the field definitions themselves are referenced, not copied.
+Rows are also indexed by fieldset, type, level and OTel relation, so select() answers a
+query by intersecting precomputed row lists rather than filtering every field.
+"""
+
+from array import array
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from generators import ecs_helpers
+from ecs_types import (
+    Field,
+    FieldNestedEntry,
+)
+
+
+class FieldTable:
+    """Columns of facts about the fields of ecs_nested (see the module docstring)."""
+
+    def __init__(self, ecs_nested: Dict[str, FieldNestedEntry]):
+        self.fieldsets: List[str] = list(ecs_nested)
+        # Fieldsets whose fields are in ecs_flat (i.e. not reusable.top_level=false)
+        self.top_level_fieldsets: List[str] = list(ecs_helpers.remove_top_level_reusable_false(ecs_nested))
+
+        self.field: List[Field] = []
+        self.flat_name: List[str] = []
+        self.fieldset: List[str] = []
+        self.top_level: List[bool] = []
+        self.type: List[str] = []
+        self.level: List[str] = []
+        self.indexed: List[bool] = []
+        self.doc_values: List[bool] = []
+        self.original_fieldset: List[Optional[str]] = []
+        self.multi_fields: array = array('l')
+        self.otel_relations: List[Tuple[str, ...]] = []
+        # Row of the closest enclosing field of the same fieldset (e.g. dns.answers for dns.answers.ttl), or -1
+        self.parent: array = array('l')
+
+        self.by_fieldset: Dict[str, List[int]] = {name: [] for name in self.fieldsets}
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_level: Dict[str, List[int]] = {}
+        self.by_otel_relation: Dict[str, List[int]] = {}
+
+        top_level_fieldsets = set(self.top_level_fieldsets)
+        for (fieldset_name, fieldset) in ecs_nested.items():
+            first_row: int = len(self.field)
+            rows_by_name: Dict[str, int] = {flat_name: first_row + offset
+                                            for (offset, flat_name) in enumerate(fieldset['fields'])}
+            for (flat_name, field) in fieldset['fields'].items():
+                self.append(fieldset_name, fieldset_name in top_level_fieldsets, flat_name, field,
+                            parent_row(flat_name, rows_by_name))
+
+    @classmethod
+    def from_flat(cls, ecs_flat: Dict[str, Field]) -> 'FieldTable':
+        """Return a table of the fields of ecs_flat, as one unnamed ('') top-level fieldset."""
+        return cls({'': {'fields': ecs_flat}})
+
+    def append(self, fieldset_name: str, top_level: bool, flat_name: str, field: Field, parent: int) -> None:
+        """Add a row for field, and index it."""
+        row: int = len(self.field)
+        self.field.append(field)
+        self.flat_name.append(flat_name)
+        self.fieldset.append(fieldset_name)
+        self.top_level.append(top_level)
+        self.type.append(field['type'])
+        self.level.append(field['level'])
+        self.indexed.append(field.get('index', True))
+        self.doc_values.append(field.get('doc_values', True))
+        self.original_fieldset.append(field.get('original_fieldset'))
+        self.multi_fields.append(len(field.get('multi_fields', [])))
+        relations: Tuple[str, ...] = tuple(otel['relation'] for otel in field.get('otel', []))
+        self.otel_relations.append(relations)
+        self.parent.append(parent)
+
+        self.by_fieldset[fieldset_name].append(row)
+        self.by_type.setdefault(field['type'], []).append(row)
+        self.by_level.setdefault(field['level'], []).append(row)
+        for relation in relations:
+            rows: List[int] = self.by_otel_relation.setdefault(relation, [])
+            # A field can have several mappings of the same relation
+            if not rows or rows[-1] != row:
+                rows.append(row)
+
+    def __len__(self) -> int:
+        return len(self.field)
+
+    def select(
+        self,
+        fieldset: Optional[str] = None,
+        field_type: Optional[str] = None,
+        level: Optional[str] = None,
+        otel_relation: Optional[str] = None,
+        top_level: Optional[bool] = None,
+        reused: Optional[bool] = None
+    ) -> List[int]:
+        """Return the rows matching all of the given criteria, in table order.
+
+        reused selects fields with (True) or without (False) an original_fieldset.
+        """
+        candidates: List[List[int]] = []
+        if fieldset is not None:
+            candidates.append(self.by_fieldset.get(fieldset, []))
+        if field_type is not None:
+            candidates.append(self.by_type.get(field_type, []))
+        if level is not None:
+            candidates.append(self.by_level.get(level, []))
+        if otel_relation is not None:
+            candidates.append(self.by_otel_relation.get(otel_relation, []))
+        if candidates:
+            candidates.sort(key=len)
+            rows: Iterable[int] = candidates[0]
+            for other in candidates[1:]:
+                other_rows = set(other)
+                rows = [row for row in rows if row in other_rows]
+        else:
+            rows = range(len(self.field))
+        if top_level is not None:
+            rows = [row for row in rows if self.top_level[row] == top_level]
+        if reused is not None:
+            rows = [row for row in rows if (self.original_fieldset[row] is not None) == reused]
+        return list(rows)
+
+    def count(self, **criteria) -> int:
+        """Return the number of rows matching the criteria of select()."""
+        return len(self.select(**criteria))
+
+    def fields(self, rows: Iterable[int]) -> Dict[str, Field]:
+        """Return {flat_name: field} for rows, in the order of rows."""
+        return {self.flat_name[row]: self.field[row] for row in rows}
+
+    def sorted_by_name(self, rows: Iterable[int]) -> List[int]:
+        """Return rows sorted by flat_name."""
+        return sorted(rows, key=self.flat_name.__getitem__)
+
+    def top_level_rows_of(self, ecs_flat: Dict[str, Field]) -> List[int]:
+        """Return the top-level rows, which hold the fields of ecs_flat. Raise ValueError if they don't.
+
+        For generators given both ecs_flat and the table of the same build.
+        """
+        rows: List[int] = self.select(top_level=True)
+        if len(rows) != len(ecs_flat) or not all(self.flat_name[row] in ecs_flat for row in rows):
+            raise ValueError('The field table and the flat fields passed to the generator are from different builds')
+        return rows
+
+
+def parent_row(flat_name: str, rows_by_name: Dict[str, int]) -> int:
+    """Return the row of the closest enclosing field of flat_name in rows_by_name, or -1."""
+    parent_name: str = flat_name
+    while '.' in parent_name:
+        parent_name = parent_name.rpartition('.')[0]
+        if parent_name in rows_by_name:
+            return rows_by_name[parent_name]
+    return -1
@@ -0,0 +1,207 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Flat Field Index Module.
+
+Writes ecs_flat.idx next to ecs_flat.yml: the field definitions of the flat representation
+in a file that is looked up in place, through mmap, rather than parsed. Processes reading
+the same index share its pages, and opening it costs nothing whatever the number of fields.
+
+Layout (little-endian):
+
+    header    magic, version, number of fields, number of hash slots, offsets of the regions
+    entries   one (name offset, name length, record offset, record length) per field, sorted by name
+    hash      open addressing table of entry numbers, by CRC-32 of the name (linear probing)
+    names     the UTF-8 flat names
+    records   the definitions, as compact JSON with sorted keys
+
+FlatIndexReader finds a name through the hash table (binary search over the sorted entries
+serves prefix queries), and only decodes the definition it returns.
+"""
+
+import bisect
+import json
+import mmap
+import struct
+import zlib
+from collections.abc import Mapping
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+from generators import artifacts
+from ecs_types import (
+    Field,
+)
+
+MAGIC = b'ECSFIDX\0'
+# Bump when the layout changes; readers refuse other versions
+INDEX_FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sIIIIQQQQ')
+_ENTRY = struct.Struct('<IIII')
+_SLOT = struct.Struct('<I')
+_EMPTY_SLOT = 0xFFFFFFFF
+
+
+def render(flat: Dict[str, Field]) -> bytes:
+    """Return the index of flat ({flat_name: field definition}) as bytes."""
+    names: List[str] = sorted(flat)
+    encoded_names: List[bytes] = [name.encode('utf-8') for name in names]
+    records: List[bytes] = [json.dumps(dict(flat[name].items()), sort_keys=True, separators=(',', ':'),
+                                       ensure_ascii=False).encode('utf-8') for name in names]
+
+    slots: int = hash_slots(len(names))
+    table: List[int] = [_EMPTY_SLOT] * slots
+    for (number, name) in enumerate(encoded_names):
+        slot: int = zlib.crc32(name) % slots
+        while table[slot] != _EMPTY_SLOT:
+            slot = (slot + 1) % slots
+        table[slot] = number
+
+    entries = bytearray()
+    (name_offset, record_offset) = (0, 0)
+    for (name, record) in zip(encoded_names, records):
+        entries += _ENTRY.pack(name_offset, len(name), record_offset, len(record))
+        name_offset += len(name)
+        record_offset += len(record)
+
+    entries_offset: int = _HEADER.size
+    hash_offset: int = entries_offset + len(entries)
+    names_offset: int = hash_offset + slots * _SLOT.size
+    records_offset: int = names_offset + name_offset
+    header: bytes = _HEADER.pack(MAGIC, INDEX_FORMAT_VERSION, len(names), slots, 0,
+                                 entries_offset, hash_offset, names_offset, records_offset)
+    return b''.join([header, bytes(entries), struct.pack('<{}I'.format(slots), *table)] + encoded_names + records)
+
+
+def write(path: str, flat: Dict[str, Field]) -> None:
+    """Save the index of flat to path (if it changed). Like the other sidecars, it isn't in the manifest."""
+    if artifacts.checking():
+        return
+    artifacts.write(path, render(flat), tracked=False)
+
+
+def hash_slots(count: int) -> int:
+    """Return the size of the hash table for count names: a power of two, at most half full."""
+    slots: int = 8
+    while slots < 2 * count:
+        slots *= 2
+    return slots
+
+
+class FlatIndexReader(Mapping):
+    """Read-only {flat_name: field definition} mapping over an index file written by write().
+
+    Definitions are decoded on each access, as new dicts. The file stays mapped until
+    close() (or the end of a with block); mappings of the same file by several processes
+    share their pages.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, 'rb') as f:
+            self.map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, self.count, self.slots, _, self.entries_offset, self.hash_offset, self.names_offset,
+             self.records_offset) = _HEADER.unpack_from(self.map, 0)
+        except struct.error:
+            self.map.close()
+            raise ValueError('{} is not a field index'.format(path))
+        if magic != MAGIC or version != INDEX_FORMAT_VERSION:
+            self.map.close()
+            raise ValueError('{} is not a field index of version {}'.format(path, INDEX_FORMAT_VERSION))
+
+    def close(self) -> None:
+        self.map.close()
+
+    def __enter__(self) -> 'FlatIndexReader':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def entry_name(self, number: int) -> bytes:
+        """Return the UTF-8 name of entry number (in sorted order)."""
+        (name_offset, name_length, _, _) = _ENTRY.unpack_from(self.map, self.entries_offset + number * _ENTRY.size)
+        start: int = self.names_offset + name_offset
+        return self.map[start:start + name_length]
+
+    def entry_record(self, number: int) -> Field:
+        """Return the decoded definition of entry number."""
+        (_, _, record_offset, record_length) = _ENTRY.unpack_from(self.map, self.entries_offset + number * _ENTRY.size)
+        start: int = self.records_offset + record_offset
+        return json.loads(self.map[start:start + record_length])
+
+    def find(self, name: str) -> Optional[int]:
+        """Return the entry number of name, or None if it isn't indexed."""
+        encoded: bytes = name.encode('utf-8')
+        slot: int = zlib.crc32(encoded) % self.slots
+        while True:
+            (number,) = _SLOT.unpack_from(self.map, self.hash_offset + slot * _SLOT.size)
+            if number == _EMPTY_SLOT:
+                return None
+            if self.entry_name(number) == encoded:
+                return number
+            slot = (slot + 1) % self.slots
+
+    def __getitem__(self, name: str) -> Field:
+        number: Optional[int] = self.find(name) if isinstance(name, str) else None
+        if number is None:
+            raise KeyError(name)
+        return self.entry_record(number)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.find(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for number in range(self.count):
+            yield self.entry_name(number).decode('utf-8')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def names_with_prefix(self, prefix: str) -> List[str]:
+        """Return the sorted names starting with prefix (e.g. 'process.parent.'), by binary search."""
+        encoded: bytes = prefix.encode('utf-8')
+        names: _SortedNames = _SortedNames(self)
+        number: int = bisect.bisect_left(names, encoded)
+        found: List[str] = []
+        while number < self.count:
+            name: bytes = self.entry_name(number)
+            if not name.startswith(encoded):
+                break
+            found.append(name.decode('utf-8'))
+            number += 1
+        return found
+
+
+class _SortedNames:
+    """Sequence of the UTF-8 names of a reader, in sorted order, for bisect."""
+
+    def __init__(self, reader: FlatIndexReader):
+        self.reader: FlatIndexReader = reader
+
+    def __len__(self) -> int:
+        return self.reader.count
+
+    def __getitem__(self, number: int) -> bytes:
+        return self.reader.entry_name(number)
@@ -22,17 +22,36 @@ Produces two normalized representations of processed ECS schemas:
 - Nested (ecs_nested.yml): {fieldset_name: {metadata, fields: {...}}}, includes all fieldsets
 
 These are the stable interfaces consumed by all downstream generators.
+
+The field definitions of both are read-only views (FieldView) over the field_details
+of the processed schemas rather than copies of them.
+
+The YAML files are the canonical artifacts. Each is accompanied by sidecars holding the
+same data in formats that are much faster to load (ecs_flat.json, ecs_flat.pickle, ...):
+load_intermediate() reads the fastest one that is up to date with the YAML file.
 """
 
 import copy
+import hashlib
+import json
+import pickle
+from collections.abc import Mapping
 from os.path import join
 from typing import (
+    Any,
     Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
     Tuple,
 )
 
 from schema import visitor
+from generators import artifacts
 from generators import ecs_helpers
+from generators import flat_index
+from ecs_types import compact_fields
 from ecs_types import (
     Field,
     FieldEntry,
@@ -40,26 +59,96 @@ from ecs_types import (
 )
 
 
+# Attributes only used while processing the schemas, left out of the intermediate files
+INTERNAL_ATTRIBUTES = ('node_name', 'intermediate')
+
+# Formats load_intermediate() tries, fastest first. YAML is the canonical one.
+LOAD_FORMATS = ('pickle', 'json', 'yaml')
+# Bump when the layout of the sidecars changes, so stale ones are never used
+SIDECAR_FORMAT_VERSION = 1
+
+
+class FieldView(Mapping):
+    """Read-only view of a field's field_details, without its internal attributes.
+
+    Stands in for a copy of the field_details: the views of the flat and nested
+    representations share the field_details of the processed schemas, which must not
+    be modified once they are generated. Code that needs to change a definition
+    copies it first; copy() and deepcopy() return plain dicts, as does unpickling.
+    """
+
+    __slots__ = ('details',)
+
+    def __init__(self, details: Field):
+        self.details: Field = details
+
+    def __getitem__(self, key: str) -> Any:
+        if key in INTERNAL_ATTRIBUTES:
+            raise KeyError(key)
+        return self.details[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.details:
+            if key not in INTERNAL_ATTRIBUTES:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        return key not in INTERNAL_ATTRIBUTES and key in self.details
+
+    def items(self):
+        return self.copy().items()
+
+    def values(self):
+        return self.copy().values()
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
+    def copy(self) -> Field:
+        return {key: value for (key, value) in self.details.items() if key not in INTERNAL_ATTRIBUTES}
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Field:
+        return copy.deepcopy(self.copy(), memo)
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+
+# Dumped like the copies they stand in for
+ecs_helpers.register_unshared_mapping(FieldView)
+
+
 def generate(
     fields: Dict[str, FieldEntry],
     out_dir: str,
-    default_dirs: bool
+    default_dirs: bool,
+    tracked: bool = True
 ) -> Tuple[Dict[str, FieldNestedEntry], Dict[str, Field]]:
     """Generate flat and nested intermediate YAML files from processed schemas.
 
-    Returns (nested, flat) dicts. Also saves ecs_flat.yml, ecs_nested.yml,
+    Returns (nested, flat) dicts. Also saves ecs_flat.yml, ecs_nested.yml, their sidecars
+    (see write_sidecars) and the lookup index of the flat fields (ecs_flat.idx, see flat_index.py),
     and (if default_dirs=True) ecs.yml for debugging.
+    tracked=False leaves ecs_flat.yml and ecs_nested.yml out of the artifact manifest, e.g. for
+    the intermediate files of subsets, which aren't committed.
     """
     ecs_helpers.make_dirs(join(out_dir))
 
     # Should only be used for debugging ECS development
     if default_dirs:
-        ecs_helpers.yaml_dump(join(out_dir, 'ecs.yml'), fields)
-    flat: Dict[str, Field] = generate_flat_fields(fields)
-    nested: Dict[str, FieldNestedEntry] = generate_nested_fields(fields)
+        # Reused fields share values that aren't modified per location: write them out again, as copies
+        ecs_helpers.yaml_dump(join(out_dir, 'ecs.yml'), compact_fields.materialize(fields), tracked=False,
+                              unshared=True)
+    flat, nested = generate_flat_and_nested_fields(fields)
 
-    ecs_helpers.yaml_dump(join(out_dir, 'ecs_flat.yml'), flat)
-    ecs_helpers.yaml_dump(join(out_dir, 'ecs_nested.yml'), nested)
+    ecs_helpers.yaml_dump(join(out_dir, 'ecs_flat.yml'), flat, tracked=tracked)
+    ecs_helpers.yaml_dump(join(out_dir, 'ecs_nested.yml'), nested, tracked=tracked)
+    write_sidecars(out_dir, 'ecs_flat', flat)
+    write_sidecars(out_dir, 'ecs_nested', nested)
+    flat_index.write(join(out_dir, 'ecs_flat.idx'), flat)
     return nested, flat
 
 
@@ -75,11 +164,26 @@ def accumulate_field(details: FieldEntry, memo: Field) -> None:
     """Visitor callback: add field to memo dict by flat_name, skipping schema-level and intermediate entries."""
     if 'schema_details' in details or ecs_helpers.is_intermediate(details):
         return
-    field_details: Field = copy.deepcopy(details['field_details'])
-    remove_internal_attributes(field_details)
+    field_details: Field = details['field_details']
+    memo[field_details['flat_name']] = FieldView(field_details)
 
-    flat_name = field_details['flat_name']
-    memo[flat_name] = field_details
+
+def generate_flat_and_nested_fields(
+    fields: Dict[str, FieldEntry]
+) -> Tuple[Dict[str, Field], Dict[str, FieldNestedEntry]]:
+    """Return the results of generate_flat_fields() and generate_nested_fields(), walking the fields once."""
+    flat_fieldsets: Dict[str, FieldEntry] = remove_non_root_reusables(fields)
+    flattened: Dict[str, Field] = {}
+    nested: Dict[str, FieldNestedEntry] = {}
+    for (name, details) in fields.items():
+        fieldset_details: FieldNestedEntry = nested_fieldset_details(details)
+        callbacks: List[visitor.FieldCallback] = [
+            visitor.FieldCallback(accumulate_field, fieldsets=True, memo=fieldset_details['fields'])]
+        if name in flat_fieldsets:
+            callbacks.append(visitor.FieldCallback(accumulate_field, fieldsets=True, memo=flattened))
+        visitor.visit_all(details['fields'], callbacks)
+        nested[name] = fieldset_details
+    return flattened, nested
 
 
 def generate_nested_fields(fields: Dict[str, FieldEntry]) -> Dict[str, FieldNestedEntry]:
@@ -92,36 +196,132 @@ def generate_nested_fields(fields: Dict[str, FieldEntry]) -> Dict[str, FieldNest
     # Flatten each field set, but keep all resulting fields nested under their
     # parent/host field set.
     for (name, details) in fields.items():
-        fieldset_details = {
-            **copy.deepcopy(details['field_details']),
-            **copy.deepcopy(details['schema_details'])
-        }
+        fieldset_details: FieldNestedEntry = nested_fieldset_details(details)
+        visitor.visit_fields_with_memo(details['fields'], accumulate_field, fieldset_details['fields'])
+        nested[name] = fieldset_details
+    return nested
 
-        fieldset_details.pop('node_name')
-        if 'reusable' in fieldset_details:
-            fieldset_details['reusable'].pop('order')
 
-        # TODO Temporarily removed to simplify initial rewrite review
-        fieldset_details.pop('dashed_name')
-        fieldset_details.pop('flat_name')
-        if False == fieldset_details['root']:
-            fieldset_details.pop('root')
+def nested_fieldset_details(details: FieldEntry) -> FieldNestedEntry:
+    """Return the metadata of a fieldset for the nested representation, with an empty 'fields' dict to fill."""
+    fieldset_details = {
+        **copy.deepcopy(details['field_details']),
+        **copy.deepcopy(details['schema_details'])
+    }
 
-        fieldset_fields = {}
-        visitor.visit_fields_with_memo(details['fields'], accumulate_field, fieldset_fields)
-        fieldset_details['fields'] = fieldset_fields
+    fieldset_details.pop('node_name')
+    if 'reusable' in fieldset_details:
+        fieldset_details['reusable'].pop('order')
 
-        nested[name] = fieldset_details
-    return nested
+    # TODO Temporarily removed to simplify initial rewrite review
+    fieldset_details.pop('dashed_name')
+    fieldset_details.pop('flat_name')
+    if False == fieldset_details['root']:
+        fieldset_details.pop('root')
 
+    fieldset_details['fields'] = {}
+    return fieldset_details
+
+
+# Sidecars
+
+
+def write_sidecars(out_dir: str, name: str, data: Dict[str, Any]) -> None:
+    """Save data, already dumped to <name>.yml in out_dir, as <name>.json and <name>.pickle.
+
+    Both hold {'version', 'yaml_sha256', 'data'}: data is the document of the YAML file, and
+    yaml_sha256 the SHA-256 of the YAML file it was written with. A sidecar is only used while
+    that matches. The JSON file is compact, with keys sorted; the pickle uses protocol 5.
+    """
+    if artifacts.checking():
+        return
+    bundle: Dict[str, Any] = {
+        'version': SIDECAR_FORMAT_VERSION,
+        'yaml_sha256': file_sha256(join(out_dir, name + '.yml')),
+        'data': data,
+    }
+    artifacts.write(join(out_dir, name + '.json'),
+                    json.dumps(bundle, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                               default=_json_default),
+                    tracked=False)
+    artifacts.write(join(out_dir, name + '.pickle'), pickle.dumps(bundle, protocol=5), tracked=False)
+
+
+def load_intermediate(out_dir: str, name: str, formats: Sequence[str] = LOAD_FORMATS) -> Any:
+    """Load the intermediate file <name>.yml of out_dir from the first usable format of formats.
+
+    Sidecars that are missing, out of date or unreadable are skipped; the YAML file is
+    parsed when none is usable. Returns plain dicts and lists, equal to what parsing the
+    YAML file returns.
+    """
+    yaml_path: str = join(out_dir, name + '.yml')
+    for data_format in formats:
+        if data_format == 'yaml':
+            return ecs_helpers.yaml_load(yaml_path)
+        if data_format == 'json':
+            data: Optional[Any] = _load_json_sidecar(yaml_path, join(out_dir, name + '.json'))
+        elif data_format == 'pickle':
+            data = _load_pickle_sidecar(yaml_path, join(out_dir, name + '.pickle'))
+        else:
+            raise ValueError('Unknown intermediate file format: {}'.format(data_format))
+        if data is not None:
+            return data
+    raise FileNotFoundError('No usable {} intermediate file in {} (formats: {})'.format(
+        name, out_dir, ', '.join(formats)))
 
-# Helper functions
 
+def load_flat_fields(out_dir: str, formats: Sequence[str] = LOAD_FORMATS) -> Dict[str, Field]:
+    """Load ecs_flat.yml of out_dir (e.g. generated/ecs), from its fastest usable format."""
+    return load_intermediate(out_dir, 'ecs_flat', formats)
 
-def remove_internal_attributes(field_details: Field) -> None:
-    """Remove node_name and intermediate attributes from field definitions before output."""
-    field_details.pop('node_name', None)
-    field_details.pop('intermediate', None)
+
+def load_nested_fields(out_dir: str, formats: Sequence[str] = LOAD_FORMATS) -> Dict[str, FieldNestedEntry]:
+    """Load ecs_nested.yml of out_dir (e.g. generated/ecs), from its fastest usable format."""
+    return load_intermediate(out_dir, 'ecs_nested', formats)
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize the mappings json doesn't know about, such as FieldView, as dicts."""
+    if isinstance(value, Mapping):
+        return value.copy() if isinstance(value, FieldView) else dict(value)
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 of the contents of path."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load_json_sidecar(yaml_path: str, path: str) -> Optional[Any]:
+    """Return the data of the JSON sidecar at path, or None if it's missing or wasn't written with yaml_path."""
+    try:
+        with open(path, 'rb') as f:
+            return _sidecar_data(json.loads(f.read()), yaml_path)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_pickle_sidecar(yaml_path: str, path: str) -> Optional[Any]:
+    """Return the data of the pickle sidecar at path, or None if it's missing or wasn't written with yaml_path."""
+    try:
+        with open(path, 'rb') as f:
+            return _sidecar_data(pickle.load(f), yaml_path)
+    except Exception:
+        # Missing, truncated or unreadable sidecar
+        return None
+
+
+def _sidecar_data(bundle: Any, yaml_path: str) -> Optional[Any]:
+    """Return the data of a loaded sidecar bundle, or None if it's of another version or YAML file."""
+    if not isinstance(bundle, dict) or bundle.get('version') != SIDECAR_FORMAT_VERSION:
+        return None
+    if bundle.get('yaml_sha256') != file_sha256(yaml_path):
+        return None
+    return bundle.get('data')
+
+
+# Helper functions
 
 
 def remove_non_root_reusables(fields_nested: Dict[str, FieldEntry]) -> Dict[str, FieldEntry]:
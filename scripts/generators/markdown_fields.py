@@ -24,10 +24,10 @@ Generates markdown docs using Jinja2 templates from scripts/templates/:
 
 from functools import wraps
 import os.path as path
-import os
 
 import jinja2
 
+from generators import artifacts
 from generators import ecs_helpers
 from copy import deepcopy
 
@@ -45,8 +45,11 @@ LEGACY_FIELDSETS = frozenset({
 })
 
 
-def generate(nested, docs_only_nested, ecs_generated_version, semconv_version, otel_generator, out_dir):
-    """Generate all markdown docs: index, field reference, per-fieldset pages, and OTel alignment pages."""
+def generate(nested, docs_only_nested, ecs_generated_version, semconv_version, otel_generator, out_dir, table=None):
+    """Generate all markdown docs: index, field reference, per-fieldset pages, and OTel alignment pages.
+
+    table is the FieldTable of nested, if the caller has one.
+    """
 
     ecs_helpers.make_dirs(out_dir)
 
@@ -57,7 +60,7 @@ def generate(nested, docs_only_nested, ecs_generated_version, semconv_version, o
     save_markdown(path.join(out_dir, 'ecs-otel-alignment-details.md'),
                   page_otel_alignment_details(nested, ecs_generated_version, semconv_version))
     save_markdown(path.join(out_dir, 'ecs-otel-alignment-overview.md'),
-                  page_otel_alignment_overview(otel_generator, nested, ecs_generated_version, semconv_version))
+                  page_otel_alignment_overview(otel_generator, nested, ecs_generated_version, semconv_version, table))
     fieldsets = ecs_helpers.dict_sorted_by_keys(nested, ['group', 'name'])
     save_markdown(path.join(out_dir, 'ecs-field-reference.md'),
                   page_field_reference(ecs_generated_version, "Elasticsearch", fieldsets))
@@ -104,10 +107,12 @@ def extract_allowed_values_key_names(field):
 
 
 def sort_fields(fieldset):
-    """Return fieldset fields as a list sorted by name, with allowed_value_names added to each field."""
-    fields_list = list(fieldset['fields'].values())
-    for field in fields_list:
-        field['allowed_value_names'] = extract_allowed_values_key_names(field)
+    """Return fieldset fields as a list sorted by name, with allowed_value_names added to each field.
+
+    The fields are copies: the fields of fieldset, which other generators read too, are left as is.
+    """
+    fields_list = [{**field, 'allowed_value_names': extract_allowed_values_key_names(field)}
+                   for field in fieldset['fields'].values()]
     return sorted(fields_list, key=lambda field: field['name'])
 
 
@@ -138,10 +143,8 @@ def render_template(template_name, **context):
 
 
 def save_markdown(f, text):
-    """Write markdown text to file, creating parent directories as needed."""
-    os.makedirs(path.dirname(f), exist_ok=True)
-    with open(f, "w") as outfile:
-        outfile.write(text)
+    """Write markdown text to file (if it changed), creating parent directories as needed."""
+    artifacts.write(f, text)
 
 # jinja2 setup
 
@@ -248,10 +251,10 @@ def is_eligable_for_otel_mapping(fieldset):
 
 
 @templated('otel_alignment_overview.j2')
-def page_otel_alignment_overview(otel_generator, nested, ecs_generated_version, semconv_version):
+def page_otel_alignment_overview(otel_generator, nested, ecs_generated_version, semconv_version, table=None):
     """Render ecs-otel-alignment-overview.md with mapping summaries from otel_generator."""
     fieldsets = ecs_helpers.dict_sorted_by_keys(nested, ['group', 'name'])
-    summaries = otel_generator.get_mapping_summaries(fieldsets)
+    summaries = otel_generator.get_mapping_summaries(fieldsets, table)
     return dict(summaries=summaries,
                 semconv_version=semconv_version,
                 ecs_generated_version=ecs_generated_version)
@@ -27,10 +27,12 @@ import shutil
 from typing import (
     Dict,
     List,
+    Optional,
 )
-import yaml
+from schema import validation_report
 from schema import visitor
 from generators import ecs_helpers
+from generators import field_table
 from ecs_types import (
     OTelModelFile,
     OTelMapping,
@@ -45,6 +47,17 @@ from ecs_types import (
 OTEL_SEMCONV_GIT = "https://github.com/open-telemetry/semantic-conventions.git"
 LOCAL_TARGET_DIR_OTEL_SEMCONV = "./build/otel-semconv/"
 
+# Keys of the mapping summaries counting each OTel relation
+RELATION_SUMMARY_KEYS: Dict[str, str] = {
+    'match': 'nr_matching_fields',
+    'equivalent': 'nr_equivalent_fields',
+    'related': 'nr_related_fields',
+    'metric': 'nr_metric_fields',
+    'conflict': 'nr_conflicting_fields',
+    'na': 'nr_not_applicable_fields',
+    'otlp': 'nr_otlp_fields',
+}
+
 
 def get_model_files(
     git_repo: str,
@@ -102,7 +115,7 @@ def collectOTelModelFiles(
             otel_model_files.extend(collectOTelModelFiles(entry, level + 1))
         elif entry.type == "blob" and (entry.name.endswith('.yml') or entry.name.endswith('.yaml')):
             content: str = entry.data_stream.read().decode('utf-8')
-            model_file: OTelModelFile = yaml.safe_load(content)
+            model_file: OTelModelFile = ecs_helpers.yaml_safe_load(content)
             otel_model_files.append(model_file)
     return otel_model_files
 
@@ -242,59 +255,88 @@ class OTelGenerator:
             ecs_field_name = field_details['flat_name']
             if 'otel' in field_details:
                 for otel in field_details['otel']:
-                    if not 'relation' in otel:
-                        raise ValueError(
-                            f"On field '{field_details['flat_name']}': OTel mapping must specify the 'relation' property!")
-
-                    if otel['relation'] == 'metric':
-                        must_have(ecs_field_name, otel, otel['relation'], 'metric')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
-                        self.__check_metric_name(ecs_field_name, otel['metric'])
-                    elif otel['relation'] == 'otlp':
-                        must_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
-                        must_have(ecs_field_name, otel, otel['relation'], 'stability')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
-                    elif otel['relation'] == 'na':
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
-                    elif otel['relation'] == 'match':
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
-                    elif otel['relation'] == 'equivalent' or otel['relation'] == 'related' or otel['relation'] == 'conflict':
-                        must_have(ecs_field_name, otel, otel['relation'], 'attribute')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
-                        must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
-                        self.__check_attribute_name(field_details, otel)
-                    else:
-                        raise ValueError(
-                            f"On field '{field_details['flat_name']}': Invalid relation type '{otel['relation']}'")
+                    # In report mode, an invalid mapping is recorded and the next one checked
+                    with validation_report.collect('otel'):
+                        self.__check_otel_mapping(field_details, otel)
 
             elif ecs_field_name in self.otel_attribute_names:
-                print(
-                    f'WARNING: Field "{ecs_field_name}" exists in OTel Semantic Conventions with exactly the same name but is not mapped in ECS!')
+                message = f'Field "{ecs_field_name}" exists in OTel Semantic Conventions with exactly the same name but is not mapped in ECS!'
+                report = validation_report.current()
+                if report:
+                    report.warning('otel', message)
+                else:
+                    print('WARNING: ' + message)
+
+    def __check_otel_mapping(self, field_details, otel):
+        """Validate one otel mapping of a field. Raises ValueError on the first problem."""
+        ecs_field_name = field_details['flat_name']
+        if not 'relation' in otel:
+            raise ValueError(
+                f"On field '{field_details['flat_name']}': OTel mapping must specify the 'relation' property!")
+
+        if otel['relation'] == 'metric':
+            must_have(ecs_field_name, otel, otel['relation'], 'metric')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
+            self.__check_metric_name(ecs_field_name, otel['metric'])
+        elif otel['relation'] == 'otlp':
+            must_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
+            must_have(ecs_field_name, otel, otel['relation'], 'stability')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
+        elif otel['relation'] == 'na':
+            must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
+        elif otel['relation'] == 'match':
+            must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'attribute')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
+        elif otel['relation'] == 'equivalent' or otel['relation'] == 'related' or otel['relation'] == 'conflict':
+            must_have(ecs_field_name, otel, otel['relation'], 'attribute')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'otlp_field')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'metric')
+            must_not_have(ecs_field_name, otel, otel['relation'], 'stability')
+            self.__check_attribute_name(field_details, otel)
+        else:
+            raise ValueError(
+                f"On field '{field_details['flat_name']}': Invalid relation type '{otel['relation']}'")
 
     def validate_otel_mapping(
         self,
         field_entries: Dict[str, FieldEntry]
     ) -> None:
         """Validate all otel mappings then enrich them with stability info."""
+        report = validation_report.current()
+        if not report:
+            # The first invalid mapping raises, so each field can be enriched right after it's checked
+            visitor.visit_all(field_entries, [
+                visitor.FieldCallback(self.__check_mapping, fieldsets=True),
+                visitor.FieldCallback(self.__set_stability, fieldsets=True),
+            ])
+            return
+        nr_errors = len(report.errors)
         visitor.visit_fields(field_entries, None, self.__check_mapping)
+        if len(report.errors) > nr_errors:
+            # Stability can't be looked up for invalid mappings
+            return
         visitor.visit_fields(field_entries, None, self.__set_stability)
 
     def get_mapping_summaries(
         self,
         fieldsets: List[FieldNestedEntry],
+        table: Optional[field_table.FieldTable] = None
     ) -> List[OTelMappingSummary]:
-        """Return alignment summary stats per ECS fieldset and OTel namespace, sorted alphabetically."""
+        """Return alignment summary stats per ECS fieldset and OTel namespace, sorted alphabetically.
+
+        The fields of the fieldsets are counted in table (built from fieldsets if not given).
+        """
         summaries: List[OTelMappingSummary] = []
+        if table is None:
+            table = field_table.FieldTable({fieldset['name']: fieldset for fieldset in fieldsets})
 
         otel_namespaces = set([attr.split('.')[0] for attr in self.attributes.keys()])
 
@@ -317,27 +359,12 @@ class OTelGenerator:
             summary['nr_not_applicable_fields'] = 0
             summary['nr_otlp_fields'] = 0
 
-            for field in fieldset['fields'].values():
-                summary['nr_all_ecs_fields'] += 1
-                if 'original_fieldset' not in field:
-                    summary['nr_plain_ecs_fields'] += 1
-
-                if 'otel' in field:
-                    for otel in field['otel']:
-                        if otel['relation'] == "match":
-                            summary['nr_matching_fields'] += 1
-                        elif otel['relation'] == "equivalent":
-                            summary['nr_equivalent_fields'] += 1
-                        elif otel['relation'] == "related":
-                            summary['nr_related_fields'] += 1
-                        elif otel['relation'] == "metric":
-                            summary['nr_metric_fields'] += 1
-                        elif otel['relation'] == "conflict":
-                            summary['nr_conflicting_fields'] += 1
-                        elif otel['relation'] == "na":
-                            summary['nr_not_applicable_fields'] += 1
-                        elif otel['relation'] == "otlp":
-                            summary['nr_otlp_fields'] += 1
+            summary['nr_all_ecs_fields'] = table.count(fieldset=fieldset['name'])
+            summary['nr_plain_ecs_fields'] = table.count(fieldset=fieldset['name'], reused=False)
+            for (relation, summary_key) in RELATION_SUMMARY_KEYS.items():
+                # Counts mappings: a field can have several of the same relation
+                summary[summary_key] = sum(table.otel_relations[row].count(relation)
+                                           for row in table.select(fieldset=fieldset['name'], otel_relation=relation))
 
             summary['nr_otel_fields'] += len([attr for attr in list(self.attributes.keys())
                                              if attr.startswith(summary['namespace'] + ".")])
@@ -32,14 +32,22 @@ See scripts/docs/schema-pipeline.md for complete documentation.
 """
 
 import re
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
+    Callable,
     Dict,
     List,
     Optional,
+    Pattern,
+    Tuple,
     Union,
 )
 
 from generators import ecs_helpers
+from schema import pipeline_context
+from schema import validation_report
 from schema import visitor
 from ecs_types import (
     Field,
@@ -48,22 +56,99 @@ from ecs_types import (
     MultiField,
 )
 
-strict_mode: Optional[bool]  # work-around from https://github.com/python/mypy/issues/5732
 
-
-def clean(fields: Dict[str, Field], strict: Optional[bool] = False) -> None:
+def clean(fields: Dict[str, Field], strict: Optional[bool] = None, jobs: Optional[int] = None) -> None:
     """Clean, validate, and enrich schema definitions in place.
 
     Args:
         fields: Deeply nested field dictionary from loader.py
-        strict: If True, warnings become exceptions
+        strict: If True, warnings become exceptions. Overrides the strict option of the current
+            pipeline context for this call; None uses it (non-strict outside of an activated context)
+        jobs: If > 1, clean the fieldsets in this many worker processes (see clean_parallel)
 
     Raises:
         ValueError: If mandatory attributes are missing or invalid
     """
-    global strict_mode
-    strict_mode = strict
-    visitor.visit_fields(fields, fieldset_func=schema_cleanup, field_func=field_cleanup)
+    context: pipeline_context.PipelineContext = pipeline_context.current()
+    # Active for the whole call, so that the stages see this context even if it's a throwaway default
+    with context.activate():
+        previous_strict: bool = context.strict
+        if strict is not None:
+            context.strict = strict
+        try:
+            if jobs and jobs > 1 and len(fields) > 1:
+                clean_parallel(fields, jobs)
+            elif context.report:
+                # Report mode: a field set or field failing a hard check is left as is, the others are cleaned
+                visitor.visit_fields(fields,
+                                     fieldset_func=validation_report.collecting('cleaner', schema_cleanup),
+                                     field_func=validation_report.collecting('cleaner', field_cleanup))
+            else:
+                visitor.visit_fields(fields, fieldset_func=schema_cleanup, field_func=field_cleanup)
+        finally:
+            context.strict = previous_strict
+
+
+def clean_parallel(fields: Dict[str, Field], jobs: int) -> None:
+    """Clean each fieldset in a worker process and put the cleaned fieldsets back into fields.
+
+    Fieldsets don't depend on each other before reuse, so they can be cleaned independently.
+    Warnings, report entries and the first error come out in the same order as a serial run:
+    the results are replayed fieldset by fieldset, in the order of fields.
+    """
+    context: pipeline_context.PipelineContext = pipeline_context.current()
+    names: List[str] = list(fields)
+    report_mode: bool = context.report is not None
+    timed: bool = context.rule_stats is not None
+    tasks = [({name: fields[name]}, context.strict, report_mode, timed) for name in names]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(names))) as executor:
+        results: List[CleanResult] = list(
+            executor.map(clean_fieldset, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    for (name, result) in zip(names, results):
+        fields[name] = result.fieldset
+        for w in result.warnings:
+            warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+        if context.report:
+            context.report.entries.extend(result.report_entries)
+        if timed:
+            for (rule, stats) in result.rule_stats.items():
+                total: RuleStats = context.rule_stats.setdefault(rule, RuleStats())
+                total.calls += stats.calls
+                total.seconds += stats.seconds
+        if result.error:
+            raise result.error
+
+
+class CleanResult:
+    """What cleaning one fieldset in a worker process produced, to be replayed by clean_parallel."""
+
+    def __init__(self, fieldset: Field):
+        self.fieldset: Field = fieldset
+        self.warnings: List[warnings.WarningMessage] = []
+        self.report_entries: List[Dict[str, str]] = []
+        self.rule_stats: Dict[str, RuleStats] = {}
+        self.error: Optional[Exception] = None
+
+
+def clean_fieldset(task: Tuple[Dict[str, Field], bool, bool, bool]) -> CleanResult:
+    """Worker of clean_parallel: clean one fieldset, capturing warnings, report entries and the error if any."""
+    (fields, strict, report_mode, timed) = task
+    context = pipeline_context.PipelineContext(strict, validation_report.ValidationReport() if report_mode else None)
+    if timed:
+        context.rule_stats = {}
+    result = CleanResult(next(iter(fields.values())))
+    with warnings.catch_warnings(record=True) as captured, context.activate():
+        warnings.simplefilter('always')
+        try:
+            clean(fields)
+        except Exception as e:
+            result.error = e
+    result.warnings = [warnings.WarningMessage(w.message, w.category, w.filename, w.lineno) for w in captured]
+    if report_mode:
+        result.report_entries = context.report.entries
+    if timed:
+        result.rule_stats = context.rule_stats
+    return result
 
 
 # Schema level cleanup
@@ -72,7 +157,7 @@ def clean(fields: Dict[str, Field], strict: Optional[bool] = False) -> None:
 def schema_cleanup(schema: FieldEntry) -> None:
     """Clean and enrich a fieldset: validate, set defaults, expand reuse notation."""
     # Sanity check first
-    schema_mandatory_attributes(schema)
+    run_rules(SCHEMA_MANDATORY_RULES, schema, 'schema', collect=False)
     # trailing space cleanup
     ecs_helpers.dict_clean_string_values(schema['schema_details'])
     ecs_helpers.dict_clean_string_values(schema['field_details'])
@@ -97,7 +182,7 @@ def schema_cleanup(schema: FieldEntry) -> None:
 SCHEMA_MANDATORY_ATTRIBUTES = ['name', 'title', 'description']
 
 
-def schema_mandatory_attributes(schema: FieldEntry) -> None:
+def schema_mandatory_attributes(schema: FieldEntry, strict: Optional[bool] = True) -> None:
     """Validate mandatory attributes (name, title, description) are present."""
     current_schema_attributes: List[str] = sorted(list(schema['field_details'].keys()) +
                                                   list(schema['schema_details'].keys()))
@@ -117,17 +202,7 @@ def schema_mandatory_attributes(schema: FieldEntry) -> None:
 
 def schema_assertions_and_warnings(schema: FieldEntry) -> None:
     """Validate short/alpha/beta/short_override descriptions after defaults are applied."""
-    single_line_short_description(schema, strict=strict_mode)
-    if 'alpha' in schema['field_details']:
-        single_line_alpha_description(schema, strict=strict_mode)
-    if 'beta' in schema['field_details']:
-        single_line_beta_description(schema, strict=strict_mode)
-    if 'alpha' in schema['field_details'] and 'beta' in schema['field_details']:
-        msg = "Field set '{}' cannot have both alpha and beta markers.".format(
-            schema['field_details']['name'])
-        raise ValueError(msg)
-    if 'reusable' in schema['schema_details']:
-        single_line_short_override_description(schema, strict=strict_mode)
+    run_rules(SCHEMA_RULES, schema, 'schema')
 
 
 def normalize_reuse_notation(schema: FieldEntry) -> None:
@@ -161,11 +236,12 @@ def normalize_reuse_notation(schema: FieldEntry) -> None:
 def field_cleanup(field: FieldDetails) -> None:
     """Validate, strip whitespace, apply defaults, and validate constraints for a field.
 
-    Intermediate fields (auto-generated structural fields) are skipped after validation.
+    Intermediate fields (auto-generated structural fields) are skipped.
     """
-    field_mandatory_attributes(field)
     if ecs_helpers.is_intermediate(field):
         return
+    # Sanity check first
+    run_rules(FIELD_MANDATORY_RULES, field, 'field', collect=False)
     ecs_helpers.dict_clean_string_values(field['field_details'])
     if 'allowed_values' in field['field_details']:
         for allowed_value in field['field_details']['allowed_values']:
@@ -205,22 +281,23 @@ FIELD_MANDATORY_ATTRIBUTES = ['name', 'description', 'type', 'level']
 ACCEPTABLE_FIELD_LEVELS = ['core', 'extended', 'custom']
 
 
-def field_mandatory_attributes(field: FieldDetails) -> None:
+def field_mandatory_attributes(field: FieldDetails, strict: Optional[bool] = True) -> None:
     """Raise ValueError if name/description/type/level are missing, or path/scaling_factor
     for alias/scaled_float fields. Intermediate fields are skipped."""
     if ecs_helpers.is_intermediate(field):
         return
-    current_field_attributes: List[str] = sorted(field['field_details'].keys())
-    missing_attributes: List[str] = ecs_helpers.list_subtract(FIELD_MANDATORY_ATTRIBUTES, current_field_attributes)
+    field_details: Field = field['field_details']
+    missing_attributes: List[str] = [attr for attr in FIELD_MANDATORY_ATTRIBUTES if attr not in field_details]
 
     # `alias` fields require a target `path` attribute.
-    if field['field_details'].get('type') == 'alias' and 'path' not in current_field_attributes:
+    if field_details.get('type') == 'alias' and 'path' not in field_details:
         missing_attributes.append('path')
     # `scaled_float` fields require a `scaling_factor` attribute.
-    if field['field_details'].get('type') == 'scaled_float' and 'scaling_factor' not in current_field_attributes:
+    if field_details.get('type') == 'scaled_float' and 'scaling_factor' not in field_details:
         missing_attributes.append('scaling_factor')
 
     if len(missing_attributes) > 0:
+        current_field_attributes: List[str] = sorted(field_details.keys())
         msg: str = "Field is missing the following mandatory attributes: {}.\nFound these: {}.\nField details: {}"
         raise ValueError(msg.format(', '.join(missing_attributes),
                                     current_field_attributes, field))
@@ -229,27 +306,47 @@ def field_mandatory_attributes(field: FieldDetails) -> None:
 def field_assertions_and_warnings(field: FieldDetails) -> None:
     """Validate short desc length, alpha/beta desc, pattern regex, example value, and level.
 
-    Invalid level always raises ValueError. Other checks warn or raise based on strict_mode.
+    Invalid level always raises ValueError. Other checks warn or raise based on the strict option.
     """
     if not ecs_helpers.is_intermediate(field):
-        # check short description length if in strict mode
-        single_line_short_description(field, strict=strict_mode)
-        if 'alpha' in field['field_details']:
-            single_line_alpha_description(field, strict=strict_mode)
-        if 'beta' in field['field_details']:
-            single_line_beta_description(field, strict=strict_mode)
-        if 'alpha' in field['field_details'] and 'beta' in field['field_details']:
-            msg = "Field '{}' cannot have both alpha and beta markers.".format(
-                field['field_details']['name'])
-            raise ValueError(msg)
-        if 'pattern' in field['field_details']:
-            validate_pattern_regex(field['field_details'], strict=strict_mode)
-        check_example_value(field, strict=strict_mode)
-        if field['field_details']['level'] not in ACCEPTABLE_FIELD_LEVELS:
-            msg: str = "Invalid level for field '{}'.\nValue: {}\nAcceptable values: {}".format(
-                field['field_details']['name'], field['field_details']['level'],
-                ACCEPTABLE_FIELD_LEVELS)
-            raise ValueError(msg)
+        run_rules(FIELD_RULES, field, 'field')
+
+
+def field_level(field: FieldEntry, strict: Optional[bool] = True) -> None:
+    """Raise ValueError if the field level is not one of ACCEPTABLE_FIELD_LEVELS, regardless of strict."""
+    if field['field_details']['level'] not in ACCEPTABLE_FIELD_LEVELS:
+        msg: str = "Invalid level for field '{}'.\nValue: {}\nAcceptable values: {}".format(
+            field['field_details']['name'], field['field_details']['level'],
+            ACCEPTABLE_FIELD_LEVELS)
+        raise ValueError(msg)
+
+
+def field_pattern_regex(field: FieldEntry, strict: Optional[bool] = True) -> None:
+    """Rule wrapper for validate_pattern_regex, which takes the field details."""
+    validate_pattern_regex(field['field_details'], strict=strict)
+
+
+def schema_alpha_and_beta_exclusive(schema: FieldEntry, strict: Optional[bool] = True) -> None:
+    """Raise ValueError if an alpha field set also has a beta marker, regardless of strict."""
+    if 'beta' in schema['field_details']:
+        msg = "Field set '{}' cannot have both alpha and beta markers.".format(
+            schema['field_details']['name'])
+        raise ValueError(msg)
+
+
+def field_alpha_and_beta_exclusive(field: FieldEntry, strict: Optional[bool] = True) -> None:
+    """Raise ValueError if an alpha field also has a beta marker, regardless of strict."""
+    if 'beta' in field['field_details']:
+        msg = "Field '{}' cannot have both alpha and beta markers.".format(
+            field['field_details']['name'])
+        raise ValueError(msg)
+
+
+def schema_short_override_description(schema: FieldEntry, strict: Optional[bool] = True) -> None:
+    """Rule wrapper for single_line_short_override_description, for reusable field sets only."""
+    if 'reusable' in schema['schema_details']:
+        single_line_short_override_description(schema, strict=strict)
+
 
 # Common Validation Helpers
 
@@ -270,9 +367,26 @@ def single_line_short_check(short_to_check: str, short_name: str) -> Union[str,
     return None
 
 
+# Compiled `pattern` attributes by pattern string. None marks an invalid regular expression.
+_compiled_patterns: Dict[str, Optional[Pattern]] = {}
+
+
+def compiled_pattern(pattern: str) -> Optional[Pattern]:
+    """Return the compiled regular expression, or None if it is invalid. Each pattern is compiled once."""
+    if pattern not in _compiled_patterns:
+        try:
+            _compiled_patterns[pattern] = re.compile(pattern)
+        except re.error:
+            _compiled_patterns[pattern] = None
+    return _compiled_patterns[pattern]
+
+
 def strict_warning_handler(message, strict):
-    """Raise ValueError if strict=True, else issue a warning."""
-    if strict:
+    """Raise ValueError if strict=True, else issue a warning. In report mode, record it instead."""
+    report: Optional[validation_report.ValidationReport] = validation_report.current()
+    if report:
+        report.add('cleaner', validation_report.ERROR if strict else validation_report.WARNING, message)
+    elif strict:
         raise ValueError(message)
     else:
         ecs_helpers.strict_warning(message)
@@ -319,9 +433,10 @@ def check_example_value(field: Union[List, FieldEntry], strict: Optional[bool] =
     else:
         example_values = [example_value]
 
-    if pattern:
+    regex: Optional[Pattern] = compiled_pattern(pattern) if pattern else None
+    if regex:
         for example_value in example_values:
-            match = re.match(pattern, example_value)
+            match = regex.match(example_value)
             if not match:
                 msg = "Example value for field `{}` does not match the regex defined in the pattern attribute: `{}`.".format(
                     name, pattern)
@@ -353,9 +468,110 @@ def single_line_beta_description(schema_or_field: FieldEntry, strict: Optional[b
 
 def validate_pattern_regex(field, strict=True):
     """Validate that the pattern attribute is a syntactically valid regular expression."""
-    try:
-        re.compile(field['pattern'])
-    except re.error:
+    if compiled_pattern(field['pattern']) is None:
         msg = "Pattern value must be a valid regular expression.\n"
         msg += f"Offending field name: {field['name']}"
         strict_warning_handler(msg, strict)
+
+
+# Rule tables
+
+# Each rule is (name, trigger, check). The check runs on a field set or field if the trigger
+# is None or present in its field_details, and is called as check(schema_or_field, strict), with
+# the strict option of the pipeline context.
+# Rules run in table order, one pass per field set or field.
+Rule = Tuple[str, Optional[str], Callable[[FieldEntry, Optional[bool]], None]]
+
+# Run before the cleanup of a field set or field, which relies on what they check
+SCHEMA_MANDATORY_RULES: List[Rule] = [
+    ('mandatory_attributes', None, schema_mandatory_attributes),
+]
+
+FIELD_MANDATORY_RULES: List[Rule] = [
+    ('mandatory_attributes', None, field_mandatory_attributes),
+]
+
+SCHEMA_RULES: List[Rule] = [
+    ('short_description', None, single_line_short_description),
+    ('alpha_description', 'alpha', single_line_alpha_description),
+    ('beta_description', 'beta', single_line_beta_description),
+    ('alpha_and_beta_exclusive', 'alpha', schema_alpha_and_beta_exclusive),
+    ('short_override_description', None, schema_short_override_description),
+]
+
+FIELD_RULES: List[Rule] = [
+    ('short_description', None, single_line_short_description),
+    ('alpha_description', 'alpha', single_line_alpha_description),
+    ('beta_description', 'beta', single_line_beta_description),
+    ('alpha_and_beta_exclusive', 'alpha', field_alpha_and_beta_exclusive),
+    ('pattern_regex', 'pattern', field_pattern_regex),
+    ('example_value', None, check_example_value),
+    ('level', None, field_level),
+]
+
+
+class RuleStats:
+    """Number of calls and total time spent in one validation rule."""
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.seconds: float = 0.0
+
+
+def run_rules(rules: List[Rule], schema_or_field: FieldEntry, kind: str, collect: bool = True) -> None:
+    """Run the applicable rules of a rule table on a field set or field.
+
+    kind ('schema' or 'field') prefixes the rule names in the rule_stats of the pipeline context,
+    when timing is enabled. With collect=False, errors are raised even in report mode, e.g. for
+    checks the rest of the cleanup depends on.
+    """
+    field_details = schema_or_field['field_details']
+    context: pipeline_context.PipelineContext = pipeline_context.current()
+    strict: bool = context.strict
+    rule_stats: Optional[Dict[str, RuleStats]] = context.rule_stats
+    if context.report and collect:
+        # Report mode: run every rule, even after one failed
+        for (_, trigger, check) in rules:
+            if trigger is None or trigger in field_details:
+                with validation_report.collect('cleaner'):
+                    check(schema_or_field, strict)
+        return
+    if rule_stats is None:
+        for (_, trigger, check) in rules:
+            if trigger is None or trigger in field_details:
+                check(schema_or_field, strict)
+        return
+    for (name, trigger, check) in rules:
+        if trigger is not None and trigger not in field_details:
+            continue
+        stats: Optional[RuleStats] = rule_stats.get(kind + '.' + name)
+        if stats is None:
+            stats = rule_stats[kind + '.' + name] = RuleStats()
+        start: float = time.perf_counter()
+        try:
+            check(schema_or_field, strict)
+        finally:
+            stats.calls += 1
+            stats.seconds += time.perf_counter() - start
+
+
+def enable_rule_stats() -> None:
+    """Start timing the rules of the current pipeline context, from zero.
+
+    The counters are keyed by 'schema.<rule name>' and 'field.<rule name>'.
+    """
+    pipeline_context.ensure().rule_stats = {}
+
+
+def disable_rule_stats() -> None:
+    """Stop timing the rules."""
+    pipeline_context.current().rule_stats = None
+
+
+def format_rule_stats() -> str:
+    """Return a table of the rule timing counters, most expensive rule first."""
+    rule_stats: Dict[str, RuleStats] = pipeline_context.current().rule_stats or {}
+    lines: List[str] = ['{:<40} {:>8} {:>10}'.format('rule', 'calls', 'ms')]
+    for (name, stats) in sorted(rule_stats.items(), key=lambda item: -item[1].seconds):
+        lines.append('{:<40} {:>8} {:>10.2f}'.format(name, stats.calls, stats.seconds * 1000))
+    return '\n'.join(lines)
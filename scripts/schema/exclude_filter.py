@@ -25,8 +25,10 @@ Parent fields are auto-removed when emptied, except 'base'. Runs after subset fi
 from typing import (
     Dict,
     List,
+    Optional,
 )
 
+from schema import field_index
 from schema import loader
 from ecs_types import (
     Field,
@@ -51,37 +53,36 @@ def long_path(path_as_list: List[str]) -> str:
 
 
 def pop_field(
-    fields: Dict[str, FieldEntry],
-    node_path: List[str],
+    index: field_index.FieldIndex,
     path: List[str],
     removed: List[str]
-) -> str:
-    """Remove field at node_path, auto-removing empty parents (except 'base'). Returns flat_name removed."""
-    if node_path[0] in fields:
-        if len(node_path) == 1:
-            flat_name: str = long_path(path)
-            fields.pop(node_path[0])
-            return flat_name
-        else:
-            inner_field: str = node_path.pop(0)
-            if 'fields' in fields[inner_field]:
-                popped: str = pop_field(fields[inner_field]['fields'], node_path, path, removed)
-                # if object field with no remaining fields and not 'base', pop it
-                if fields[inner_field]['fields'] == {} and inner_field != 'base':
-                    fields.pop(inner_field)
-                return popped
-            else:
-                raise ValueError(
-                    '--exclude specified, but no path to field {} found'.format(long_path(path)))
-    else:
-        this_long_path: str = long_path(path)
-        # Check in case already removed parent
-        if not any([this_long_path.startswith(long_path) for long_path in removed if long_path != None]):
-            raise ValueError('--exclude specified, but no field {} found'.format(this_long_path))
+) -> Optional[str]:
+    """Remove field at path, auto-removing empty parents (except 'base'). Returns flat_name removed.
+
+    Returns None if the field was already removed along with one of its parents.
+    """
+    flat_name: str = long_path(path)
+    for depth in range(1, len(path) + 1):
+        entry: Optional[FieldEntry] = index.get(long_path(path[:depth]))
+        if entry is None:
+            # Check in case already removed parent
+            if not any([flat_name.startswith(long_path) for long_path in removed if long_path != None]):
+                raise ValueError('--exclude specified, but no field {} found'.format(flat_name))
+            return None
+        if depth < len(path) and 'fields' not in entry:
+            raise ValueError('--exclude specified, but no path to field {} found'.format(flat_name))
+    index.remove(flat_name)
+    # if object field with no remaining fields and not 'base', pop it
+    for depth in range(len(path) - 1, 0, -1):
+        parent: List[str] = path[:depth]
+        if parent[-1] == 'base' or index.get(long_path(parent))['fields'] != {}:
+            break
+        index.remove(long_path(parent))
+    return flat_name
 
 
 def exclude_trace_path(
-    fields: Dict[str, FieldEntry],
+    index: field_index.FieldIndex,
     item: List[Field],
     path: List[str],
     removed: List[str]
@@ -94,10 +95,10 @@ def exclude_trace_path(
             node_path.append(name)
         if not 'fields' in list_item:
             parent: str = node_path[0]
-            removed.append(pop_field(fields, node_path, node_path.copy(), removed))
+            removed.append(pop_field(index, node_path, removed))
             # if parent field has no remaining fields and not 'base', pop it
-            if parent != 'base' and parent in fields and len(fields[parent]['fields']) == 0:
-                fields.pop(parent)
+            if parent != 'base' and parent in index.fields and len(index.fields[parent]['fields']) == 0:
+                index.remove(parent)
         else:
             raise ValueError('--exclude specified, can\'t parse fields in file {}'.format(item))
 
@@ -105,9 +106,10 @@ def exclude_trace_path(
 def exclude_fields(fields: Dict[str, FieldEntry], excludes: List[FieldNestedEntry]) -> Dict[str, FieldEntry]:
     """Apply all exclude definitions, removing each specified field and cleaning up empty parents."""
     if excludes:
+        index = field_index.FieldIndex(fields)
         for ex_list in excludes:
             for item in ex_list:
-                exclude_trace_path(fields, item['fields'], [item['name']], [])
+                exclude_trace_path(index, item['fields'], [item['name']], [])
     return fields
 
 
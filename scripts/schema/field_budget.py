@@ -0,0 +1,209 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Field Budget Module.
+
+Predicts how many fields reuse will produce (generator.py --max-fields), before finalizer.py
+copies anything, so a schema change that blows up the mapping fails in milliseconds.
+
+The prediction replays the reuse graph of finalizer.build_reuse_graph on numbers: each reuse
+adds the current field counts of the reused fieldset to its destination. The only structure
+looked at is what was at the location of a reuse already (the placed fieldset replaces it,
+and a leaf location turns into an object), which is resolved through the earlier reuses and
+the cleaned (not yet reused) fieldsets.
+
+Counts are of the whole schema, before subset and exclude filters.
+"""
+
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from schema import finalizer
+from ecs_types import (
+    FieldEntry,
+)
+
+
+class FieldCounts:
+    """Numbers of leaf fields, multi-fields and object nodes (fields with nested fields).
+
+    Their total is what Elasticsearch's index.mapping.total_fields.limit counts.
+    """
+
+    def __init__(self, leaves: int = 0, multi_fields: int = 0, objects: int = 0):
+        self.leaves = leaves
+        self.multi_fields = multi_fields
+        self.objects = objects
+
+    @property
+    def total(self) -> int:
+        return self.leaves + self.multi_fields + self.objects
+
+    def add(self, other: 'FieldCounts') -> None:
+        self.leaves += other.leaves
+        self.multi_fields += other.multi_fields
+        self.objects += other.objects
+
+    def subtract(self, other: 'FieldCounts') -> None:
+        self.leaves -= other.leaves
+        self.multi_fields -= other.multi_fields
+        self.objects -= other.objects
+
+    def copy(self) -> 'FieldCounts':
+        return FieldCounts(self.leaves, self.multi_fields, self.objects)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FieldCounts) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return 'FieldCounts(leaves={}, multi_fields={}, objects={})'.format(
+            self.leaves, self.multi_fields, self.objects)
+
+
+# One reuse into a fieldset: (step, location relative to the fieldset, reused fieldset,
+# step of the reused fieldset's state that was copied, counts of the placed node, change of the fieldset's counts)
+Placement = Tuple[int, str, str, int, FieldCounts, FieldCounts]
+
+
+def count_fields(fields: Dict[str, FieldEntry]) -> FieldCounts:
+    """Count the fields of a field tree as it is, e.g. after reuse. Root fieldsets don't count themselves."""
+    counts = FieldCounts()
+    for details in fields.values():
+        if 'schema_details' in details and details['schema_details'].get('root'):
+            count_nested(details.get('fields', {}), '', counts)
+        else:
+            count_nested({details['field_details']['name']: details}, '', counts)
+    return counts
+
+
+def count_nested(
+    fields: Dict[str, FieldEntry],
+    prefix: str,
+    counts: FieldCounts,
+    nodes: Optional[Dict[str, FieldCounts]] = None
+) -> None:
+    """Add the counts of fields to counts. Records in nodes the counts of each path, nested fields included."""
+    for (name, details) in fields.items():
+        node = FieldCounts(multi_fields=len(details['field_details'].get('multi_fields', [])))
+        if details.get('fields'):
+            node.objects += 1
+            count_nested(details['fields'], prefix + name + '.', node, nodes)
+        else:
+            node.leaves += 1
+        counts.add(node)
+        if nodes is not None:
+            nodes[prefix + name] = node
+
+
+def predict(fields: Dict[str, FieldEntry], partial: bool = False) -> FieldCounts:
+    """Return the counts fields will have once finalized (see finalizer.finalize), without performing reuse.
+
+    Raises ValueError on reuse cycles, like finalizer.perform_reuse.
+    """
+    total = FieldCounts()
+    for counts in predict_fieldsets(fields, partial).values():
+        total.add(counts)
+    return total
+
+
+def predict_fieldsets(fields: Dict[str, FieldEntry], partial: bool = False) -> Dict[str, FieldCounts]:
+    """Return the counts of each fieldset once finalized, including the fieldset itself unless it's root=true."""
+    counts: Dict[str, FieldCounts] = {}
+    nodes: Dict[str, Dict[str, FieldCounts]] = {}
+    for (schema_name, schema) in fields.items():
+        counts[schema_name] = FieldCounts()
+        nodes[schema_name] = {}
+        count_nested(schema.get('fields', {}), '', counts[schema_name], nodes[schema_name])
+    placements: Dict[str, List[Placement]] = {schema_name: [] for schema_name in fields}
+
+    def node_counts(schema_name: str, path: str, before: int) -> Optional[FieldCounts]:
+        """Counts of the node at path in the fieldset before the given step, or None if there is none."""
+        for (step, full, source, source_step, placed, change) in reversed(placements[schema_name]):
+            if step >= before:
+                continue
+            if path == full:
+                return placed
+            if path.startswith(full + '.'):
+                return node_counts(source, path[len(full) + 1:], source_step)
+            if full.startswith(path + '.'):
+                # Placed within path: path as it was before, plus what the placement changed
+                node: Optional[FieldCounts] = node_counts(schema_name, path, step)
+                if node is not None:
+                    node = node.copy()
+                    node.add(change)
+                return node
+        return nodes[schema_name].get(path)
+
+    step: int = 0
+    tasks = finalizer.build_reuse_graph(fields, partial)
+    for task in sorted(tasks, key=lambda task: task.sequence):
+        schema = fields[task.schema_name]
+        # Self-nestings all copy the fieldset as it was before the first of them
+        source_step: int = step
+        reused: FieldCounts = counts[task.schema_name].copy()
+        for reuse_entry in task.reuse_entries:
+            if not task.self_nesting:
+                source_step = step
+                reused = counts[task.schema_name].copy()
+            at: str = reuse_entry['at'].partition('.')[2]
+            full: str = at + '.' + reuse_entry['as'] if at else reuse_entry['as']
+            placed: FieldCounts = reused.copy()
+            if reused.total:
+                placed.objects += 1
+            else:
+                placed.leaves += 1
+            placed.multi_fields += len(schema['field_details'].get('multi_fields', []))
+            change: FieldCounts = placed.copy()
+            # The placed node replaces whatever was at its location
+            replaced: Optional[FieldCounts] = node_counts(task.destination_schema_name, full, step)
+            if replaced is not None:
+                change.subtract(replaced)
+            if at:
+                location: Optional[FieldCounts] = node_counts(task.destination_schema_name, at, step)
+                if location is not None and not location.objects:
+                    # The location turns from a leaf into an object
+                    change.leaves -= 1
+                    change.objects += 1
+            counts[task.destination_schema_name].add(change)
+            placements[task.destination_schema_name].append(
+                (step, full, task.schema_name, source_step, placed, change))
+            step += 1
+
+    for (schema_name, schema) in fields.items():
+        if not schema['schema_details'].get('root'):
+            fieldset_counts: FieldCounts = counts[schema_name]
+            if fieldset_counts.total:
+                fieldset_counts.objects += 1
+            else:
+                fieldset_counts.leaves += 1
+            fieldset_counts.multi_fields += len(schema['field_details'].get('multi_fields', []))
+    return counts
+
+
+def check(fields: Dict[str, FieldEntry], max_fields: Optional[int], partial: bool = False) -> FieldCounts:
+    """Predict the field counts, and raise ValueError if their total is over max_fields (if set)."""
+    counts: FieldCounts = predict(fields, partial)
+    if max_fields is not None and counts.total > max_fields:
+        raise ValueError(
+            'Reuse would produce {} fields ({} leaf fields, {} multi-fields, {} objects), over the budget of {} '
+            '(--max-fields). See --reuse-profile for the reuses adding the most fields.'.format(
+                counts.total, counts.leaves, counts.multi_fields, counts.objects, max_fields))
+    return counts
@@ -0,0 +1,135 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Field Index Module.
+
+Dotted-path index over the nested field structure ({name: {'field_details': ..., 'fields': {...}}}),
+shared by finalizer.py (placing reused fieldsets) and exclude_filter.py (removing fields).
+
+Entries are indexed as they are first looked up, from the closest indexed parent, so a path
+is only walked once. The index is a trie: removing or replacing an entry drops its indexed
+children with it. Fields must be inserted and removed through the index while it's in use.
+"""
+
+from typing import (
+    Dict,
+    Optional,
+    Set,
+)
+
+from ecs_types import (
+    FieldEntry,
+)
+
+
+class FieldIndex:
+    """Index of the field entries of fields, by dotted path (e.g. 'process.parent.pid')."""
+
+    def __init__(self, fields: Dict[str, FieldEntry]):
+        self.fields = fields
+        self.entries: Dict[str, FieldEntry] = {}
+        # Dotted path ('' for the top level) -> names of its indexed children
+        self.children: Dict[str, Set[str]] = {}
+
+    def get(self, path: str) -> Optional[FieldEntry]:
+        """Return the field entry at path, or None if there is none."""
+        entry: Optional[FieldEntry] = self.entries.get(path)
+        if entry is None:
+            parent_path, _, name = path.rpartition('.')
+            nesting: Optional[Dict[str, FieldEntry]] = self.nesting(parent_path)
+            entry = nesting.get(name) if nesting else None
+            if entry is not None:
+                self.entries[path] = entry
+                self.children.setdefault(parent_path, set()).add(name)
+        return entry
+
+    def nesting(self, path: str) -> Optional[Dict[str, FieldEntry]]:
+        """Return the 'fields' dict of the entry at path (the top level for ''), or None if there is none."""
+        if not path:
+            return self.fields
+        entry: Optional[FieldEntry] = self.get(path)
+        return entry.get('fields') if entry else None
+
+    def field_group(self, path: str) -> Dict[str, FieldEntry]:
+        """Return the 'fields' dict of the entry at path. Creates it for object/group/nested types.
+
+        Raises ValueError if path is missing or passes through a non-nestable field type.
+        """
+        entry: Optional[FieldEntry] = self.get(path)
+        if not entry:
+            raise self.unreachable(path)
+        nesting: Optional[Dict[str, FieldEntry]] = entry.get('fields', None)
+        if not nesting:
+            field_type: str = entry['field_details']['type']
+            if field_type in ['object', 'group', 'nested']:
+                nesting = entry['fields'] = {}
+            else:
+                raise ValueError("Field {} (type {}) already exists and cannot have nested fields".format(
+                    path, field_type))
+        return nesting
+
+    def unreachable(self, path: str) -> ValueError:
+        """Return the error for a path field_group can't find, walking down to where it stops."""
+        nesting: Dict[str, FieldEntry] = self.fields
+        for name in path.split('.'):
+            field: Optional[FieldEntry] = nesting.get(name, None)
+            if not field:
+                return ValueError("Field {} not found, failed to find {}".format(path, name))
+            nesting = field.get('fields', None)
+            if not nesting:
+                field_type: str = field['field_details']['type']
+                if field_type in ['object', 'group', 'nested']:
+                    nesting = field['fields'] = {}
+                else:
+                    return ValueError("Field {} (type {}) already exists and cannot have nested fields".format(
+                        path, field_type))
+        return ValueError("Field {} not found".format(path))
+
+    def insert(self, parent_path: str, name: str, entry: FieldEntry) -> None:
+        """Place entry as name in the field group at parent_path (see field_group), replacing what's there.
+
+        name may contain dots (e.g. reused 'as: relationships.owns'); the entry is then only indexed
+        under parent_path + '.' + name.
+        """
+        nesting: Dict[str, FieldEntry] = self.field_group(parent_path) if parent_path else self.fields
+        self.forget(parent_path, name)
+        nesting[name] = entry
+        self.entries[join(parent_path, name)] = entry
+        self.children.setdefault(parent_path, set()).add(name)
+
+    def remove(self, path: str) -> FieldEntry:
+        """Remove the field entry at path and return it. Raises KeyError if there is none."""
+        parent_path, _, name = path.rpartition('.')
+        nesting: Optional[Dict[str, FieldEntry]] = self.nesting(parent_path)
+        if not nesting or name not in nesting:
+            raise KeyError(path)
+        self.forget(parent_path, name)
+        return nesting.pop(name)
+
+    def forget(self, parent_path: str, name: str) -> None:
+        """Drop the entry name under parent_path and its indexed children from the index (not from the fields)."""
+        self.children.get(parent_path, set()).discard(name)
+        pending = [join(parent_path, name)]
+        while pending:
+            path = pending.pop()
+            self.entries.pop(path, None)
+            pending.extend(path + '.' + child for child in self.children.pop(path, ()))
+
+
+def join(parent_path: str, name: str) -> str:
+    """Return the dotted path of name under parent_path ('' for the top level)."""
+    return parent_path + '.' + name if parent_path else name
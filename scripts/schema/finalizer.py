@@ -27,106 +27,283 @@ Two-phase reuse:
 - Phase 2 (self-nesting): Copy fieldset into itself (e.g., process → process.parent).
   NOT transitive — 'source.process.parent' does not exist even though process.parent does.
 
-The 'order' attribute controls sequence: order=1 runs before order=2 (default). Within each
-order, Phase 1 runs before Phase 2.
-
-After reuse: calculates flat_name, dashed_name, and multi-field flat_names for all fields.
+The reuses form a dependency graph (build_reuse_graph): a reuse depends on the earlier reuses
+into the fieldset it copies, or into the same location, in sequence: order=1 runs before
+order=2 (default), and within each order Phase 1 runs before Phase 2. Reuses run in graph order
+(reuse_order), ties broken by sequence, which sets the order of the fields in each fieldset
+that the artifacts follow.
+Cycles and root=true violations are reported before anything is copied.
+
+Calculates flat_name, dashed_name, and multi-field flat_names for all fields as they are placed:
+the defined fields before reuse, and each copy as reuse creates it.
 """
 
 import copy
+import heapq
+import json
 import re
+import sys
+import threading
+import time
+import tracemalloc
+
+from schema import field_index
+from schema import pipeline_context
+from schema import validation_report
+from ecs_types import CompactFieldDetails
+
 
-from schema import visitor
+def finalize(fields, partial=False, compact=False):
+    """Perform reuse and calculate final field names (flat_name, dashed_name).
 
+    With partial=True, fields only holds some of the fieldsets (see subset_filter.prune_unused_fieldsets)
+    and reuses into fieldsets that aren't loaded are skipped.
+    With compact=True, reused fields are CompactFieldDetails (see reuse_copy).
+    """
+    with_otel_reuse = []
+    name_fields(fields, '', '', with_otel_reuse)
+    perform_reuse(fields, partial, with_otel_reuse, compact)
+    # Only needed until the last copy is made. Compact copies lose it along with the definition they share.
+    for field_details in with_otel_reuse:
+        field_details.pop('otel_reuse', None)
 
-def finalize(fields):
-    """Perform reuse and calculate final field names (flat_name, dashed_name)."""
-    perform_reuse(fields)
-    calculate_final_values(fields)
 
+class ReuseTask:
+    """A node of the reuse graph.
 
-def order_reuses(fields):
-    """Return (foreign_reuses, self_nestings) each as {order: {schema_name: [reuse_entries]}}.
+    Either the foreign reuse of schema_name at one location of another fieldset (one entry in
+    reuse_entries), or all self-nestings of schema_name (reuse_entries in the order they are listed).
+    """
 
-    Foreign reuses go to a different fieldset; self_nestings stay within the same fieldset.
+    def __init__(self, index, schema_name, destination_schema_name, reuse_entries, order):
+        self.index = index
+        self.schema_name = schema_name
+        self.destination_schema_name = destination_schema_name
+        self.reuse_entries = reuse_entries
+        self.order = order
+        # Indices of the tasks that must run before this one
+        self.depends_on = set()
+
+    @property
+    def self_nesting(self):
+        return self.schema_name == self.destination_schema_name
+
+    @property
+    def sequence(self):
+        """Sort key: by order, foreign reuses before self-nestings, then as defined."""
+        return (self.order, self.self_nesting, self.index)
+
+    def overlaps(self, other):
+        """Return True if the two tasks write into the same location of their destination."""
+        return any(within(entry['at'], other_entry['full']) or within(other_entry['at'], entry['full'])
+                   for entry in self.reuse_entries for other_entry in other.reuse_entries)
+
+    def __repr__(self):
+        return '{} at {}'.format(self.schema_name, ', '.join(entry['full'] for entry in self.reuse_entries))
+
+
+def build_reuse_graph(fields, partial=False):
+    """Return the reuse tasks of fields, each with the indices of the tasks it depends on.
+
+    A task reads its fieldset (it copies all of it) and writes into its destination. Two tasks
+    depend on each other if one writes the fieldset the other reads, or both write into the same
+    location. Such tasks keep their sequence (see ReuseTask.sequence): a reuse carries what was
+    reused into the fieldset earlier in the sequence (group, order 1 → user → destination.user),
+    and self-nestings don't propagate (source.process.parent doesn't exist). Other tasks are
+    independent of each other.
+
+    With partial=True, reuses into fieldsets absent from fields are left out.
+    Raises ValueError if fieldsets are reused into each other.
     """
-    foreign_reuses = {}
-    self_nestings = {}
+    tasks = []
     for schema_name, schema in fields.items():
         if not 'reusable' in schema['schema_details']:
             continue
-        reuse_order = schema['schema_details']['reusable']['order']
-        for reuse_entry in schema['schema_details']['reusable']['expected']:
+        reusable = schema['schema_details']['reusable']
+        self_nestings = []
+        for reuse_entry in reusable['expected']:
             destination_schema_name = reuse_entry['full'].split('.')[0]
+            if partial and destination_schema_name not in fields:
+                continue
             if destination_schema_name == schema_name:
-                # Accumulate self-nestings for phase 2.
-                self_nestings.setdefault(reuse_order, {})
-                self_nestings[reuse_order].setdefault(destination_schema_name, [])
-                self_nestings[reuse_order][destination_schema_name].extend([reuse_entry])
+                self_nestings.append(reuse_entry)
+            else:
+                tasks.append(ReuseTask(len(tasks), schema_name, destination_schema_name, [reuse_entry],
+                                       reusable['order']))
+        if self_nestings:
+            tasks.append(ReuseTask(len(tasks), schema_name, schema_name, self_nestings, reusable['order']))
+    ensure_no_reuse_cycle(tasks)
+
+    readers = {}
+    writers = {}
+    for task in tasks:
+        readers.setdefault(task.schema_name, []).append(task)
+        writers.setdefault(task.destination_schema_name, []).append(task)
+    for schema_name, schema_writers in writers.items():
+        for writer in schema_writers:
+            conflicts = [reader for reader in readers.get(schema_name, []) if reader is not writer]
+            conflicts += [other for other in schema_writers if other is not writer and writer.overlaps(other)]
+            for other in conflicts:
+                (first, then) = (writer, other) if writer.sequence < other.sequence else (other, writer)
+                then.depends_on.add(first.index)
+    return tasks
+
+
+def within(path, location):
+    """Return True if dotted path is location or under it."""
+    return path == location or path.startswith(location + '.')
+
+
+def ensure_no_reuse_cycle(tasks):
+    """Raise ValueError if fieldsets are reused into each other, directly or through other fieldsets."""
+    reused_in = {}
+    for task in tasks:
+        if not task.self_nesting:
+            reused_in.setdefault(task.schema_name, set()).add(task.destination_schema_name)
+
+    visited = set()
+    for start in sorted(reused_in):
+        # Depth-first, with the path from start on the stack
+        path = [start]
+        stack = [iter(sorted(reused_in[start]))]
+        while stack:
+            schema_name = next(stack[-1], None)
+            if schema_name is None:
+                visited.add(path.pop())
+                stack.pop()
+            elif schema_name in path:
+                cycle = path[path.index(schema_name):] + [schema_name]
+                raise ValueError('Reuse cycle between field sets: {}'.format(' -> '.join(cycle)))
+            elif schema_name not in visited:
+                path.append(schema_name)
+                stack.append(iter(sorted(reused_in.get(schema_name, []))))
+
+
+def reuse_order(tasks):
+    """Return tasks in graph order: each task after the tasks it depends on.
+
+    Among the tasks whose dependencies have run, the first in sequence runs next (see
+    ReuseTask.sequence), which keeps the order of the fields in each fieldset. Raises ValueError
+    if the dependencies can't be satisfied.
+    """
+    by_index = {task.index: task for task in tasks}
+    waiting_on = {task.index: set(task.depends_on) for task in tasks}
+    dependents = {}
+    for task in tasks:
+        for dependency in task.depends_on:
+            dependents.setdefault(dependency, []).append(task.index)
+    ready = [(task.sequence, task.index) for task in tasks if not task.depends_on]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        (_, task_index) = heapq.heappop(ready)
+        ordered.append(by_index[task_index])
+        for dependent in dependents.get(task_index, []):
+            waiting_on[dependent].discard(task_index)
+            if not waiting_on[dependent]:
+                heapq.heappush(ready, (by_index[dependent].sequence, dependent))
+    if len(ordered) != len(tasks):
+        blocked = [by_index[index] for index in sorted(waiting_on) if waiting_on[index]]
+        raise ValueError('Reuses depend on each other: {}'.format(', '.join(repr(task) for task in blocked)))
+    return ordered
+
+
+def perform_reuse(fields, partial=False, with_otel_reuse=None, compact=False):
+    """Execute all field reuse, in graph order (see reuse_order).
+
+    Cycles, reuses into missing fieldsets and root=true violations raise ValueError before
+    anything is copied.
+    If with_otel_reuse is a list, the copies are named for their location as they are made
+    (see name_field), and the fields with otel_reuse are appended to it.
+    compact is passed on to reuse_copy.
+    """
+    tasks = build_reuse_graph(fields, partial)
+    # In report mode, invalid reuses are recorded and skipped
+    skipped = set()
+    for task in tasks:
+        skipped.add(task.index)
+        with validation_report.collect('finalizer'):
+            if task.self_nesting:
+                ensure_valid_reuse(fields[task.schema_name])
+            else:
+                ensure_reuse_destination(fields, task)
+                ensure_valid_reuse(fields[task.schema_name], fields[task.destination_schema_name])
+            skipped.discard(task.index)
+
+    index = field_index.FieldIndex(fields)
+    performed = []
+    for task in reuse_order(tasks):
+        if task.index in skipped:
+            continue
+        with validation_report.collect('finalizer'):
+            if task.self_nesting:
+                perform_self_nestings(fields, task.schema_name, task.reuse_entries, with_otel_reuse, index, compact)
             else:
-                # Group foreign reuses by 'order' attribute.
-                foreign_reuses.setdefault(reuse_order, {})
-                foreign_reuses[reuse_order].setdefault(schema_name, [])
-                foreign_reuses[reuse_order][schema_name].extend([reuse_entry])
-    return foreign_reuses, self_nestings
-
-
-def perform_reuse(fields):
-    """Execute all field reuse, processing each order level with Phase 1 (foreign) then Phase 2 (self-nesting)."""
-    foreign_reuses, self_nestings = order_reuses(fields)
-
-    # Process foreign reuses and self-nestings together, respecting order
-    all_orders = sorted(set(list(foreign_reuses.keys()) + list(self_nestings.keys())))
-
-    for order in all_orders:
-        # Phase 1: foreign reuse for this order
-        if order in foreign_reuses:
-            for schema_name, reuse_entries in foreign_reuses[order].items():
-                schema = fields[schema_name]
-                for reuse_entry in reuse_entries:
-                    nest_as = reuse_entry['as']
-                    destination_schema_name = reuse_entry['full'].split('.')[0]
-                    destination_schema = fields[destination_schema_name]
-                    ensure_valid_reuse(schema, destination_schema)
-
-                    new_field_details = copy.deepcopy(schema['field_details'])
-                    new_field_details['name'] = nest_as
-                    new_field_details['original_fieldset'] = schema_name
-                    new_field_details['intermediate'] = True
-                    reused_fields = copy.deepcopy(schema['fields'])
-                    set_original_fieldset(reused_fields, schema_name)
-                    destination_fields = field_group_at_path(reuse_entry['at'], fields)
-                    destination_fields[nest_as] = {
-                        'field_details': new_field_details,
-                        'fields': reused_fields,
-                    }
-                    append_reused_here(schema, reuse_entry, destination_schema)
-
-        # Phase 2: self-nesting for this order
-        if order in self_nestings:
-            for schema_name, reuse_entries in self_nestings[order].items():
-                schema = fields[schema_name]
-                ensure_valid_reuse(schema)
-                # Since we're about self-nest more fields within these, make a pristine copy first
-                reused_fields = copy.deepcopy(schema['fields'])
-                set_original_fieldset(reused_fields, schema_name)
-                for reuse_entry in reuse_entries:
-                    nest_as = reuse_entry['as']
-                    new_field_details = copy.deepcopy(schema['field_details'])
-                    new_field_details['name'] = nest_as
-                    new_field_details['original_fieldset'] = schema_name
-                    new_field_details['intermediate'] = True
-                    # to handle multi-level self-nesting
-                    if reuse_entry['at'] != schema_name:
-                        destination_fields = field_group_at_path(reuse_entry['at'], fields)
-                    else:
-                        destination_fields = schema['fields']
-                    destination_fields[nest_as] = {
-                        'field_details': new_field_details,
-                        # Make a new copy of the pristine copy
-                        'fields': copy.deepcopy(reused_fields),
-                    }
-                    append_reused_here(schema, reuse_entry, fields[schema_name])
+                perform_foreign_reuse(fields, task.schema_name, fields[task.schema_name], task.reuse_entries[0],
+                                      with_otel_reuse, index, compact)
+            performed.append(task)
+
+    for task in performed:
+        for reuse_entry in task.reuse_entries:
+            append_reused_here(fields[task.schema_name], reuse_entry, fields[task.destination_schema_name])
+
+
+def perform_foreign_reuse(fields, schema_name, schema, reuse_entry, with_otel_reuse=None, index=None, compact=False):
+    """Phase 1: copy fieldset schema_name to the location of reuse_entry in another fieldset.
+
+    index is the FieldIndex of fields, if the caller keeps one.
+    """
+    if index is None:
+        index = field_index.FieldIndex(fields)
+    stats = start_reuse_stats(schema_name, reuse_entry)
+    nest_as = reuse_entry['as']
+    new_field_details = copy.deepcopy(schema['field_details'])
+    new_field_details['name'] = nest_as
+    new_field_details['original_fieldset'] = schema_name
+    new_field_details['intermediate'] = True
+    prefix = None
+    if with_otel_reuse is not None:
+        name_field(new_field_details, reuse_entry['at'] + '.', dashed(reuse_entry['at'] + '.'), with_otel_reuse)
+        prefix = reuse_entry['full'] + '.'
+    reused_fields = reuse_copy(schema['fields'], schema_name, prefix, with_otel_reuse, compact=compact)
+    index.insert(reuse_entry['at'], nest_as, {
+        'field_details': new_field_details,
+        'fields': reused_fields,
+    })
+    if stats:
+        stats.finish(reused_fields)
+
+
+def perform_self_nestings(fields, schema_name, reuse_entries, with_otel_reuse=None, index=None, compact=False):
+    """Phase 2: nest copies of fieldset schema_name within itself, at each of reuse_entries.
+
+    index is the FieldIndex of fields, if the caller keeps one.
+    """
+    if index is None:
+        index = field_index.FieldIndex(fields)
+    schema = fields[schema_name]
+    # Since we're about self-nest more fields within these, make a pristine copy first
+    reused_fields = reuse_copy(schema['fields'], schema_name, compact=compact)
+    for reuse_entry in reuse_entries:
+        stats = start_reuse_stats(schema_name, reuse_entry)
+        nest_as = reuse_entry['as']
+        new_field_details = copy.deepcopy(schema['field_details'])
+        new_field_details['name'] = nest_as
+        new_field_details['original_fieldset'] = schema_name
+        new_field_details['intermediate'] = True
+        prefix = None
+        if with_otel_reuse is not None:
+            name_field(new_field_details, reuse_entry['at'] + '.', dashed(reuse_entry['at'] + '.'), with_otel_reuse)
+            prefix = reuse_entry['full'] + '.'
+        # Make a new copy of the pristine copy
+        nested_fields = reuse_copy(reused_fields, schema_name, prefix, with_otel_reuse, compact=compact)
+        # Also handles multi-level self-nesting (e.g. at process.parent)
+        index.insert(reuse_entry['at'], nest_as, {
+            'field_details': new_field_details,
+            'fields': nested_fields,
+        })
+        if stats:
+            stats.finish(nested_fields)
 
 
 def ensure_valid_reuse(reused_schema, destination_schema=None):
@@ -141,6 +318,14 @@ def ensure_valid_reuse(reused_schema, destination_schema=None):
         raise ValueError(msg)
 
 
+def ensure_reuse_destination(fields, task):
+    """Raise ValueError if the destination of a foreign reuse task isn't a fieldset of fields."""
+    if task.destination_schema_name not in fields:
+        msg = "Schema {} is reused at {}, but there is no field set {}.".format(
+            task.schema_name, task.reuse_entries[0]['full'], task.destination_schema_name)
+        raise ValueError(msg)
+
+
 def append_reused_here(reused_schema, reuse_entry, destination_schema):
     """Record reuse metadata on destination_schema: appends to 'nestings' (legacy) and 'reused_here'."""
     # Legacy, too limited
@@ -168,61 +353,215 @@ def append_reused_here(reused_schema, reuse_entry, destination_schema):
     destination_schema['schema_details']['reused_here'].extend([reused_here_entry])
 
 
-def set_original_fieldset(fields, original_fieldset):
-    """Recursively stamp all fields with original_fieldset (uses setdefault, preserves nested values)."""
-    def func(details):
+def reuse_copy(fields, original_fieldset, prefix=None, with_otel_reuse=None, dashed_prefix=None, compact=False):
+    """Return a copy of fields for one reuse location, with all fields stamped with original_fieldset.
+
+    Only what is modified per location is copied: the nodes and their 'fields' dicts, each
+    field_details dict (shallowly) and the multi_fields entries, which get their own flat_name.
+    All other values (descriptions, normalize, allowed_values, otel_reuse, ...) are shared with
+    the reused definitions, so they must not be modified in place once reuse has started.
+
+    With a prefix (the location followed by a dot, e.g. 'destination.user.'), the copies are named.
+    With compact=True, field_details are copied as CompactFieldDetails, which only hold what differs
+    per location and read everything else from the definition.
+    """
+    if prefix is not None and dashed_prefix is None:
+        dashed_prefix = dashed(prefix)
+    copied = {}
+    for (name, details) in fields.items():
+        if compact:
+            field_details = CompactFieldDetails(details['field_details'])
+        else:
+            field_details = details['field_details'].copy()
         # Don't override if already set (e.g. 'group' for user.group.* fields)
-        details['field_details'].setdefault('original_fieldset', original_fieldset)
-    visitor.visit_fields(fields, field_func=func)
+        field_details.setdefault('original_fieldset', original_fieldset)
+        if 'multi_fields' in field_details:
+            field_details['multi_fields'] = [mf.copy() for mf in field_details['multi_fields']]
+        if prefix is not None:
+            name_field(field_details, prefix, dashed_prefix, with_otel_reuse)
+        copied_details = details.copy()
+        copied_details['field_details'] = field_details
+        if 'fields' in details:
+            if prefix is None:
+                copied_details['fields'] = reuse_copy(details['fields'], original_fieldset, compact=compact)
+            else:
+                copied_details['fields'] = reuse_copy(details['fields'], original_fieldset,
+                                                      sys.intern(prefix + name + '.'), with_otel_reuse,
+                                                      dashed_prefix + dashed(name) + '-', compact)
+        copied[name] = copied_details
+    return copied
 
 
-def field_group_at_path(dotted_path, fields):
+def field_group_at_path(dotted_path, fields, index=None):
     """Return the 'fields' dict at the given dotted path. Creates it for object/group/nested types.
 
     Raises ValueError if path is missing or passes through a non-nestable field type.
     """
-    path = dotted_path.split('.')
-    nesting = fields
-    for next_field in path:
-        field = nesting.get(next_field, None)
-        if not field:
-            raise ValueError("Field {} not found, failed to find {}".format(dotted_path, next_field))
-        nesting = field.get('fields', None)
-        if not nesting:
-            field_type = field['field_details']['type']
-            if field_type in ['object', 'group', 'nested']:
-                nesting = field['fields'] = {}
+    if index is None:
+        index = field_index.FieldIndex(fields)
+    return index.field_group(dotted_path)
+
+
+def name_fields(fields, prefix, dashed_prefix, with_otel_reuse=None):
+    """Name all fields under prefix (see name_field). Root fieldsets (root=true) don't add their name."""
+    for (name, details) in fields.items():
+        if 'field_details' in details:
+            name_field(details['field_details'], prefix, dashed_prefix, with_otel_reuse)
+        if 'fields' in details:
+            if 'schema_details' in details and details['schema_details']['root']:
+                name_fields(details['fields'], prefix, dashed_prefix, with_otel_reuse)
             else:
-                raise ValueError("Field {} (type {}) already exists and cannot have nested fields".format(
-                    dotted_path, field_type))
-    return nesting
+                name_fields(details['fields'], sys.intern(prefix + name + '.'), dashed_prefix + dashed(name) + '-',
+                            with_otel_reuse)
 
 
-def calculate_final_values(fields):
-    """Calculate flat_name, dashed_name, multi-field names, and OTel mappings for all fields."""
-    visitor.visit_fields_with_path(fields, field_finalizer)
+def name_field(field_details, prefix, dashed_prefix, with_otel_reuse=None):
+    """Compute flat_name, dashed_name and multi-field flat_names of a field placed under prefix.
 
+    Reused fields get the OTel mapping of their otel_reuse for this location, if any.
+    Fields with otel_reuse are appended to with_otel_reuse, which the caller removes once all copies are made.
+    """
+    node_name = field_details['node_name']
+    flat_name = sys.intern(prefix + node_name)
 
-def field_finalizer(details, path):
-    """Visitor callback: compute flat_name, dashed_name, multi-field flat_names, and resolve otel_reuse."""
-    name_array = path + [details['field_details']['node_name']]
-    flat_name = '.'.join(name_array)
-
-    if 'original_fieldset' in details['field_details']:
-        if 'otel' in details['field_details']:
-            details['field_details'].pop('otel')
+    if 'original_fieldset' in field_details:
+        if 'otel' in field_details:
+            field_details.pop('otel')
 
-        if 'otel_reuse' in details['field_details']:
-            otel_reuse = details['field_details']['otel_reuse']
+        if 'otel_reuse' in field_details:
+            otel_reuse = field_details['otel_reuse']
             for r_mapping in otel_reuse:
                 if 'ecs' in r_mapping and 'mapping' in r_mapping and r_mapping['ecs'] == flat_name:
-                    details['field_details']['otel'] = [r_mapping['mapping']]
+                    field_details['otel'] = [r_mapping['mapping']]
 
-    if 'otel_reuse' in details['field_details']:
-        details['field_details'].pop('otel_reuse')
+    if with_otel_reuse is not None and 'otel_reuse' in field_details:
+        with_otel_reuse.append(field_details)
 
-    details['field_details']['flat_name'] = flat_name
-    details['field_details']['dashed_name'] = re.sub('[_\.]', '-', flat_name).replace('@', '')
-    if 'multi_fields' in details['field_details']:
-        for mf in details['field_details']['multi_fields']:
+    field_details['flat_name'] = flat_name
+    field_details['dashed_name'] = dashed_prefix + dashed(node_name)
+    if 'multi_fields' in field_details:
+        for mf in field_details['multi_fields']:
             mf['flat_name'] = flat_name + '.' + mf['name']
+
+
+# Replaced by '-' in dashed names
+DASHED_NAME_SEPARATORS = re.compile(r'[_.]')
+
+
+def dashed(name):
+    """Return name with '_' and '.' replaced by '-', and '@' removed (e.g. '@timestamp' -> 'timestamp')."""
+    return DASHED_NAME_SEPARATORS.sub('-', name).replace('@', '')
+
+
+# Reuse profiling
+
+
+class ReuseStats:
+    """Fields materialized, bytes allocated and time spent by one reuse (e.g. user at destination.user)."""
+
+    def __init__(self, schema_name, full):
+        self.schema_name = schema_name
+        self.full = full
+        self.fields = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.start_bytes = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+
+    def finish(self, reused_fields):
+        """Record the cost of the reuse, which placed reused_fields."""
+        self.seconds = time.perf_counter() - self.start
+        self.bytes = tracemalloc.get_traced_memory()[0] - self.start_bytes
+        self.fields = count_fields(reused_fields)
+        pipeline_context.current().reuse_stats.append(self)
+
+    def to_dict(self):
+        return {
+            'schema_name': self.schema_name,
+            'full': self.full,
+            'fields': self.fields,
+            'bytes': self.bytes,
+            'ms': round(self.seconds * 1000, 3),
+        }
+
+
+# Number of pipeline contexts profiling reuses with tracemalloc started by enable_reuse_stats,
+# which stops it when the last of them is done
+tracemalloc_users = 0
+tracemalloc_lock = threading.Lock()
+
+
+def start_reuse_stats(schema_name, reuse_entry):
+    """Return a ReuseStats measuring the reuse of schema_name at reuse_entry, or None if profiling is off."""
+    if pipeline_context.current().reuse_stats is None:
+        return None
+    return ReuseStats(schema_name, reuse_entry['full'])
+
+
+def count_fields(fields):
+    """Return the number of field entries in fields, at all levels."""
+    return sum(1 + count_fields(details.get('fields', {})) for details in fields.values())
+
+
+def enable_reuse_stats():
+    """Start profiling the reuses of the current pipeline context, from zero.
+
+    Bytes are measured with tracemalloc, which slows reuse down. tracemalloc traces the whole
+    process: the bytes of builds profiled concurrently include each other's allocations.
+    """
+    global tracemalloc_users
+    context = pipeline_context.ensure()
+    with tracemalloc_lock:
+        if not context.started_tracemalloc and (tracemalloc_users or not tracemalloc.is_tracing()):
+            if not tracemalloc_users:
+                tracemalloc.start()
+            tracemalloc_users += 1
+            context.started_tracemalloc = True
+    context.reuse_stats = []
+
+
+def disable_reuse_stats():
+    """Stop profiling reuses."""
+    global tracemalloc_users
+    context = pipeline_context.current()
+    with tracemalloc_lock:
+        if context.started_tracemalloc:
+            tracemalloc_users -= 1
+            if not tracemalloc_users:
+                tracemalloc.stop()
+            context.started_tracemalloc = False
+    context.reuse_stats = None
+
+
+def sorted_reuse_stats():
+    """Return the reuse profile of the current pipeline context, most fields first (then most bytes)."""
+    reuse_stats = pipeline_context.current().reuse_stats
+    return sorted(reuse_stats or [], key=lambda stats: (-stats.fields, -stats.bytes, stats.full))
+
+
+def format_reuse_stats(limit=None):
+    """Return a table of the reuse profile, most fields first, with totals. limit caps the number of rows."""
+    profile = sorted_reuse_stats()
+    lines = ['{:<50} {:<20} {:>8} {:>10} {:>10}'.format('reused at', 'field set', 'fields', 'KiB', 'ms')]
+    for stats in profile[:limit]:
+        lines.append('{:<50} {:<20} {:>8} {:>10.1f} {:>10.2f}'.format(
+            stats.full, stats.schema_name, stats.fields, stats.bytes / 1024, stats.seconds * 1000))
+    lines.append('{:<50} {:<20} {:>8} {:>10.1f} {:>10.2f}'.format(
+        'total ({} reuses)'.format(len(profile)), '', sum(stats.fields for stats in profile),
+        sum(stats.bytes for stats in profile) / 1024, sum(stats.seconds for stats in profile) * 1000))
+    return '\n'.join(lines)
+
+
+def write_reuse_stats(path):
+    """Write the reuse profile to path as JSON, most fields first."""
+    profile = sorted_reuse_stats()
+    with open(path, 'w') as outfile:
+        json.dump({
+            'reuses': [stats.to_dict() for stats in profile],
+            'total': {
+                'fields': sum(stats.fields for stats in profile),
+                'bytes': sum(stats.bytes for stats in profile),
+                'ms': round(sum(stats.seconds for stats in profile) * 1000, 3),
+            },
+        }, outfile, indent=2)
+        outfile.write('\n')
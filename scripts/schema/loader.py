@@ -29,57 +29,73 @@ Key operations:
 See scripts/docs/schema-pipeline.md for complete documentation.
 """
 
-import copy
 import git
 import glob
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
     Any,
     Dict,
+    Iterable,
     List,
     Optional,
+    Tuple,
 )
-import yaml
 
 from generators import ecs_helpers
+from schema import parse_cache
 from ecs_types import (
     Field,
     FieldEntry,
     FieldNestedEntry,
     MultiField,
+    Reuseable,
     SchemaDetails,
 )
 
 
 def load_schemas(
     ref: Optional[str] = None,
-    included_files: Optional[List[str]] = []
+    included_files: Optional[List[str]] = [],
+    jobs: Optional[int] = None
 ) -> Dict[str, FieldEntry]:
     """Load ECS schemas (from filesystem or git ref) plus any custom included_files.
 
     Custom schemas are always loaded from filesystem. All sources are merged,
-    with custom taking precedence.
+    with custom taking precedence. With jobs > 1, filesystem schema files are
+    parsed in that many worker processes.
     """
     # ECS fields (from git ref or not)
     schema_files_raw: Dict[str, FieldNestedEntry] = load_schemas_from_git(
-        ref) if ref else load_schema_files(ecs_helpers.ecs_files())
+        ref) if ref else load_schema_files(ecs_helpers.ecs_files(), jobs=jobs)
     fields: Dict[str, FieldEntry] = deep_nesting_representation(schema_files_raw)
 
     # Custom additional files
     if included_files and len(included_files) > 0:
         print('Loading user defined schemas: {0}'.format(included_files))
         custom_files: List[str] = ecs_helpers.glob_yaml_files(included_files)
-        custom_fields: Dict[str, FieldEntry] = deep_nesting_representation(load_schema_files(custom_files))
+        custom_fields: Dict[str, FieldEntry] = deep_nesting_representation(load_schema_files(custom_files, jobs=jobs))
         fields = merge_fields(fields, custom_fields)
     return fields
 
 
-def load_schema_files(files: List[str]) -> Dict[str, FieldNestedEntry]:
-    """Load and merge multiple schema YAML files. Raises ValueError on duplicate names."""
-    fields_nested: Dict[str, FieldNestedEntry] = {}
-    for f in files:
-        new_fields: Dict[str, FieldNestedEntry] = read_schema_file(f)
-        fields_nested = ecs_helpers.safe_merge_dicts(fields_nested, new_fields)
-    return fields_nested
+def load_schema_files(files: List[str], jobs: Optional[int] = None) -> Dict[str, FieldNestedEntry]:
+    """Load and merge multiple schema YAML files. Raises ValueError on duplicate names.
+
+    With jobs > 1, files are parsed in a process pool. Results are always merged
+    in the order of files, so output and duplicate errors match the serial path.
+    """
+    return merge_schema_sources(zip(files, read_schema_files(files, jobs)))
+
+
+def read_schema_files(files: List[str], jobs: Optional[int] = None) -> List[Dict[str, FieldNestedEntry]]:
+    """Parse each schema file, in parallel when jobs > 1. Results are returned in the order of files."""
+    if not jobs or jobs <= 1 or len(files) <= 1:
+        return [read_schema_file(f) for f in files]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files)), initializer=parse_cache.use,
+                             initargs=(parse_cache.active,)) as executor:
+        # map() yields results in submission order regardless of completion order
+        return list(executor.map(read_schema_file, files))
 
 
 def load_schemas_from_git(
@@ -88,33 +104,59 @@ def load_schemas_from_git(
 ) -> Dict[str, FieldNestedEntry]:
     """Load YAML schemas directly from git objects at the given ref. Raises KeyError if target_dir is absent."""
     tree: git.objects.tree.Tree = ecs_helpers.get_tree_by_ref(ref)
-    fields_nested: Dict[str, FieldNestedEntry] = {}
+    sources: List[Tuple[str, Dict[str, FieldNestedEntry]]] = []
 
     # Handles case if target dir doesn't exists in git ref
     if ecs_helpers.path_exists_in_git_tree(tree, target_dir):
         for blob in tree[target_dir].blobs:
             if blob.name.endswith('.yml'):
-                new_fields: Dict[str, FieldNestedEntry] = read_schema_blob(blob, ref)
-                fields_nested = ecs_helpers.safe_merge_dicts(fields_nested, new_fields)
+                sources.append(('{} (git ref {})'.format(blob.name, ref), read_schema_blob(blob, ref)))
     else:
         raise KeyError(f"Target directory './{target_dir}' not present in git ref '{ref}'!")
+    return merge_schema_sources(sources)
+
+
+def merge_schema_sources(sources: Iterable[Tuple[str, Dict[str, FieldNestedEntry]]]) -> Dict[str, FieldNestedEntry]:
+    """Combine (file_name, {name: schema}) pairs into one {name: schema} dict in a single pass.
+
+    Raises ValueError listing every duplicated name together with all the files defining it.
+    """
+    fields_nested: Dict[str, FieldNestedEntry] = {}
+    origins: Dict[str, List[str]] = {}
+    for (file_name, new_fields) in sources:
+        for (name, schema) in new_fields.items():
+            origins.setdefault(name, []).append(file_name)
+            fields_nested.setdefault(name, schema)
+    duplicates: List[str] = ['{} (defined in {})'.format(name, ', '.join(files))
+                             for (name, files) in origins.items() if len(files) > 1]
+    if duplicates:
+        raise ValueError('Duplicate key found when merging dictionaries: {0}'.format('; '.join(duplicates)))
     return fields_nested
 
 
 def read_schema_file(file_name: str) -> Dict[str, FieldNestedEntry]:
     """Read and parse a YAML schema file from filesystem."""
     with open(file_name) as f:
-        raw: List[FieldNestedEntry] = yaml.safe_load(f.read())
+        raw: List[FieldNestedEntry] = parse_cache.safe_load(f.read())
     return nest_schema(raw, file_name)
 
 
+# Parsed schema blobs (pickled, so every read gets its own copy) by blob hexsha. Blobs are
+# content-addressed: a file unchanged between refs is read and parsed once per process.
+_parsed_blobs: Dict[str, bytes] = {}
+
+
 def read_schema_blob(
     blob: git.objects.blob.Blob,
     ref: str
 ) -> Dict[str, FieldNestedEntry]:
     """Read and parse a YAML schema from a git blob object."""
-    content: str = blob.data_stream.read().decode('utf-8')
-    raw: List[FieldNestedEntry] = yaml.safe_load(content)
+    if blob.hexsha in _parsed_blobs:
+        raw: List[FieldNestedEntry] = pickle.loads(_parsed_blobs[blob.hexsha])
+    else:
+        content: str = blob.data_stream.read().decode('utf-8')
+        raw = parse_cache.safe_load(content)
+        _parsed_blobs[blob.hexsha] = pickle.dumps(raw, protocol=pickle.HIGHEST_PROTOCOL)
     file_name: str = "{} (git ref {})".format(blob.name, ref)
     return nest_schema(raw, file_name)
 
@@ -231,54 +273,54 @@ def dedup_and_merge_lists(list_a: List[MultiField], list_b: List[MultiField]) ->
 
 def merge_fields(a: Dict[str, FieldEntry], b: Dict[str, FieldEntry]) -> Dict[str, FieldEntry]:
     """Recursively merge field dicts; b takes precedence. normalize/multi_fields are concatenated;
-    reusable.expected is concatenated; nested fields are merged recursively."""
-    a = copy.deepcopy(a)
-    b = copy.deepcopy(b)
+    reusable.expected is concatenated; nested fields are merged recursively.
+
+    Neither input is modified. Only the nodes that the merge changes are copied, so the result
+    shares all other subtrees with a and b: don't keep mutating the inputs after merging.
+    """
+    merged: Dict[str, FieldEntry] = a.copy()
     for key in b:
         if key not in a:
-            a[key] = b[key]
+            merged[key] = b[key]
             continue
+        entry: FieldEntry = a[key].copy()
         # merge field details
-        if 'normalize' in b[key]['field_details']:
-            a[key].setdefault('field_details', {})
-            a[key]['field_details'].setdefault('normalize', [])
-            a[key]['field_details']['normalize'].extend(b[key]['field_details'].pop('normalize'))
-        if 'multi_fields' in b[key]['field_details']:
-            a[key].setdefault('field_details', {})
-            a[key]['field_details'].setdefault('multi_fields', [])
-            a[key]['field_details']['multi_fields'] = dedup_and_merge_lists(
-                a[key]['field_details']['multi_fields'], b[key]['field_details']['multi_fields'])
-            # if we don't do this then the update call below will overwrite a's field_details, with the original
-            # contents of b, which undoes our merging the multi_fields
-            del b[key]['field_details']['multi_fields']
-        a[key]['field_details'].update(b[key]['field_details'])
+        b_field_details: Field = b[key]['field_details']
+        field_details: Field = entry.get('field_details', {}).copy()
+        if 'normalize' in b_field_details:
+            field_details['normalize'] = field_details.get('normalize', []) + b_field_details['normalize']
+        if 'multi_fields' in b_field_details:
+            field_details['multi_fields'] = dedup_and_merge_lists(
+                field_details.get('multi_fields', []), b_field_details['multi_fields'])
+        field_details.update({k: v for (k, v) in b_field_details.items() if k not in ['normalize', 'multi_fields']})
+        entry['field_details'] = field_details
         # merge schema details
         if 'schema_details' in b[key]:
-            asd = a[key]['schema_details']
-            bsd = b[key]['schema_details']
-            if 'reusable' in b[key]['schema_details']:
-                asd.setdefault('reusable', {})
+            bsd: SchemaDetails = b[key]['schema_details']
+            asd: SchemaDetails = entry['schema_details'].copy()
+            if 'reusable' in bsd:
+                reusable: Reuseable = asd.get('reusable', {}).copy()
                 if 'top_level' in bsd['reusable']:
-                    asd['reusable']['top_level'] = bsd['reusable']['top_level']
+                    reusable['top_level'] = bsd['reusable']['top_level']
                 else:
-                    asd['reusable'].setdefault('top_level', True)
+                    reusable.setdefault('top_level', True)
                 if 'order' in bsd['reusable']:
-                    asd['reusable']['order'] = bsd['reusable']['order']
-                asd['reusable'].setdefault('expected', [])
-                asd['reusable']['expected'].extend(bsd['reusable']['expected'])
-                bsd.pop('reusable')
-            asd.update(bsd)
+                    reusable['order'] = bsd['reusable']['order']
+                reusable['expected'] = reusable.get('expected', []) + bsd['reusable']['expected']
+                asd['reusable'] = reusable
+            asd.update({k: v for (k, v) in bsd.items() if k != 'reusable'})
+            entry['schema_details'] = asd
         # merge nested fields
         if 'fields' in b[key]:
-            a[key].setdefault('fields', {})
-            a[key]['fields'] = merge_fields(a[key]['fields'], b[key]['fields'])
-    return a
+            entry['fields'] = merge_fields(entry.get('fields', {}), b[key]['fields'])
+        merged[key] = entry
+    return merged
 
 
 def load_yaml_file(file_name):
     """Load and parse a YAML file."""
     with open(file_name) as f:
-        return yaml.safe_load(f.read())
+        return parse_cache.safe_load(f.read())
 
 
 def warn(message: str) -> None:
@@ -0,0 +1,166 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Schema Parse Cache Module.
+
+On-disk cache of parsed YAML documents used by loader.py. Entries are keyed by the
+SHA-256 of the file contents and stored as pickles, so unchanged schema, custom and
+subset/exclude definition files skip YAML parsing entirely on the next run.
+
+The cache is disabled unless enable() is called (generator.py does so unless --no-cache
+is given). Worker processes (--jobs, --ref-jobs) get the cache of their parent through
+use(), as the initializer of their pool.
+
+The size of the cache is counted once, on the first store, then kept up to date as
+entries are written. Only when it exceeds max_bytes are the least recently used entries
+evicted, down to three quarters of max_bytes so that eviction stays rare.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import (
+    Any,
+    List,
+    Optional,
+    Tuple,
+)
+
+from generators import ecs_helpers
+
+PARSE_CACHE_DIR = "./build/parse-cache/"
+PARSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Bump when the parsed representation changes, so stale entries are never reused
+CACHE_FORMAT_VERSION = 1
+
+
+class ParseCache:
+    """Content-addressed store of parsed YAML documents."""
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = PARSE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Bytes held by the cache directory, counted on the first store (None until then)
+        self.size: Optional[int] = None
+        ecs_helpers.make_dirs(directory)
+
+    def entry_path(self, content: str) -> str:
+        """Return the cache file path for content."""
+        digest = hashlib.sha256()
+        digest.update('v{}:{}:'.format(CACHE_FORMAT_VERSION, ecs_helpers.YamlSafeLoader.__name__).encode('utf-8'))
+        digest.update(content.encode('utf-8'))
+        return os.path.join(self.directory, digest.hexdigest() + '.pickle')
+
+    def safe_load(self, content: str) -> Any:
+        """Return the parsed content, from the cache when possible. Misses are parsed and stored."""
+        path = self.entry_path(content)
+        try:
+            with open(path, 'rb') as f:
+                parsed = pickle.load(f)
+            # Refresh mtime, which eviction uses as the last access time
+            os.utime(path)
+            self.hits += 1
+            return parsed
+        except Exception:
+            # Missing, truncated or unreadable entry: parse again and overwrite it
+            pass
+        self.misses += 1
+        parsed = ecs_helpers.yaml_safe_load(content)
+        self.store(path, parsed)
+        return parsed
+
+    def store(self, path: str, parsed: Any) -> None:
+        """Atomically write a cache entry, then evict old entries if the cache is over budget."""
+        if self.size is None and self.max_bytes is not None:
+            self.size = self.scan()[1]
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(tmp_path, path)
+        except OSError:
+            # A cache that can't be written is no reason to fail the build
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        if self.size is not None:
+            self.size += written
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """Return the (mtime, size, path) of the cache entries, and their total size."""
+        entries: List[Tuple[float, int, str]] = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.pickle'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Evicted by a concurrent build
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return (entries, total)
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits within three quarters of max_bytes."""
+        if self.max_bytes is None:
+            return
+        (entries, total) = self.scan()
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_bytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.size = total
+
+
+active: Optional[ParseCache] = None
+
+
+def enable(directory: Optional[str] = PARSE_CACHE_DIR, max_bytes: Optional[int] = PARSE_CACHE_MAX_BYTES) -> ParseCache:
+    """Route safe_load() through an on-disk cache in directory."""
+    global active
+    active = ParseCache(directory, max_bytes)
+    return active
+
+
+def use(cache: Optional[ParseCache]) -> None:
+    """Route safe_load() through cache (None disables caching), e.g. the cache of the parent of a worker."""
+    global active
+    active = cache
+
+
+def disable() -> None:
+    """Parse every document again on each safe_load() call."""
+    global active
+    active = None
+
+
+def safe_load(content: str) -> Any:
+    """Parse YAML content, through the parse cache when it is enabled."""
+    if active:
+        return active.safe_load(content)
+    return ecs_helpers.yaml_safe_load(content)
@@ -0,0 +1,105 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Pipeline Context Module.
+
+Options and per-run state of one build, read by the stages of the pipeline
+(loader.py → cleaner.py → finalizer.py → filters → generators) instead of module globals:
+strict mode, the validation report being collected (validation_report.py), the
+rule timings and reuse profile when enabled, and the writer of the artifacts
+(generators/artifacts.py).
+
+The context of a build is activated for the duration of the build:
+
+    context = PipelineContext(strict=True, report=ValidationReport())
+    with context.activate():
+        cleaner.clean(fields)
+
+The active context is held in a context variable, so each thread (or asyncio task) has its
+own: builds can run concurrently in worker threads of one process, each in its own context.
+Code running outside of activate() gets a throwaway default context: non-strict, nothing
+collected. The enable()/disable() helpers of the stages keep their state in a default context
+of the thread (or task), made active on first use (see ensure()); only they set one.
+
+Caches that don't depend on the build (parsed YAML, compiled patterns, the OTel model)
+stay shared by the whole process.
+"""
+
+import contextlib
+import contextvars
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+if TYPE_CHECKING:
+    from generators.artifacts import ArtifactWriter
+    from schema.validation_report import ValidationReport
+
+
+class PipelineContext:
+    """Options and per-run state of one build (see the module docstring)."""
+
+    def __init__(self, strict: bool = False, report: Optional['ValidationReport'] = None):
+        # Warnings of the cleaner are raised as errors (--strict)
+        self.strict: bool = strict
+        # Problems are recorded here instead of raised (--report)
+        self.report: Optional['ValidationReport'] = report
+        # Timing counters of the cleaner rules (cleaner.enable_rule_stats), or None
+        self.rule_stats: Optional[Dict[str, Any]] = None
+        # Profile of the reuses performed (finalizer.enable_reuse_stats), or None
+        self.reuse_stats: Optional[List[Any]] = None
+        # Whether this context is one of the users of the tracemalloc started by finalizer.enable_reuse_stats
+        self.started_tracemalloc: bool = False
+        # Saves the artifacts and keeps their manifest (artifacts.write), or None
+        self.artifacts: Optional['ArtifactWriter'] = None
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator['PipelineContext']:
+        """Make this the context of the current thread (or task) for the duration of the block."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+
+_active: contextvars.ContextVar = contextvars.ContextVar('ecs_pipeline_context', default=None)
+
+
+def current() -> PipelineContext:
+    """Return the active context, or a throwaway default one if none is."""
+    context: Optional[PipelineContext] = _active.get()
+    if context is None:
+        return PipelineContext()
+    return context
+
+
+def ensure() -> PipelineContext:
+    """Return the active context, making a default one active for this thread (or task) if none is.
+
+    For the enable()/disable() helpers of the stages, whose state lasts until they are disabled.
+    """
+    context: Optional[PipelineContext] = _active.get()
+    if context is None:
+        context = PipelineContext()
+        _active.set(context)
+    return context
@@ -29,6 +29,7 @@ from typing import (
     Dict,
     List,
     Optional,
+    Set,
     Tuple,
 )
 
@@ -51,7 +52,9 @@ def filter(
     subsets: List[Dict[str, Any]] = load_subset_definitions(subset_file_globs)
     for subset in subsets:
         subfields: Dict[str, FieldEntry] = extract_matching_fields(fields, subset['fields'])
-        intermediate_files.generate(subfields, os.path.join(out_dir, 'ecs', 'subset', subset['name']), False)
+        # Not committed: left out of the artifact manifest
+        intermediate_files.generate(subfields, os.path.join(out_dir, 'ecs', 'subset', subset['name']), False,
+                                    tracked=False)
 
     merged_subset: Dict[str, Any] = combine_all_subsets(subsets)
     if merged_subset:
@@ -71,6 +74,45 @@ def filter(
     return fields, docs_only_fields
 
 
+def prune_unused_fieldsets(
+    fields: Dict[str, FieldEntry],
+    subset_file_globs: List[str]
+) -> Dict[str, FieldEntry]:
+    """Return only the fieldsets the subsets need, so the others are neither cleaned nor finalized.
+
+    Run right after loading. Fieldsets reused into a needed fieldset are needed as well,
+    transitively (e.g. destination needs user, which needs group).
+    The result must be finalized with partial=True.
+    """
+    subsets: List[Dict[str, Any]] = load_subset_definitions(subset_file_globs)
+    if not subsets:
+        return fields
+    needed: Set[str] = set()
+    for subset in subsets:
+        needed.update(subset['fields'].keys())
+    needed.update(reuse_sources(fields, needed))
+    return {name: schema for (name, schema) in fields.items() if name in needed}
+
+
+def reuse_sources(fields: Dict[str, FieldEntry], destinations: Set[str]) -> Set[str]:
+    """Return the fieldsets reused, directly or transitively, into any of the destination fieldsets."""
+    reused_into: Dict[str, Set[str]] = {}
+    for (name, schema) in fields.items():
+        reusable = schema['schema_details'].get('reusable', {})
+        for reuse_entry in reusable.get('expected', []):
+            # Accepts both the shorthand and the explicit {at:, as:} notation, before or after cleanup
+            location: str = reuse_entry['at'] if isinstance(reuse_entry, dict) else reuse_entry
+            reused_into.setdefault(location.split('.')[0], set()).add(name)
+    sources: Set[str] = set()
+    pending: List[str] = list(destinations)
+    while pending:
+        for source in reused_into.get(pending.pop(), set()):
+            if source not in sources:
+                sources.add(source)
+                pending.append(source)
+    return sources
+
+
 def generate_docs_only_subset(paths: List[str]) -> Dict[str, Any]:
     """
     Takes paths list of `docs_only` fields and generates a subset
@@ -91,15 +133,17 @@ def generate_docs_only_subset(paths: List[str]) -> Dict[str, Any]:
 
 def generate_docs_only_paths(
     subset: Dict[str, Any],
-    filtered: Optional[Dict[str, Any]] = {},
+    filtered: Optional[Dict[str, Any]] = None,
     parent: Optional[str] = '',
     path: Optional[str] = '',
-    paths: Optional[List[str]] = [],
+    paths: Optional[List[str]] = None,
 ) -> List[str]:
     """
     Returns a list of field paths: ['process.same_as_process'] for subset fields
-    marked as `docs_only: True`
+    marked as `docs_only: True`. The paths are appended to paths, if given.
     """
+    if paths is None:
+        paths = []
     for current in subset:
         if subset[current].get('docs_only'):
             path += f'.{current}'
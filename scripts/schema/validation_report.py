@@ -0,0 +1,153 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Validation Report Module.
+
+Collect-all validation mode (generator.py --report). While a report is active, the problems
+found by cleaner.py, the reuse checks of finalizer.py and the OTel mapping checks are
+recorded instead of raised (or warned about) one at a time, so one run lists all of them.
+
+In strict mode, what would be a warning is recorded as an error.
+
+The report being collected belongs to the pipeline context of the build (see pipeline_context.py).
+"""
+
+import contextlib
+import json
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from schema import pipeline_context
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+class ValidationReport:
+    """Errors and warnings of one or more validation runs, in the order they were found."""
+
+    def __init__(self, ref: Optional[str] = None):
+        self.ref = ref
+        self.entries: List[Dict[str, str]] = []
+
+    def add(self, stage: str, severity: str, message: str) -> None:
+        """Record a problem found by stage ('cleaner', 'finalizer', 'otel' or 'generator')."""
+        entry: Dict[str, str] = {'stage': stage, 'severity': severity, 'message': message}
+        if self.ref:
+            entry['ref'] = self.ref
+        self.entries.append(entry)
+
+    def error(self, stage: str, message: str) -> None:
+        """Record an error found by stage."""
+        self.add(stage, ERROR, message)
+
+    def warning(self, stage: str, message: str) -> None:
+        """Record a warning found by stage."""
+        self.add(stage, WARNING, message)
+
+    @property
+    def errors(self) -> List[Dict[str, str]]:
+        """Entries with severity error."""
+        return [entry for entry in self.entries if entry['severity'] == ERROR]
+
+    @property
+    def warnings(self) -> List[Dict[str, str]]:
+        """Entries with severity warning."""
+        return [entry for entry in self.entries if entry['severity'] == WARNING]
+
+    def summary(self) -> str:
+        """One line with the number of errors and warnings."""
+        return 'Validation report: {} error(s), {} warning(s)'.format(len(self.errors), len(self.warnings))
+
+    def to_dict(self) -> Dict:
+        """JSON representation: error and warning counts, and all entries."""
+        return {
+            'errors': len(self.errors),
+            'warnings': len(self.warnings),
+            'entries': self.entries,
+        }
+
+    def format_text(self) -> str:
+        """Return the report as text: one block per problem, then the summary line."""
+        blocks: List[str] = []
+        for entry in self.entries:
+            location: str = entry['stage'] if 'ref' not in entry else '{} @ {}'.format(entry['stage'], entry['ref'])
+            blocks.append('{} [{}]\n{}'.format(entry['severity'].upper(), location, entry['message']))
+        blocks.append(self.summary())
+        return '\n\n'.join(blocks) + '\n'
+
+    def write(self, path: str) -> None:
+        """Write the report to path: JSON if path ends with .json, text otherwise."""
+        with open(path, 'w') as outfile:
+            if path.endswith('.json'):
+                json.dump(self.to_dict(), outfile, indent=2)
+                outfile.write('\n')
+            else:
+                outfile.write(self.format_text())
+
+
+def current() -> Optional[ValidationReport]:
+    """Return the report of the current pipeline context, or None if problems are raised."""
+    return pipeline_context.current().report
+
+
+def enable(ref: Optional[str] = None) -> ValidationReport:
+    """Start collecting problems into a new report of the current pipeline context, instead of raising them."""
+    report = pipeline_context.ensure().report = ValidationReport(ref)
+    return report
+
+
+def disable() -> None:
+    """Go back to raising problems as they are found."""
+    pipeline_context.current().report = None
+
+
+def combine(reports: Iterable[ValidationReport]) -> ValidationReport:
+    """Return one report with the entries of all reports (e.g. one per git ref)."""
+    combined = ValidationReport()
+    for report in reports:
+        combined.entries.extend(report.entries)
+    return combined
+
+
+@contextlib.contextmanager
+def collect(stage: str) -> Iterator[None]:
+    """Record a ValueError raised in the block as an error of stage, if a report is active.
+
+    Without an active report, the exception propagates as usual.
+    """
+    try:
+        yield
+    except ValueError as e:
+        report = current()
+        if report is None:
+            raise
+        report.error(stage, str(e))
+
+
+def collecting(stage: str, func: Callable) -> Callable:
+    """Return func wrapped in collect(stage), e.g. for use as a visitor callback."""
+    def wrapper(*args, **kwargs):
+        with collect(stage):
+            func(*args, **kwargs)
+    return wrapper
@@ -17,17 +17,26 @@
 
 """Field Visitor Module.
 
-Three depth-first traversal helpers for the deeply nested field structure from loader.py:
+Depth-first traversal of the deeply nested field structure from loader.py:
+- visit_all(): run several callbacks (FieldCallback) in one pass
 - visit_fields(): dispatch to fieldset_func or field_func based on node type
 - visit_fields_with_path(): pass accumulated path array to callback
 - visit_fields_with_memo(): pass shared accumulator to callback
+
+The traversal keeps an explicit stack of iterators instead of recursing, so there is no depth
+limit, and maintains a single path list instead of building one per level. Nodes are visited in
+the same order as a recursive pre-order walk: each node's callbacks run before its nested fields
+are visited, so callbacks may still add or replace a node's nested fields.
 """
 
 from typing import (
+    Any,
     Callable,
     Dict,
+    Iterator,
     List,
     Optional,
+    Tuple,
 )
 
 from ecs_types import (
@@ -37,41 +46,115 @@ from ecs_types import (
 )
 
 
+# Default of FieldCallback's memo: the callback doesn't take one (None is a valid memo)
+NO_MEMO = object()
+
+
+class FieldCallback:
+    """A callback for visit_all(), with what it needs.
+
+    func is called with the node's details, then the path if path=True, then the memo if one is given:
+    func(details), func(details, path), func(details, memo) or func(details, path, memo).
+
+    fieldsets and fields select the nodes func is called on: nodes with schema_details are
+    fieldsets, the other nodes with field_details are fields.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., None],
+        fieldsets: bool = False,
+        fields: bool = True,
+        path: bool = False,
+        memo: Any = NO_MEMO
+    ):
+        self.func = func
+        self.fieldsets = fieldsets
+        self.fields = fields
+        self.path = path
+        self.memo = memo
+
+    def bind(self, path: List[str]) -> Callable[[FieldEntry], None]:
+        """Return a function of the details only, passing the other arguments (resolved once, not for each node)."""
+        func = self.func
+        memo = self.memo
+        if self.path and memo is not NO_MEMO:
+            return lambda details: func(details, path, memo)
+        elif self.path:
+            return lambda details: func(details, path)
+        elif memo is not NO_MEMO:
+            return lambda details: func(details, memo)
+        return func
+
+
+def visit_all(
+    fields: Dict[str, FieldEntry],
+    callbacks: List[FieldCallback],
+    path: Optional[List[str]] = None
+) -> None:
+    """Depth-first traversal running all callbacks in one pass, in list order at each node.
+
+    The path passed to callbacks holds the names of the enclosing nodes, starting with the given path.
+    Root fieldsets (root=true) don't add their name to it. The list is reused as the traversal moves
+    on: callbacks must copy it to keep it.
+    """
+    current_path: List[str] = list(path) if path else []
+    on_fieldsets: List[Callable[[FieldEntry], None]] = [
+        callback.bind(current_path) for callback in callbacks if callback.fieldsets]
+    on_fields: List[Callable[[FieldEntry], None]] = [
+        callback.bind(current_path) for callback in callbacks if callback.fields]
+    # Iterators over the nested fields being visited, and whether their parent's name is on the path
+    stack: List[Tuple[Iterator[Tuple[str, FieldEntry]], bool]] = [(iter(fields.items()), False)]
+    while stack:
+        (entries, named) = stack[-1]
+        for (name, details) in entries:
+            if 'schema_details' in details:
+                for call in on_fieldsets:
+                    call(details)
+                nests_name = not details['schema_details'].get('root')
+            else:
+                if 'field_details' in details:
+                    for call in on_fields:
+                        call(details)
+                nests_name = True
+            if 'fields' in details:
+                if nests_name:
+                    current_path.append(name)
+                stack.append((iter(details['fields'].items()), nests_name))
+                break
+        else:
+            stack.pop()
+            if named:
+                current_path.pop()
+
+
 def visit_fields(
     fields: Dict[str, FieldEntry],
     fieldset_func: Optional[Callable[[FieldEntry], None]] = None,
     field_func: Optional[Callable[[FieldDetails], None]] = None
 ) -> None:
-    """Depth-first traversal calling fieldset_func for nodes with schema_details, field_func for others."""
-    for (_, details) in fields.items():
-        if fieldset_func and 'schema_details' in details:
-            fieldset_func(details)
-        elif field_func and 'field_details' in details:
-            field_func(details)
-        if 'fields' in details:
-            visit_fields(details['fields'],
-                         fieldset_func=fieldset_func,
-                         field_func=field_func)
+    """Depth-first traversal calling fieldset_func for nodes with schema_details, field_func for others.
+
+    Without a fieldset_func, field_func is also called for fieldsets.
+    """
+    callbacks: List[FieldCallback] = []
+    if fieldset_func:
+        callbacks.append(FieldCallback(fieldset_func, fieldsets=True, fields=False))
+    if field_func:
+        callbacks.append(FieldCallback(field_func, fieldsets=not fieldset_func))
+    visit_all(fields, callbacks)
 
 
 def visit_fields_with_path(
     fields: Dict[str, FieldEntry],
-    func: Callable[[FieldDetails], None],
-    path: Optional[List[str]] = []
+    func: Callable[[FieldDetails, List[str]], None],
+    path: Optional[List[str]] = None
 ) -> None:
     """Depth-first traversal passing accumulated path to func(details, path).
 
     Root fieldsets (root=true) don't add their name to the path.
     """
-    for (name, details) in fields.items():
-        if 'field_details' in details:
-            func(details, path)
-        if 'fields' in details:
-            if 'schema_details' in details and details['schema_details']['root']:
-                new_nesting = []
-            else:
-                new_nesting = [name]
-            visit_fields_with_path(details['fields'], func, path + new_nesting)
+    visit_all(fields, [FieldCallback(func, fieldsets=True, path=True)], path)
 
 
 def visit_fields_with_memo(
@@ -80,8 +163,4 @@ def visit_fields_with_memo(
     memo: Optional[Dict[str, Field]] = None
 ) -> None:
     """Depth-first traversal passing a shared accumulator to func(details, memo)."""
-    for (name, details) in fields.items():
-        if 'field_details' in details:
-            func(details, memo)
-        if 'fields' in details:
-            visit_fields_with_memo(details['fields'], func, memo)
+    visit_all(fields, [FieldCallback(func, fieldsets=True, memo=memo)])
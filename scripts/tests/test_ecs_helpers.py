@@ -17,7 +17,10 @@
 
 import os
 import sys
+import threading
 import unittest
+import yaml
+from collections import OrderedDict
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
@@ -123,6 +126,25 @@ class TestECSHelpers(unittest.TestCase):
         tree = ecs_helpers.get_tree_by_ref(ref)
         self.assertEqual(tree.hexsha, '4449df245f6930d59bcd537a5958891261a9476b')
 
+    def test_get_repo_opens_one_repository_per_thread(self):
+        repo = ecs_helpers.get_repo()
+        self.assertIs(repo, ecs_helpers.get_repo())
+        opened = []
+
+        def open_twice():
+            opened.append((ecs_helpers.get_repo(), ecs_helpers.get_repo()))
+        threads = [threading.Thread(target=open_twice) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        (first, second) = opened
+        self.assertIs(first[0], first[1])
+        self.assertIs(second[0], second[1])
+        self.assertIsNot(first[0], second[0])
+        self.assertIsNot(repo, first[0])
+        self.assertIsNot(repo, second[0])
+
     def test_path_exists_in_git_tree(self):
         ref = 'v1.6.0'
         tree = ecs_helpers.get_tree_by_ref(ref)
@@ -169,6 +191,64 @@ class TestECSHelpers(unittest.TestCase):
         }
         self.assertEqual(ecs_helpers.remove_top_level_reusable_false(nested_schema_original), nested_schema_expected)
 
+    # YAML I/O
+
+    def test_yaml_dumps_matches_pure_python_dump(self):
+        long_text = 'A long description that needs double quotes because of a trailing space \nand' + ' wraps' * 30
+        shared = ['array']
+        data = {
+            'zeta': {'fields': {'a.b': {'description': long_text, 'normalize': []}, 'a.c': {'type': 'keyword'}}},
+            'alpha': {'short': 'plain', 'ordered': OrderedDict([('z', 1), ('a', True)])},
+            'process': {
+                'expected': [{'normalize': shared}],
+                'reused_here': [{'normalize': shared}],
+                'title': 'Process',
+            },
+            'empty': {},
+            'unicode': 'caf\u00e9 \u2028 \t',
+        }
+        expected = yaml.dump(data, default_flow_style=False, allow_unicode=True)
+        self.assertEqual(ecs_helpers.yaml_dumps(data), expected)
+        self.assertEqual(ecs_helpers.yaml_dumps([data]),
+                         yaml.dump([data], default_flow_style=False, allow_unicode=True))
+
+    def assert_dumps_like_pyyaml(self, data):
+        self.assertEqual(yaml.dump(data, default_flow_style=False, allow_unicode=True), ecs_helpers.yaml_dumps(data))
+
+    def test_yaml_dumps_matches_pure_python_dump_for_text_libyaml_escapes(self):
+        for data in [{'a': 'emoji \U0001F600'}, {'a': 'next\x85line'}, {'a': {'b': 'bom \ufeff', 'c': 1}},
+                     {'a': ['line\u2028separator', 'plain']}]:
+            self.assert_dumps_like_pyyaml(data)
+
+    def test_yaml_dumps_matches_pure_python_dump_for_explicit_keys(self):
+        for data in [{'': {'a': 1}, 'b': {'c': 2}}, {' ': 1, 'a': 2}, {'\u2028': {'a': 1}, 'b': 2},
+                     {'a' * 120: {'k': 1}, 'b': 2}, {'tab\there': {'k': 1}}]:
+            self.assert_dumps_like_pyyaml(data)
+
+    def test_yaml_dumps_output_parses(self):
+        data = {'': {'a' * 120: {'k': 1}, 'tab\there': {}}}
+        text = ecs_helpers.yaml_dumps(data)
+        self.assertEqual(yaml.dump(data, default_flow_style=False, allow_unicode=True), text)
+        self.assertEqual(data, yaml.safe_load(text))
+
+    def test_yaml_dumps_keeps_the_order_of_keys_that_cant_be_sorted(self):
+        data = {8: '', 1: 1.5, '': {6: True}, 'a': {'b': 'emoji \U0001F600'}}
+        self.assert_dumps_like_pyyaml(data)
+
+    def test_yaml_dumps_unshared_writes_shared_values_again(self):
+        def data(normalize):
+            return {'process': {'expected': [{'normalize': normalize()}], 'reused_here': [{'normalize': normalize()}]},
+                    'description': 'Trailing space \nneeds double quotes', 'ordered': OrderedDict([('z', normalize())])}
+        shared = ['array']
+        self.assertIn('&id001', ecs_helpers.yaml_dumps(data(lambda: shared)))
+        expected = yaml.dump(data(lambda: ['array']), default_flow_style=False, allow_unicode=True)
+        self.assertEqual(ecs_helpers.yaml_dumps(data(lambda: shared), unshared=True), expected)
+        self.assertEqual(ecs_helpers.yaml_dumps([data(lambda: shared)], unshared=True),
+                         yaml.dump([data(lambda: ['array'])], default_flow_style=False, allow_unicode=True))
+
+    def test_yaml_safe_load(self):
+        self.assertEqual(ecs_helpers.yaml_safe_load('a:\n- 1\n- b\n'), {'a': [1, 'b']})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -15,8 +15,11 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import mock
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -286,6 +289,30 @@ class TestGeneratorsEsTemplate(unittest.TestCase):
         exp = ["ecs_{}_acme".format(version)]
         self.assertEqual(es_template.component_name_convention(version, test_map), exp)
 
+    def test_component_templates_link_to_the_docs_by_the_level_of_the_last_field(self):
+        def field(flat_name, level):
+            return {'flat_name': flat_name, 'type': 'keyword', 'level': level}
+        nested = {
+            'host': {'name': 'host', 'fields': {'host.name': field('host.name', 'core'),
+                                                'host.acme.id': field('host.acme.id', 'custom')}},
+            'acme': {'name': 'acme', 'fields': {'acme.id': field('acme.id', 'custom')}},
+            'process': {'name': 'process', 'fields': {'process.acme.id': field('process.acme.id', 'custom'),
+                                                      'process.name': field('process.name', 'extended')}},
+            'user': {'name': 'user', 'fields': {'user.name': field('user.name', 'core'),
+                                                'user.id': field('user.id', 'extended')}},
+        }
+        out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out_dir)
+        with mock.patch.object(es_template, 'save_json') as mock_save_json:
+            es_template.all_component_templates(nested, '1.8', out_dir)
+        metas = {os.path.basename(call.args[0]): call.args[1]['_meta'] for call in mock_save_json.call_args_list}
+        self.assertNotIn('documentation', metas['host.json'])
+        self.assertNotIn('documentation', metas['acme.json'])
+        self.assertEqual('https://www.elastic.co/guide/en/ecs/current/ecs-process.html',
+                         metas['process.json']['documentation'])
+        self.assertEqual('https://www.elastic.co/guide/en/ecs/current/ecs-user.html',
+                         metas['user.json']['documentation'])
+
     def test_legacy_template_settings_override(self):
         ecs_version = 100
         default = es_template.default_legacy_template_settings(ecs_version)
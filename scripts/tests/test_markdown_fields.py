@@ -198,6 +198,8 @@ class TestGeneratorsMarkdownFields(unittest.TestCase):
         self.assertEqual('type', sorted_foo_fields[1]['name'])
         self.assertIn('fluffy', sorted_foo_fields[1]['allowed_value_names'])
         self.assertIn('coarse', sorted_foo_fields[1]['allowed_value_names'])
+        # The fields of the fieldset are left as is
+        self.assertNotIn('allowed_value_names', self.foo_fieldset['fields']['foo.type'])
 
     def test_rendering_fieldset_reuse(self):
         foo_reuse_fields = markdown_fields.render_fieldset_reuse_text(self.foo_fieldset)
@@ -0,0 +1,133 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import pickle
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from generators import artifacts
+from generators.artifacts import (
+    ArtifactsOutOfDate,
+    ArtifactWriter,
+)
+from schema.pipeline_context import PipelineContext
+
+
+class TestArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.manifest_path = os.path.join(self.root, 'generated', artifacts.MANIFEST_FILE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def build(self, contents, check=False):
+        """Write contents ({name: (content, tracked)}) as one build would, and return its writer."""
+        writer = ArtifactWriter(self.root, self.manifest_path, check=check)
+        with PipelineContext().activate() as context:
+            context.artifacts = writer
+            for (name, (content, tracked)) in contents.items():
+                artifacts.write(self.path(name), content, tracked)
+            writer.finish()
+        return writer
+
+    def contents(self):
+        return {
+            'generated/csv/fields.csv': ('a,b\n', True),
+            'docs/reference/index.md': ('# Café\n', True),
+            'generated/ecs/ecs_flat.json': (b'{}', False),
+        }
+
+    def test_write_if_changed(self):
+        path = self.path('out/fields.yml')
+        self.assertTrue(artifacts.write(path, 'a: 1\n'))
+        os.utime(path, (1, 1))
+        self.assertFalse(artifacts.write(path, 'a: 1\n'))
+        self.assertEqual(1, os.stat(path).st_mtime)
+        self.assertTrue(artifacts.write(path, b'a: 2\n'))
+        with open(path) as f:
+            self.assertEqual('a: 2\n', f.read())
+        # Not the private permissions of temporary files, and none left behind
+        self.assertEqual(0o666 & ~artifacts._UMASK, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertEqual(['fields.yml'], os.listdir(self.path('out')))
+
+    def test_manifest(self):
+        writer = self.build(self.contents())
+        self.assertEqual('Artifacts: 3 written, 0 unchanged', writer.summary())
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        self.assertEqual(['docs/reference/index.md', 'generated/csv/fields.csv'], sorted(manifest['files']))
+        self.assertEqual(artifacts.file_sha256(self.path('generated/csv/fields.csv')),
+                         manifest['files']['generated/csv/fields.csv'])
+
+        writer = self.build(self.contents())
+        self.assertEqual('Artifacts: 0 written, 3 unchanged', writer.summary())
+        # A partial build keeps the entries of what it didn't render
+        self.build({'generated/csv/fields.csv': ('a,b,c\n', True)})
+        self.assertEqual(['docs/reference/index.md', 'generated/csv/fields.csv'],
+                         sorted(artifacts.load_manifest(self.manifest_path)))
+
+    def test_untracked_artifacts_leave_the_manifest(self):
+        self.build(dict(self.contents(), **{'generated/ecs/subset/main/ecs_flat.yml': ('a: 1\n', True)}))
+        self.assertIn('generated/ecs/subset/main/ecs_flat.yml', artifacts.load_manifest(self.manifest_path))
+        untracked = dict(self.contents(), **{'generated/ecs/subset/main/ecs_flat.yml': ('a: 1\n', False)})
+        with self.assertRaises(ArtifactsOutOfDate) as raised:
+            self.build(untracked, check=True)
+        self.assertEqual(['generated/ecs/subset/main/ecs_flat.yml: listed in the manifest, but not tracked'],
+                         raised.exception.problems)
+        self.build(untracked)
+        self.assertEqual(['docs/reference/index.md', 'generated/csv/fields.csv'],
+                         sorted(artifacts.load_manifest(self.manifest_path)))
+        self.build(untracked, check=True)
+
+    def test_check(self):
+        self.build(self.contents())
+        self.build(self.contents(), check=True)
+
+        with open(self.path('docs/reference/index.md'), 'a') as f:
+            f.write('Edited\n')
+        changed = dict(self.contents(), **{'generated/csv/fields.csv': ('a,b,c\n', True)})
+        os.remove(self.path('generated/ecs/ecs_flat.json'))
+        with self.assertRaises(ArtifactsOutOfDate) as raised:
+            self.build(changed, check=True)
+        self.assertEqual(['generated/csv/fields.csv: out of date', 'docs/reference/index.md: out of date'],
+                         raised.exception.problems)
+        # Nothing was written
+        with open(self.path('generated/csv/fields.csv')) as f:
+            self.assertEqual('a,b\n', f.read())
+        self.assertFalse(os.path.exists(self.path('generated/ecs/ecs_flat.json')))
+        # Survives the trip back from a worker process
+        self.assertEqual(raised.exception.problems, pickle.loads(pickle.dumps(raised.exception)).problems)
+
+        with self.assertRaises(ArtifactsOutOfDate) as raised:
+            self.build({}, check=True)
+        self.assertEqual(['docs/reference/index.md: modified since it was generated'], raised.exception.problems)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import copy
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from ecs_types import CompactFieldDetails
+from ecs_types import compact_fields
+from generators import intermediate_files
+from schema import cleaner
+from schema import finalizer
+from schema import loader
+
+
+class TestCompactFields(unittest.TestCase):
+
+    def definition(self):
+        return {'name': 'name', 'type': 'keyword', 'otel': [{'relation': 'match'}], 'flat_name': 'user.name'}
+
+    def test_mapping(self):
+        base = self.definition()
+        details = CompactFieldDetails(base)
+        self.assertEqual(base, details)
+        details['flat_name'] = 'server.user.name'
+        details['original_fieldset'] = 'user'
+        details['intermediate'] = False
+        del details['otel']
+        self.assertEqual({'name': 'name', 'type': 'keyword', 'flat_name': 'server.user.name',
+                          'original_fieldset': 'user', 'intermediate': False}, details)
+        self.assertEqual(['name', 'type', 'flat_name', 'original_fieldset', 'intermediate'], list(details))
+        self.assertNotIn('otel', details)
+        self.assertIsNone(details.get('otel'))
+        with self.assertRaises(KeyError):
+            del details['otel']
+        details['otel'] = [{'relation': 'equivalent'}]
+        self.assertEqual([{'relation': 'equivalent'}], details['otel'])
+        # The definition is left as is
+        self.assertEqual(self.definition(), base)
+
+    def test_copies(self):
+        details = CompactFieldDetails(self.definition())
+        details['flat_name'] = 'server.user.name'
+        del details['type']
+        again = CompactFieldDetails(details)
+        again['flat_name'] = 'client.user.name'
+        self.assertIs(details.base, again.base)
+        self.assertEqual('server.user.name', details['flat_name'])
+        self.assertNotIn('type', again)
+        for plain in [details.copy(), copy.deepcopy(details), pickle.loads(pickle.dumps(details))]:
+            self.assertIs(dict, type(plain))
+            self.assertEqual({'name': 'name', 'otel': [{'relation': 'match'}], 'flat_name': 'server.user.name'}, plain)
+        self.assertIsNot(details['otel'], copy.deepcopy(details)['otel'])
+
+    def test_compact_finalize_ecs(self):
+        cleaned = loader.load_schemas()
+        cleaner.clean(cleaned)
+        fields = copy.deepcopy(cleaned)
+        finalizer.finalize(fields)
+        compact = cleaned
+        finalizer.finalize(compact, compact=True)
+        reused = compact['destination']['fields']['user']['fields']['name']['field_details']
+        self.assertIsInstance(reused, CompactFieldDetails)
+        self.assertEqual(fields, compact)
+        materialized = compact_fields.materialize(compact)
+        self.assertEqual(fields, materialized)
+        self.assertIs(dict, type(materialized['destination']['fields']['user']['fields']['name']['field_details']))
+        self.assertEqual(intermediate_files.generate_flat_and_nested_fields(fields),
+                         intermediate_files.generate_flat_and_nested_fields(compact))
+
+
+if __name__ == '__main__':
+    unittest.main()
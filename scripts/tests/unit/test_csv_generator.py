@@ -40,9 +40,9 @@ class TestGeneratorsCsvFields(unittest.TestCase):
         self.assertIsInstance(sorted_base_first[0], dict)
         self.assertEqual(sorted_base_first[0].get('dashed_name'), 'timestamp')
 
-    @mock.patch("builtins.open", new_callable=mock.mock_open)
+    @mock.patch('generators.csv_generator.artifacts')
     @mock.patch('generators.csv_generator.csv')
-    def test_csv_writing(self, mock_csv, _):
+    def test_csv_writing(self, mock_csv, mock_artifacts):
         mock_csv.writer = mock.Mock(writerow=mock.Mock())
         fields = [{
             'example': '2016-05-23T08:05:34.853Z',
@@ -57,6 +57,7 @@ class TestGeneratorsCsvFields(unittest.TestCase):
 
         csv_generator.save_csv('ecs.csv', fields, '0.0.1')
 
+        mock_artifacts.write.assert_called_once_with('ecs.csv', mock.ANY)
         self.assertEqual(mock_csv.writer.call_count, 1)
         self.assertEqual(mock_csv.writer().writerow.call_count, 2)
         mock_csv.writer().writerow.assert_has_calls([
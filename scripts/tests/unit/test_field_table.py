@@ -0,0 +1,99 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from generators.field_table import FieldTable
+
+
+class TestFieldTable(unittest.TestCase):
+
+    def nested(self):
+        return {
+            'dns': {
+                'name': 'dns',
+                'fields': {
+                    'dns.answers.ttl': {'flat_name': 'dns.answers.ttl', 'type': 'long', 'level': 'extended'},
+                    'dns.answers': {'flat_name': 'dns.answers', 'type': 'object', 'level': 'extended'},
+                    'dns.id': {'flat_name': 'dns.id', 'type': 'keyword', 'level': 'core',
+                               'otel': [{'relation': 'match'}, {'relation': 'match'}]},
+                },
+            },
+            'geo': {
+                'name': 'geo',
+                'reusable': {'top_level': False},
+                'fields': {
+                    'geo.name': {'flat_name': 'geo.name', 'type': 'keyword', 'level': 'extended', 'index': False,
+                                 'doc_values': False},
+                },
+            },
+            'host': {
+                'name': 'host',
+                'fields': {
+                    'host.geo.name': {'flat_name': 'host.geo.name', 'type': 'keyword', 'level': 'core',
+                                      'original_fieldset': 'geo', 'multi_fields': [{'name': 'text'}]},
+                },
+            },
+        }
+
+    def test_columns(self):
+        table = FieldTable(self.nested())
+        self.assertEqual(5, len(table))
+        self.assertEqual(['dns.answers.ttl', 'dns.answers', 'dns.id', 'geo.name', 'host.geo.name'], table.flat_name)
+        self.assertEqual(['dns', 'dns', 'dns', 'geo', 'host'], table.fieldset)
+        self.assertEqual([True, True, True, False, True], table.top_level)
+        self.assertEqual([True, True, True, False, True], table.indexed)
+        self.assertEqual([True, True, True, False, True], table.doc_values)
+        self.assertEqual([None, None, None, None, 'geo'], table.original_fieldset)
+        self.assertEqual([0, 0, 0, 0, 1], list(table.multi_fields))
+        self.assertEqual([(), (), ('match', 'match'), (), ()], table.otel_relations)
+        # Parents can come after their nested fields; host.geo isn't a field
+        self.assertEqual([1, -1, -1, -1, -1], list(table.parent))
+        self.assertEqual(['dns', 'host'], table.top_level_fieldsets)
+
+    def test_select(self):
+        table = FieldTable(self.nested())
+        self.assertEqual([2, 3, 4], table.select(field_type='keyword'))
+        self.assertEqual([2, 4], table.select(field_type='keyword', top_level=True))
+        self.assertEqual([2], table.select(field_type='keyword', level='core', fieldset='dns'))
+        self.assertEqual([2], table.select(otel_relation='match'))
+        self.assertEqual([4], table.select(reused=True))
+        self.assertEqual([], table.select(fieldset='dns', field_type='date'))
+        self.assertEqual(3, table.count(fieldset='dns', reused=False))
+        self.assertEqual([1, 0, 2], table.sorted_by_name(table.select(fieldset='dns')))
+        self.assertEqual(['host.geo.name'], list(table.fields(table.select(fieldset='host'))))
+
+    def test_from_flat(self):
+        nested = self.nested()
+        table = FieldTable.from_flat(nested['dns']['fields'])
+        self.assertEqual([''], table.top_level_fieldsets)
+        self.assertEqual([0, 1, 2], table.select(top_level=True))
+
+    def test_top_level_rows_of(self):
+        nested = self.nested()
+        table = FieldTable(nested)
+        flat = {**nested['dns']['fields'], **nested['host']['fields']}
+        self.assertEqual([0, 1, 2, 4], table.top_level_rows_of(flat))
+        del flat['dns.id']
+        with self.assertRaisesRegex(ValueError, 'different builds'):
+            table.top_level_rows_of(flat)
+        with self.assertRaisesRegex(ValueError, 'different builds'):
+            table.top_level_rows_of({**flat, 'dns.name': {}})
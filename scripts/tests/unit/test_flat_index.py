@@ -0,0 +1,87 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from generators import flat_index
+from generators.flat_index import FlatIndexReader
+from generators.intermediate_files import FieldView
+
+
+class TestFlatIndex(unittest.TestCase):
+
+    def flat(self):
+        # More fields than the smallest hash table has slots, so some names collide
+        flat = {'process.pid': FieldView({'name': 'pid', 'node_name': 'pid', 'type': 'long'}),
+                'user.name': {'name': 'name', 'type': 'keyword', 'ignore_above': 1024, 'normalize': []},
+                'event.category': {'name': 'category', 'type': 'keyword',
+                                   'allowed_values': [{'name': 'file', 'expected_event_types': ['change']}]},
+                'labels.café': {'name': 'café', 'type': 'keyword'}}
+        for number in range(10):
+            flat['process.parent.pid{}'.format(number)] = {'name': 'pid{}'.format(number), 'type': 'long'}
+        return flat
+
+    def write_index(self, directory, flat):
+        path = os.path.join(directory, 'ecs_flat.idx')
+        flat_index.write(path, flat)
+        return path
+
+    def test_lookup(self):
+        flat = self.flat()
+        with tempfile.TemporaryDirectory() as directory:
+            with FlatIndexReader(self.write_index(directory, flat)) as index:
+                self.assertEqual(len(flat), len(index))
+                self.assertEqual(sorted(flat), list(index))
+                for (name, field) in flat.items():
+                    self.assertIn(name, index)
+                    self.assertEqual(field, index[name])
+                self.assertEqual({'name': 'pid', 'type': 'long'}, index['process.pid'])
+                self.assertEqual(1024, index['user.name']['ignore_above'])
+                self.assertNotIn('process', index)
+                self.assertNotIn(1, index)
+                self.assertIsNone(index.get('user.email'))
+                with self.assertRaises(KeyError):
+                    index['process.parent.pid10']
+                # Definitions are decoded anew on each lookup
+                index['user.name']['normalize'].append('array')
+                self.assertEqual([], index['user.name']['normalize'])
+
+    def test_names_with_prefix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with FlatIndexReader(self.write_index(directory, self.flat())) as index:
+                self.assertEqual(['process.parent.pid{}'.format(number) for number in range(10)],
+                                 index.names_with_prefix('process.parent.'))
+                self.assertEqual(['labels.café'], index.names_with_prefix('labels.'))
+                self.assertEqual(['user.name'], index.names_with_prefix('user'))
+                self.assertEqual([], index.names_with_prefix('zzz'))
+
+    def test_not_an_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ecs_flat.yml')
+            with open(path, 'w') as f:
+                f.write('user.name:\n  type: keyword\n' * 10)
+            with self.assertRaises(ValueError):
+                FlatIndexReader(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
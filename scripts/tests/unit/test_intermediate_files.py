@@ -0,0 +1,119 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import copy
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from generators import ecs_helpers
+from generators import intermediate_files
+from generators.intermediate_files import FieldView
+
+
+class TestIntermediateFiles(unittest.TestCase):
+
+    def field_details(self):
+        return {'name': 'name', 'node_name': 'name', 'flat_name': 'user.name', 'type': 'keyword',
+                'intermediate': False, 'normalize': ['array']}
+
+    def test_field_view(self):
+        details = self.field_details()
+        view = FieldView(details)
+        expected = {'name': 'name', 'flat_name': 'user.name', 'type': 'keyword', 'normalize': ['array']}
+        self.assertEqual(expected, view)
+        self.assertEqual(['name', 'flat_name', 'type', 'normalize'], list(view))
+        self.assertNotIn('node_name', view)
+        self.assertIsNone(view.get('intermediate'))
+        with self.assertRaises(TypeError):
+            view['type'] = 'wildcard'
+        for plain in [view.copy(), copy.deepcopy(view), pickle.loads(pickle.dumps(view))]:
+            self.assertIs(dict, type(plain))
+            self.assertEqual(expected, plain)
+        self.assertIsNot(details['normalize'], copy.deepcopy(view)['normalize'])
+        self.assertIs(details['normalize'], view['normalize'])
+
+    def test_yaml_dumps_views_like_copies(self):
+        details = self.field_details()
+        other = dict(details, flat_name='client.user.name', description='Needs double quotes \n' + 'wrap ' * 30)
+        views = {'user.name': FieldView(details), 'client.user.name': FieldView(other)}
+        copies = {name: copy.deepcopy(view) for (name, view) in views.items()}
+        # The shared normalize list isn't written as an anchor and alias
+        expected = yaml.dump(copies, default_flow_style=False, allow_unicode=True)
+        self.assertNotIn('&id', expected)
+        self.assertEqual(expected, ecs_helpers.yaml_dumps(views))
+        self.assertEqual(expected, yaml.dump(views, default_flow_style=False, allow_unicode=True))
+
+    def test_generate_flat_and_nested_fields(self):
+        fields = {
+            'user': {
+                'schema_details': {'root': False, 'title': 'User'},
+                'field_details': {'name': 'user', 'node_name': 'user', 'flat_name': 'user', 'dashed_name': 'user'},
+                'fields': {
+                    'name': {'field_details': self.field_details()},
+                    'group': {
+                        'field_details': {'name': 'group', 'node_name': 'group', 'flat_name': 'user.group',
+                                          'intermediate': True},
+                        'fields': {}
+                    },
+                },
+            },
+        }
+        flat, nested = intermediate_files.generate_flat_and_nested_fields(fields)
+        self.assertEqual(['user.name'], list(flat))
+        self.assertIsInstance(flat['user.name'], FieldView)
+        self.assertEqual(flat['user.name'], nested['user']['fields']['user.name'])
+        self.assertEqual({'name': 'user', 'title': 'User', 'fields': flat}, nested['user'])
+        self.assertIs(fields['user']['fields']['name']['field_details'], flat['user.name'].details)
+
+    def test_sidecars(self):
+        flat = {'user.name': FieldView(self.field_details()), 'user.id': {'name': 'id', 'example': 'caf\u00e9'}}
+        with tempfile.TemporaryDirectory() as out_dir:
+            ecs_helpers.yaml_dump(os.path.join(out_dir, 'ecs_flat.yml'), flat)
+            intermediate_files.write_sidecars(out_dir, 'ecs_flat', flat)
+            expected = ecs_helpers.yaml_load(os.path.join(out_dir, 'ecs_flat.yml'))
+            for formats in [('pickle',), ('json',), ('yaml',), intermediate_files.LOAD_FORMATS]:
+                loaded = intermediate_files.load_flat_fields(out_dir, formats)
+                self.assertEqual(expected, loaded)
+                self.assertIs(dict, type(loaded['user.name']))
+
+            # Only the contents of the YAML file matter, not its modification time
+            yaml_path = os.path.join(out_dir, 'ecs_flat.yml')
+            os.utime(yaml_path, (os.stat(yaml_path).st_atime, os.stat(yaml_path).st_mtime + 60))
+            self.assertEqual(expected, intermediate_files.load_flat_fields(out_dir, ('pickle', 'json')))
+
+            # The YAML file changed after the sidecars were written: they aren't used
+            with open(yaml_path, 'a') as f:
+                f.write('user.email:\n  name: email\n')
+            os.utime(yaml_path, (0, 0))
+            self.assertIn('user.email', intermediate_files.load_flat_fields(out_dir))
+            with self.assertRaises(FileNotFoundError):
+                intermediate_files.load_flat_fields(out_dir, ('json',))
+            with self.assertRaises(FileNotFoundError):
+                intermediate_files.load_flat_fields(out_dir, ('pickle', 'json'))
+            with self.assertRaises(ValueError):
+                intermediate_files.load_flat_fields(out_dir, ('msgpack',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,10 +19,12 @@ import os
 import pprint
 import sys
 import unittest
+import warnings
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from schema import cleaner
+from schema import pipeline_context
 
 
 class TestSchemaCleaner(unittest.TestCase):
@@ -30,6 +32,11 @@ class TestSchemaCleaner(unittest.TestCase):
     def setUp(self):
         self.maxDiff = None
 
+    def activate_strict_context(self):
+        activation = pipeline_context.PipelineContext(strict=True).activate()
+        activation.__enter__()
+        self.addCleanup(activation.__exit__, None, None, None)
+
     def schema_process(self):
         return {
             'process': {
@@ -355,6 +362,39 @@ class TestSchemaCleaner(unittest.TestCase):
         }
         self.assertIsNone(cleaner.validate_pattern_regex(field))
 
+    def test_compiled_pattern_is_cached(self):
+        regex = cleaner.compiled_pattern('^[a-z]+$')
+        self.assertIs(regex, cleaner.compiled_pattern('^[a-z]+$'))
+        self.assertTrue(regex.match('abc'))
+        self.assertIsNone(cleaner.compiled_pattern('[.*'))
+
+    def test_example_value_with_invalid_pattern_warns_strict_disabled(self):
+        field = {
+            'field_details': {
+                'name': 'test',
+                'pattern': '[.*',
+                'example': 'abc',
+            }
+        }
+        with self.assertWarnsRegex(UserWarning, 'valid regular expression'):
+            cleaner.field_pattern_regex(field, strict=False)
+        cleaner.check_example_value(field, strict=False)
+
+    def test_rule_stats(self):
+        cleaner.enable_rule_stats()
+        try:
+            cleaner.clean(self.schema_process())
+            stats = pipeline_context.current().rule_stats
+            table = cleaner.format_rule_stats()
+        finally:
+            cleaner.disable_rule_stats()
+        self.assertEqual(stats['schema.short_description'].calls, 1)
+        self.assertEqual(stats['field.level'].calls, 2)
+        self.assertEqual(stats['schema.mandatory_attributes'].calls, 1)
+        self.assertEqual(stats['field.mandatory_attributes'].calls, 2)
+        self.assertNotIn('field.pattern_regex', stats)
+        self.assertIn('field.level', table)
+
     def test_field_example_value_is_object_raises(self):
         field = {
             'field_details': {
@@ -623,7 +663,7 @@ class TestSchemaCleaner(unittest.TestCase):
             self.fail("cleaner.single_line_alpha_description() raised Exception unexpectedly.")
 
     def test_alpha_only_on_schema_passes(self):
-        cleaner.strict_mode = True
+        self.activate_strict_context()
         schema = {
             'schema_details': {'title': 'Test'},
             'field_details': {
@@ -639,7 +679,7 @@ class TestSchemaCleaner(unittest.TestCase):
             self.fail("schema_assertions_and_warnings() raised ValueError for alpha-only schema.")
 
     def test_alpha_only_on_field_passes(self):
-        cleaner.strict_mode = True
+        self.activate_strict_context()
         field = {
             'field_details': {
                 'name': 'test_field',
@@ -657,7 +697,7 @@ class TestSchemaCleaner(unittest.TestCase):
             self.fail("field_assertions_and_warnings() raised ValueError for alpha-only field.")
 
     def test_alpha_and_beta_mutual_exclusion_on_schema(self):
-        cleaner.strict_mode = True
+        self.activate_strict_context()
         schema = {
             'schema_details': {'title': 'Test'},
             'field_details': {
@@ -672,7 +712,7 @@ class TestSchemaCleaner(unittest.TestCase):
             cleaner.schema_assertions_and_warnings(schema)
 
     def test_alpha_and_beta_mutual_exclusion_on_field(self):
-        cleaner.strict_mode = True
+        self.activate_strict_context()
         field = {
             'field_details': {
                 'name': 'test_field',
@@ -688,6 +728,44 @@ class TestSchemaCleaner(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, 'cannot have both alpha and beta'):
             cleaner.field_assertions_and_warnings(field)
 
+    def fieldsets_with_problems(self):
+        fields = self.schema_process()
+        for i in range(3):
+            name = 'acme{}'.format(i)
+            fields[name] = {
+                'schema_details': {'title': name},
+                'field_details': {'name': name, 'description': name + ' fields'},
+                'fields': {
+                    'one': {'field_details': {'name': 'one', 'level': 'custom', 'type': 'keyword',
+                                              'description': 'x' * 121}},
+                    'two': {'field_details': {'name': 'two', 'level': 'custom', 'type': 'keyword',
+                                              'description': 'Two.', 'example': [1]}},
+                }
+            }
+        return fields
+
+    def test_clean_parallel_matches_serial(self):
+        serial = self.fieldsets_with_problems()
+        parallel = self.fieldsets_with_problems()
+        with warnings.catch_warnings(record=True) as serial_warnings:
+            warnings.simplefilter('always')
+            cleaner.clean(serial)
+        with warnings.catch_warnings(record=True) as parallel_warnings:
+            warnings.simplefilter('always')
+            cleaner.clean(parallel, jobs=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(list(serial), list(parallel))
+        self.assertEqual(6, len(serial_warnings))
+        self.assertEqual([str(w.message) for w in serial_warnings], [str(w.message) for w in parallel_warnings])
+
+    def test_clean_parallel_raises_first_error(self):
+        fields = self.fieldsets_with_problems()
+        del fields['acme1']['field_details']['description']
+        del fields['acme2']['field_details']['description']
+        with self.assertRaisesRegex(ValueError, 'Schema acme1 is missing'), warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            cleaner.clean(fields, strict=False, jobs=2)
+
     def test_clean(self):
         """A high level sanity test"""
         fields = self.schema_process()
@@ -0,0 +1,121 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from schema import cleaner
+from schema import field_budget
+from schema import finalizer
+from schema import loader
+from schema import subset_filter
+from schema.field_budget import FieldCounts
+
+
+class TestSchemaFieldBudget(unittest.TestCase):
+
+    def schema_reusable(self, name, expected, fields=None):
+        return {
+            name: {
+                'schema_details': {
+                    'root': False,
+                    'reusable': {
+                        'order': 2,
+                        'top_level': True,
+                        'expected': [{'at': at, 'as': nest_as, 'full': at + '.' + nest_as}
+                                     for (at, nest_as) in expected],
+                    },
+                },
+                'field_details': {'name': name, 'node_name': name, 'type': 'group', 'short': name + ' fields'},
+                'fields': fields or {'id': {'field_details': {'name': 'id', 'node_name': 'id', 'type': 'keyword'}}},
+            }
+        }
+
+    def test_count_fields(self):
+        fields = {
+            'base': {
+                'schema_details': {'root': True},
+                'field_details': {'name': 'base', 'type': 'group'},
+                'fields': {'message': {'field_details': {'name': 'message', 'type': 'match_only_text'}}},
+            },
+            **self.schema_reusable('process', [], fields={
+                'name': {'field_details': {'name': 'name', 'type': 'keyword', 'multi_fields': [{'name': 'text'}]}},
+                'env': {'field_details': {'name': 'env', 'type': 'object'}},
+            }),
+        }
+        self.assertEqual(FieldCounts(leaves=3, multi_fields=1, objects=1), field_budget.count_fields(fields))
+
+    def test_predict(self):
+        process_fields = {
+            'pid': {'field_details': {'name': 'pid', 'node_name': 'pid', 'type': 'long'}},
+            # Defined here, and replaced by the self-nesting
+            'parent': {
+                'field_details': {'name': 'parent', 'node_name': 'parent', 'type': 'group'},
+                'fields': {'tid': {'field_details': {'name': 'tid', 'node_name': 'tid', 'type': 'long'}}},
+            },
+        }
+        fields = {
+            **self.schema_reusable('user', [('process', 'user'), ('user', 'target')]),
+            **self.schema_reusable('group', [('user', 'group')]),
+            **self.schema_reusable('process', [('process', 'parent'), ('process.parent', 'group_leader')],
+                                   fields=process_fields),
+            # Turns the object field user.env into an object with nested fields
+            **self.schema_reusable('geo', [('user.env', 'geo')]),
+        }
+        fields['user']['fields']['env'] = {'field_details': {'name': 'env', 'node_name': 'env', 'type': 'object'}}
+        predicted = field_budget.predict(fields)
+        finalizer.perform_reuse(fields)
+        self.assertEqual(field_budget.count_fields(fields), predicted)
+
+    def test_predict_ecs(self):
+        fields = loader.load_schemas()
+        cleaner.clean(fields)
+        predicted = field_budget.predict(fields)
+        finalizer.finalize(fields)
+        self.assertEqual(field_budget.count_fields(fields), predicted)
+
+    def test_predict_lazy_subset(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            subset_file = os.path.join(tmpdir, 'small.yml')
+            with open(subset_file, 'w') as f:
+                f.write('name: small\nfields:\n  base:\n    fields: "*"\n  destination:\n    fields: "*"\n')
+            fields = subset_filter.prune_unused_fieldsets(loader.load_schemas(), [subset_file])
+        finally:
+            shutil.rmtree(tmpdir)
+        cleaner.clean(fields)
+        predicted = field_budget.predict(fields, partial=True)
+        finalizer.finalize(fields, partial=True)
+        self.assertEqual(field_budget.count_fields(fields), predicted)
+
+    def test_check(self):
+        fields = {
+            **self.schema_reusable('user', [('server', 'user')]),
+            **self.schema_reusable('server', []),
+        }
+        # server, server.id, server.user, server.user.id, user, user.id
+        self.assertEqual(6, field_budget.check(fields, 6).total)
+        self.assertEqual(6, field_budget.check(fields, None).total)
+        with self.assertRaisesRegex(ValueError, 'Reuse would produce 6 fields .* over the budget of 5'):
+            field_budget.check(fields, 5)
+        # Nothing was reused
+        self.assertNotIn('user', fields['server']['fields'])
@@ -0,0 +1,93 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from schema.field_index import FieldIndex
+
+
+class TestSchemaFieldIndex(unittest.TestCase):
+
+    def fields(self):
+        return {
+            'process': {
+                'field_details': {'type': 'group'},
+                'fields': {
+                    'pid': {'field_details': {'type': 'long'}},
+                    'parent': {
+                        'field_details': {'type': 'group'},
+                        'fields': {'pid': {'field_details': {'type': 'long'}}},
+                    },
+                    'env': {'field_details': {'type': 'object'}},
+                },
+            },
+        }
+
+    def test_get(self):
+        fields = self.fields()
+        index = FieldIndex(fields)
+        self.assertIs(fields['process']['fields']['parent']['fields']['pid'], index.get('process.parent.pid'))
+        self.assertIn('process.parent', index.entries)
+        self.assertIsNone(index.get('process.parent.name'))
+        self.assertIsNone(index.get('process.pid.value'))
+
+    def test_insert_replaces_and_forgets_what_was_indexed_under_it(self):
+        fields = self.fields()
+        index = FieldIndex(fields)
+        index.get('process.parent.pid')
+        parent = {'field_details': {'type': 'group'}, 'fields': {'name': {'field_details': {'type': 'keyword'}}}}
+        index.insert('process', 'parent', parent)
+        self.assertIs(parent, fields['process']['fields']['parent'])
+        self.assertIsNone(index.get('process.parent.pid'))
+        self.assertIs(parent['fields']['name'], index.get('process.parent.name'))
+
+    def test_insert_with_dotted_name(self):
+        fields = self.fields()
+        index = FieldIndex(fields)
+        entry = {'field_details': {'type': 'group'}}
+        index.insert('process', 'relationships.owns', entry)
+        self.assertIs(entry, fields['process']['fields']['relationships.owns'])
+        self.assertIs(entry, index.get('process.relationships.owns'))
+
+    def test_remove(self):
+        fields = self.fields()
+        index = FieldIndex(fields)
+        index.get('process.parent.pid')
+        removed = index.remove('process.parent')
+        self.assertEqual({'pid': {'field_details': {'type': 'long'}}}, removed['fields'])
+        self.assertNotIn('parent', fields['process']['fields'])
+        self.assertIsNone(index.get('process.parent.pid'))
+        with self.assertRaises(KeyError):
+            index.remove('process.parent')
+
+    def test_field_group(self):
+        fields = self.fields()
+        index = FieldIndex(fields)
+        self.assertIs(fields['process']['fields'], index.field_group('process'))
+        # Created for object fields
+        self.assertEqual({}, index.field_group('process.env'))
+        self.assertIn('fields', fields['process']['fields']['env'])
+        with self.assertRaisesRegex(ValueError, 'Field process.pid \\(type long\\) already exists'):
+            index.field_group('process.pid')
+        with self.assertRaisesRegex(ValueError, 'Field process.pid.value \\(type long\\) already exists'):
+            index.field_group('process.pid.value')
+        with self.assertRaisesRegex(ValueError, 'Field process.nope.value not found, failed to find nope'):
+            index.field_group('process.nope.value')
@@ -15,14 +15,22 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import json
 import os
 import pprint
+import shutil
 import sys
+import tempfile
 import unittest
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
+from generators import es_template
+from generators import intermediate_files
+from schema import cleaner
 from schema import finalizer
+from schema import loader
+from schema import pipeline_context
 
 
 class TestSchemaFinalizer(unittest.TestCase):
@@ -412,12 +420,184 @@ class TestSchemaFinalizer(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, 'destination_schema.*root.*cannot'):
             finalizer.ensure_valid_reuse(reused_schema, destination_schema)
 
-    # calculate_final_values
+    def schema_reusable(self, name, expected, order=2, root=False):
+        return {
+            name: {
+                'schema_details': {
+                    'root': root,
+                    'reusable': {
+                        'order': order,
+                        'top_level': True,
+                        'expected': [{'at': at, 'as': nest_as, 'full': at + '.' + nest_as}
+                                     for (at, nest_as) in expected],
+                    },
+                },
+                'field_details': {'name': name, 'node_name': name, 'type': 'group', 'short': name + ' fields'},
+                'fields': {'id': {'field_details': {'name': 'id', 'node_name': 'id', 'type': 'keyword'}}},
+            }
+        }
 
-    def test_calculate_final_values(self):
-        fields = {**self.schema_base(), **self.schema_user(), **self.schema_server()}
+    def test_reuse_order_runs_dependencies_first_then_in_sequence(self):
+        fields = {
+            **self.schema_reusable('user', [('server', 'user'), ('user', 'target')]),
+            **self.schema_reusable('group', [('user', 'group')], order=1),
+            **self.schema_reusable('geo', [('server', 'geo')]),
+            **self.schema_reusable('server', []),
+        }
+        tasks = finalizer.build_reuse_graph(fields)
+        self.assertEqual([
+            'group at user.group',
+            'user at server.user',
+            'geo at server.geo',
+            # Self-nestings come after the foreign reuses of the same field set
+            'user at user.target',
+        ], [repr(task) for task in finalizer.reuse_order(tasks)])
         finalizer.perform_reuse(fields)
-        finalizer.calculate_final_values(fields)
+        self.assertIn('group', fields['server']['fields']['user']['fields'])
+        self.assertNotIn('target', fields['server']['fields']['user']['fields'])
+        self.assertIn('group', fields['user']['fields']['target']['fields'])
+        self.assertEqual(['id', 'user', 'geo'], list(fields['server']['fields']))
+
+    def test_reuse_order_reports_unsatisfiable_dependencies(self):
+        fields = {
+            **self.schema_reusable('user', [('server', 'user')]),
+            **self.schema_reusable('geo', [('server', 'geo')]),
+            **self.schema_reusable('server', []),
+        }
+        tasks = finalizer.build_reuse_graph(fields)
+        tasks[0].depends_on.add(tasks[1].index)
+        tasks[1].depends_on.add(tasks[0].index)
+        with self.assertRaisesRegex(ValueError, 'Reuses depend on each other: user at server.user, geo at server.geo'):
+            finalizer.reuse_order(tasks)
+
+    def test_reuse_cycle_is_detected_before_copying(self):
+        fields = {
+            **self.schema_reusable('user', [('host', 'user')]),
+            **self.schema_reusable('host', [('user', 'host'), ('host', 'target')]),
+        }
+        with self.assertRaisesRegex(ValueError, 'Reuse cycle between field sets: host -> user -> host'):
+            finalizer.perform_reuse(fields)
+        self.assertEqual(['id'], list(fields['user']['fields']))
+        self.assertEqual(['id'], list(fields['host']['fields']))
+
+    def test_reuse_stats(self):
+        fields = {
+            **self.schema_reusable('user', [('server', 'user'), ('user', 'target')]),
+            **self.schema_reusable('group', [('user', 'group')], order=1),
+            **self.schema_reusable('server', []),
+        }
+        finalizer.enable_reuse_stats()
+        try:
+            finalizer.perform_reuse(fields)
+            profile = finalizer.sorted_reuse_stats()
+            table = finalizer.format_reuse_stats()
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                finalizer.write_reuse_stats(os.path.join(tmp_dir, 'profile.json'))
+                with open(os.path.join(tmp_dir, 'profile.json')) as infile:
+                    written = json.load(infile)
+        finally:
+            finalizer.disable_reuse_stats()
+        # user carries group's fields: id, group, group.id
+        self.assertEqual([('server.user', 3), ('user.target', 3), ('user.group', 1)],
+                         [(stats.full, stats.fields) for stats in profile])
+        self.assertTrue(all(stats.bytes > 0 for stats in profile))
+        self.assertIn('total (3 reuses)', table)
+        self.assertEqual(['server.user', 'user.target', 'user.group'], [reuse['full'] for reuse in written['reuses']])
+        self.assertEqual(7, written['total']['fields'])
+        self.assertIsNone(pipeline_context.current().reuse_stats)
+
+    def test_root_violation_is_detected_before_copying(self):
+        fields = {
+            **self.schema_reusable('geo', [('host', 'geo')], order=1),
+            **self.schema_reusable('host', []),
+            **self.schema_reusable('base', [('host', 'base')], root=True),
+        }
+        with self.assertRaisesRegex(ValueError, 'base.*root.*cannot be reused'):
+            finalizer.perform_reuse(fields)
+        self.assertNotIn('geo', fields['host']['fields'])
+
+    def test_reuse_into_missing_fieldset_is_detected_before_copying(self):
+        fields = {
+            **self.schema_reusable('geo', [('host', 'geo'), ('missing', 'geo')]),
+            **self.schema_reusable('host', []),
+        }
+        with self.assertRaisesRegex(ValueError, 'geo is reused at missing.geo, but there is no field set missing'):
+            finalizer.perform_reuse(fields)
+        self.assertNotIn('geo', fields['host']['fields'])
+
+    def test_custom_reuse_keeps_the_component_templates(self):
+        # Custom fields reused last into host and process: their templates don't link to the ECS docs
+        custom_dir = tempfile.mkdtemp()
+        out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, custom_dir)
+        self.addCleanup(shutil.rmtree, out_dir)
+        with open(os.path.join(custom_dir, 'acme.yml'), 'w') as f:
+            f.write('''---
+- name: acme
+  title: Acme
+  short: Acme fields.
+  description: Acme fields.
+  type: group
+  reusable:
+    top_level: true
+    expected:
+      - host
+      - process
+  fields:
+    - name: id
+      level: custom
+      type: keyword
+      description: Acme id.
+''')
+        ecs_dir = os.path.join(out_dir, 'ecs')
+        custom_out_dir = os.path.join(out_dir, 'custom')
+        for (included_files, template_dir) in [(None, ecs_dir), ([custom_dir], custom_out_dir)]:
+            fields = loader.load_schemas(included_files=included_files)
+            cleaner.clean(fields)
+            finalizer.finalize(fields)
+            es_template.all_component_templates(intermediate_files.generate_nested_fields(fields), '9.0.0',
+                                                template_dir)
+
+        for name in ['host', 'process']:
+            with open(os.path.join(ecs_dir, 'elasticsearch/composable/component', name + '.json')) as f:
+                expected = json.load(f)
+            with open(os.path.join(custom_out_dir, 'elasticsearch/composable/component', name + '.json')) as f:
+                template = json.load(f)
+            self.assertEqual({'ecs_version': '9.0.0'}, template['_meta'])
+            self.assertEqual({'id': {'ignore_above': 1024, 'type': 'keyword'}},
+                             template['template']['mappings']['properties'][name]['properties']['acme']['properties'])
+            self.assertEqual(expected['template'], self.without_mappings_of(template['template'], 'acme'))
+
+    def without_mappings_of(self, mappings, name):
+        return {key: self.without_mappings_of(value, name) if isinstance(value, dict) else value
+                for (key, value) in mappings.items() if key != name}
+
+    def test_reuse_copy_shares_only_what_is_not_modified_per_location(self):
+        fields = {
+            'name': {'field_details': {'name': 'name', 'normalize': ['array'],
+                                       'multi_fields': [{'name': 'text', 'type': 'match_only_text'}]}},
+            'group': {
+                'field_details': {'name': 'group', 'original_fieldset': 'group'},
+                'fields': {'id': {'field_details': {'name': 'group.id'}}},
+            },
+        }
+        copied = finalizer.reuse_copy(fields, 'user')
+        self.assertEqual('user', copied['name']['field_details']['original_fieldset'])
+        self.assertEqual('group', copied['group']['field_details']['original_fieldset'])
+        self.assertEqual('user', copied['group']['fields']['id']['field_details']['original_fieldset'])
+        self.assertNotIn('original_fieldset', fields['name']['field_details'])
+        # Modified per location: copied
+        self.assertIsNot(fields['group']['fields'], copied['group']['fields'])
+        self.assertIsNot(fields['name']['field_details']['multi_fields'][0],
+                         copied['name']['field_details']['multi_fields'][0])
+        # Not modified after reuse: shared
+        self.assertIs(fields['name']['field_details']['normalize'], copied['name']['field_details']['normalize'])
+
+    # Final values
+
+    def test_finalize_calculates_final_values(self):
+        fields = {**self.schema_base(), **self.schema_user(), **self.schema_server()}
+        finalizer.finalize(fields)
         base_fields = fields['base']['fields']
         server_fields = fields['server']['fields']
         user_fields = fields['user']['fields']
@@ -443,10 +623,24 @@ class TestSchemaFinalizer(unittest.TestCase):
         user_full_name_details = user_fields['full_name']['field_details']
         self.assertEqual(user_full_name_details['multi_fields'][0]['flat_name'], 'user.full_name.text')
 
+    def test_finalize_names_fields_as_they_are_placed(self):
+        fields = {**self.schema_base(), **self.schema_user(), **self.schema_server()}
+        fields['user']['fields']['name']['field_details']['otel'] = [{'relation': 'match'}]
+        fields['user']['fields']['name']['field_details']['otel_reuse'] = [
+            {'ecs': 'server.user.name', 'mapping': {'relation': 'equivalent', 'attribute': 'server.user.name'}},
+        ]
+        finalizer.finalize(fields)
+        self.assertEqual('server.user.name',
+                         fields['server']['fields']['user']['fields']['name']['field_details']['flat_name'])
+        self.assertEqual([{'relation': 'equivalent', 'attribute': 'server.user.name'}],
+                         fields['server']['fields']['user']['fields']['name']['field_details']['otel'])
+        self.assertNotIn('otel', fields['user']['fields']['target']['fields']['name']['field_details'])
+        self.assertNotIn('otel_reuse', fields['user']['fields']['name']['field_details'])
+
     def test_dashed_name_cleanup(self):
-        details = {'field_details': {'node_name': '@time.stamp_'}}
-        finalizer.field_finalizer(details, [])
-        self.assertEqual(details['field_details']['dashed_name'], 'time-stamp-')
+        field_details = {'node_name': '@time.stamp_'}
+        finalizer.name_field(field_details, '', '')
+        self.assertEqual(field_details['dashed_name'], 'time-stamp-')
 
     # field_group_at_path
 
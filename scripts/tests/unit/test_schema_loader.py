@@ -15,6 +15,7 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import copy
 import mock
 import os
 import pprint
@@ -178,6 +179,32 @@ class TestSchemaLoader(unittest.TestCase):
         res = loader.load_schema_files(['a.yml', 'b.yml'])
         self.assertEqual(res, exp)
 
+    @mock.patch('schema.loader.read_schema_file')
+    def test_load_schemas_reports_all_duplicates_with_origin(self, mock_read_schema):
+        mock_read_schema.side_effect = [
+            {'file': {'name': 'file'}, 'host': {'name': 'host'}},
+            {'agent': {'name': 'agent'}},
+            {'file': {'name': 'file'}, 'host': {'name': 'host'}},
+            {'file': {'name': 'file'}},
+        ]
+        with self.assertRaises(ValueError) as cm:
+            loader.load_schema_files(['a.yml', 'b.yml', 'c.yml', 'd.yml'])
+        self.assertEqual(
+            str(cm.exception),
+            'Duplicate key found when merging dictionaries: ' +
+            'file (defined in a.yml, c.yml, d.yml); host (defined in a.yml, c.yml)')
+
+    def test_load_schema_files_parallel_matches_serial(self):
+        files = ['schemas/agent.yml', 'schemas/base.yml', 'schemas/process.yml', 'schemas/x509.yml']
+        serial = loader.load_schema_files(files)
+        parallel = loader.load_schema_files(files, jobs=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(list(serial.keys()), list(parallel.keys()))
+
+    def test_load_schema_files_parallel_fails_on_duplicate(self):
+        with self.assertRaisesRegex(ValueError, 'Duplicate key found when merging dictionaries: agent'):
+            loader.load_schema_files(['schemas/agent.yml', 'schemas/base.yml', 'schemas/agent.yml'], jobs=2)
+
     def test_nest_schema_raises_on_missing_schema_name(self):
         with self.assertRaisesRegex(ValueError, 'incomplete.yml'):
             loader.nest_schema([{'description': 'just a description'}], 'incomplete.yml')
@@ -215,6 +242,19 @@ class TestSchemaLoader(unittest.TestCase):
             sorted(fields.keys()),
             "Raw schema fields should have expected fieldsets for v1.0.0")
 
+    def test_read_schema_blob_parses_each_blob_once(self):
+        with open('schemas/agent.yml', 'rb') as f:
+            content = f.read()
+        blob = mock.Mock(hexsha='0' * 40)
+        blob.name = 'agent.yml'
+        blob.data_stream.read.return_value = content
+        with mock.patch.dict(loader._parsed_blobs, clear=True):
+            first = loader.read_schema_blob(blob, 'v1.0.0')
+            second = loader.read_schema_blob(blob, 'v2.0.0')
+        self.assertEqual(1, blob.data_stream.read.call_count)
+        self.assertEqual(first, second)
+        self.assertIsNot(first['agent'], second['agent'])
+
     def test_load_schemas_from_git_missing_target_directory(self):
         with self.assertRaisesRegex(KeyError, "not present in git ref"):
             loader.load_schemas_from_git('v1.5.0', target_dir='nonexistent_dir')
@@ -643,6 +683,28 @@ class TestSchemaLoader(unittest.TestCase):
             ['array'])
         self.assertEqual(merged_fields, expected_fields)
 
+    def test_merge_leaves_inputs_untouched_and_shares_unmodified_subtrees(self):
+        ecs = self.schema_process()
+        custom = {
+            'process': {
+                'schema_details': {},
+                'field_details': {'name': 'process'},
+                'fields': {
+                    'pid': {'field_details': {'name': 'pid', 'normalize': ['array']}},
+                    'title': {'field_details': {'name': 'title', 'type': 'keyword'}}
+                }
+            }
+        }
+        ecs_before = copy.deepcopy(ecs)
+        custom_before = copy.deepcopy(custom)
+        merged_fields = loader.merge_fields(ecs, custom)
+        self.assertEqual(ecs, ecs_before)
+        self.assertEqual(custom, custom_before)
+        self.assertEqual(merged_fields['process']['fields']['pid']['field_details']['normalize'], ['array'])
+        self.assertIsNot(merged_fields['process']['fields']['pid'], ecs['process']['fields']['pid'])
+        self.assertIs(merged_fields['process']['fields']['parent'], ecs['process']['fields']['parent'])
+        self.assertIs(merged_fields['process']['fields']['title'], custom['process']['fields']['title'])
+
     def test_merge_non_array_attributes(self):
         custom = {
             'base': {
@@ -0,0 +1,95 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import mock
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from schema import loader
+from schema import parse_cache
+
+
+class TestSchemaParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        parse_cache.disable()
+        shutil.rmtree(self.tmpdir)
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(parse_cache.active)
+        self.assertEqual(parse_cache.safe_load('a: 1'), {'a': 1})
+
+    def test_hit_skips_yaml_parsing(self):
+        cache = parse_cache.enable(self.tmpdir)
+        first = loader.read_schema_file('schemas/agent.yml')
+        with mock.patch('generators.ecs_helpers.yaml_safe_load') as mock_load:
+            second = loader.read_schema_file('schemas/agent.yml')
+            self.assertFalse(mock_load.called)
+        self.assertEqual(first, second)
+        self.assertIsNot(first['agent'], second['agent'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_is_file_contents(self):
+        cache = parse_cache.enable(self.tmpdir)
+        self.assertEqual(cache.entry_path('a: 1'), cache.entry_path('a: 1'))
+        self.assertNotEqual(cache.entry_path('a: 1'), cache.entry_path('a: 2'))
+
+    def test_corrupt_entry_is_reparsed(self):
+        cache = parse_cache.enable(self.tmpdir)
+        with open(cache.entry_path('a: 1'), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(cache.safe_load('a: 1'), {'a': 1})
+        self.assertEqual(cache.safe_load('a: 1'), {'a': 1})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_eviction_keeps_cache_under_budget(self):
+        cache = parse_cache.enable(self.tmpdir, max_bytes=200)
+        for i in range(20):
+            cache.safe_load('key_{0}: {1}'.format(i, 'x' * 40))
+        sizes = [os.path.getsize(os.path.join(self.tmpdir, f)) for f in os.listdir(self.tmpdir)]
+        self.assertLessEqual(sum(sizes), 200)
+        self.assertTrue(os.path.exists(cache.entry_path('key_19: ' + 'x' * 40)))
+
+    def test_directory_is_scanned_only_when_over_budget(self):
+        cache = parse_cache.enable(self.tmpdir, max_bytes=10000)
+        with mock.patch.object(cache, 'scan', wraps=cache.scan) as mock_scan:
+            for i in range(20):
+                cache.safe_load('key_{0}: {1}'.format(i, 'x' * 40))
+        # Once to count what is already there, never to evict
+        self.assertEqual(mock_scan.call_count, 1)
+
+    def test_workers_use_the_cache_of_their_parent(self):
+        cache = parse_cache.enable(self.tmpdir)
+        parse_cache.disable()
+        loaded = loader.read_schema_files(['schemas/agent.yml', 'schemas/as.yml'], jobs=2)
+        self.assertEqual(loaded, loader.read_schema_files(['schemas/agent.yml', 'schemas/as.yml']))
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        parse_cache.use(cache)
+        loader.read_schema_files(['schemas/agent.yml', 'schemas/as.yml'], jobs=2)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
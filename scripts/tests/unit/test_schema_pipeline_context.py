@@ -0,0 +1,125 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import copy
+import os
+import sys
+import threading
+import tracemalloc
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from generators import intermediate_files
+from schema import cleaner
+from schema import finalizer
+from schema import loader
+from schema import pipeline_context
+from schema import validation_report
+from schema.pipeline_context import PipelineContext
+
+
+class TestSchemaPipelineContext(unittest.TestCase):
+
+    def schema_with_bad_field(self):
+        return {
+            'acme': {
+                'schema_details': {'title': 'Acme', 'root': False},
+                'field_details': {'name': 'acme', 'description': 'Acme fields.'},
+                'fields': {
+                    'id': {
+                        'field_details': {'name': 'id', 'level': 'custom', 'type': 'keyword', 'description': 'Id.',
+                                          'pattern': '^[0-9]+$', 'example': 'abc'}
+                    },
+                }
+            }
+        }
+
+    def test_activate(self):
+        context = PipelineContext(strict=True, report=validation_report.ValidationReport())
+        with context.activate():
+            self.assertIs(context, pipeline_context.current())
+            self.assertIs(context.report, validation_report.current())
+            cleaner.clean(self.schema_with_bad_field())
+        self.assertIsNot(context, pipeline_context.current())
+        # Strict: the example not matching the pattern is an error
+        self.assertEqual(1, len(context.report.errors))
+
+    def test_strict_lasts_for_one_clean_outside_of_a_context(self):
+        with self.assertRaisesRegex(ValueError, 'does not match the regex'):
+            cleaner.clean(self.schema_with_bad_field(), strict=True)
+        with self.assertWarnsRegex(UserWarning, 'does not match the regex'):
+            cleaner.clean(self.schema_with_bad_field())
+        self.assertFalse(pipeline_context.current().strict)
+
+    def test_strict_of_one_clean_does_not_change_the_active_context(self):
+        context = PipelineContext(strict=True)
+        with context.activate():
+            with self.assertWarnsRegex(UserWarning, 'does not match the regex'):
+                cleaner.clean(self.schema_with_bad_field(), strict=False)
+            self.assertTrue(context.strict)
+            with self.assertRaisesRegex(ValueError, 'does not match the regex'):
+                cleaner.clean(self.schema_with_bad_field())
+
+    def test_threads_have_their_own_context(self):
+        def build(strict):
+            context = PipelineContext(strict=strict, report=validation_report.ValidationReport())
+            with context.activate():
+                for _ in range(20):
+                    cleaner.clean(self.schema_with_bad_field())
+            return context.report
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            reports = list(pool.map(build, [True, False, True, False]))
+        self.assertEqual([20, 0, 20, 0], [len(report.errors) for report in reports])
+        self.assertEqual([0, 20, 0, 20], [len(report.warnings) for report in reports])
+        # Nothing leaked into this thread's context
+        self.assertIsNone(validation_report.current())
+        self.assertFalse(pipeline_context.current().strict)
+
+    def test_concurrent_builds(self):
+        cleaned = loader.load_schemas()
+        cleaner.clean(cleaned)
+        expected = copy.deepcopy(cleaned)
+        finalizer.finalize(expected)
+        expected_flat = intermediate_files.generate_flat_fields(expected)
+        barrier = threading.Barrier(3, timeout=60)
+
+        def build(profiled):
+            fields = copy.deepcopy(cleaned)
+            with PipelineContext().activate() as context:
+                if profiled:
+                    finalizer.enable_reuse_stats()
+                barrier.wait()
+                finalizer.finalize(fields)
+                profile = finalizer.sorted_reuse_stats()
+                finalizer.disable_reuse_stats()
+                self.assertIsNone(context.reuse_stats)
+            return intermediate_files.generate_flat_fields(fields), profile
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(build, [True, True, False]))
+        for (flat, _) in results:
+            self.assertEqual(expected_flat, flat)
+        self.assertEqual(len(results[0][1]), len(results[1][1]))
+        self.assertTrue(results[0][1])
+        self.assertEqual([], results[2][1])
+        # Stopped by the last profiled build
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,11 +17,17 @@
 
 import mock
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
+from generators import intermediate_files
+from schema import cleaner
+from schema import finalizer
+from schema import loader
 from schema import subset_filter
 
 
@@ -280,6 +286,56 @@ class TestSchemaSubsetFilter(unittest.TestCase):
         }
         self.assertEqual(filtered_fields, expected_fields)
 
+    def test_reuse_sources_are_transitive(self):
+        fields = {
+            'destination': {'schema_details': {}},
+            'group': {'schema_details': {'reusable': {'expected': ['user']}}},
+            'user': {'schema_details': {'reusable': {'expected': [{'at': 'destination', 'as': 'user'}]}}},
+            'geo': {'schema_details': {'reusable': {'expected': ['source']}}},
+        }
+        self.assertEqual(subset_filter.reuse_sources(fields, {'destination'}), {'user', 'group'})
+        self.assertEqual(subset_filter.reuse_sources(fields, {'user'}), {'group'})
+
+    def test_prune_unused_fieldsets_matches_full_pipeline(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            subset_file = os.path.join(tmpdir, 'small.yml')
+            with open(subset_file, 'w') as f:
+                f.write('name: small\nfields:\n  base:\n    fields: "*"\n  destination:\n    fields: "*"\n' +
+                        '  process:\n    fields:\n      pid: {}\n      parent:\n        fields: "*"\n')
+            subset = subset_filter.combine_all_subsets(subset_filter.load_subset_definitions([subset_file]))
+            full = loader.load_schemas()
+            cleaner.clean(full)
+            finalizer.finalize(full)
+            full = subset_filter.extract_matching_fields(full, subset)
+
+            lazy = subset_filter.prune_unused_fieldsets(loader.load_schemas(), [subset_file])
+            self.assertIn('group', lazy)
+            self.assertNotIn('host', lazy)
+            cleaner.clean(lazy)
+            finalizer.finalize(lazy, partial=True)
+            lazy = subset_filter.extract_matching_fields(lazy, subset)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(intermediate_files.generate_nested_fields(lazy),
+                         intermediate_files.generate_nested_fields(full))
+        self.assertEqual(intermediate_files.generate_flat_fields(lazy),
+                         intermediate_files.generate_flat_fields(full))
+
+    def test_filter_can_run_once_per_ref(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            results = []
+            for _ in range(2):
+                fields = loader.load_schemas()
+                cleaner.clean(fields)
+                finalizer.finalize(fields)
+                results.append(subset_filter.filter(fields, ['schemas/subsets/main.yml'], tmpdir))
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(results[0], results[1])
+        self.assertNotEqual({}, results[1][1])
+
     def test_generate_docs_only_paths_no_entries(self):
         subset = {
             'process': {
@@ -319,6 +375,8 @@ class TestSchemaSubsetFilter(unittest.TestCase):
         docs_only_paths = subset_filter.generate_docs_only_paths(subset)
 
         self.assertEqual(docs_only_paths, expected_list)
+        # Paths don't accumulate across calls
+        self.assertEqual(subset_filter.generate_docs_only_paths(subset), expected_list)
 
     def test_generate_docs_only_subset(self):
         paths = ['process.same_as_process', 'process.meta_entry.type']
@@ -0,0 +1,184 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from generators import otel
+from schema import cleaner
+from schema import finalizer
+from schema import validation_report
+
+
+class TestSchemaValidationReport(unittest.TestCase):
+
+    def tearDown(self):
+        validation_report.disable()
+
+    def schema_with_bad_fields(self):
+        return {
+            'acme': {
+                'schema_details': {'title': 'Acme', 'root': False},
+                'field_details': {'name': 'acme', 'description': 'Acme fields.'},
+                'fields': {
+                    'no_description': {
+                        'field_details': {'name': 'no_description', 'level': 'custom', 'type': 'keyword'}
+                    },
+                    'bad': {
+                        'field_details': {
+                            'name': 'bad',
+                            'level': 'wrong',
+                            'type': 'keyword',
+                            'description': 'Bad.',
+                            'pattern': '^[0-9]+$',
+                            'example': 'abc',
+                        }
+                    },
+                    'good': {
+                        'field_details': {'name': 'good', 'level': 'custom', 'type': 'keyword', 'description': 'Good.'}
+                    },
+                }
+            }
+        }
+
+    def test_cleaner_collects_all_problems(self):
+        report = validation_report.enable()
+        fields = self.schema_with_bad_fields()
+        cleaner.clean(fields, strict=False)
+        self.assertEqual(['cleaner', 'cleaner'], [entry['stage'] for entry in report.errors])
+        self.assertIn('mandatory attributes: description', report.errors[0]['message'])
+        self.assertIn('Invalid level', report.errors[1]['message'])
+        self.assertEqual(1, len(report.warnings))
+        self.assertIn('does not match the regex', report.warnings[0]['message'])
+        # Valid fields are still cleaned
+        self.assertEqual(1024, fields['acme']['fields']['good']['field_details']['ignore_above'])
+
+    def test_strict_warnings_are_errors(self):
+        report = validation_report.enable()
+        cleaner.clean(self.schema_with_bad_fields(), strict=True)
+        self.assertEqual(3, len(report.errors))
+        self.assertEqual([], report.warnings)
+
+    def test_without_report_first_problem_raises(self):
+        with self.assertRaisesRegex(ValueError, 'mandatory attributes'):
+            cleaner.clean(self.schema_with_bad_fields(), strict=True)
+
+    def test_finalizer_skips_invalid_reuse(self):
+        fields = {
+            'base': {
+                'schema_details': {'root': True},
+                'field_details': {'name': 'base', 'type': 'group'},
+                'fields': {},
+            },
+            'user': {
+                'schema_details': {
+                    'root': False,
+                    'reusable': {
+                        'order': 2,
+                        'top_level': True,
+                        'expected': [{'at': 'base', 'as': 'user', 'full': 'base.user'},
+                                     {'at': 'user', 'as': 'target', 'full': 'user.target'}],
+                    },
+                },
+                'field_details': {'name': 'user', 'type': 'group', 'short': 'User.'},
+                'fields': {'name': {'field_details': {'name': 'name', 'type': 'keyword'}}},
+            },
+        }
+        report = validation_report.enable()
+        finalizer.perform_reuse(fields)
+        self.assertEqual(1, len(report.errors))
+        self.assertIn('cannot have other field sets reused inside it', report.errors[0]['message'])
+        self.assertIn('target', fields['user']['fields'])
+
+    def test_finalizer_skips_reuse_into_missing_fieldset(self):
+        fields = {
+            'user': {
+                'schema_details': {
+                    'root': False,
+                    'reusable': {
+                        'order': 2,
+                        'top_level': True,
+                        'expected': [{'at': 'missing', 'as': 'user', 'full': 'missing.user'},
+                                     {'at': 'user', 'as': 'target', 'full': 'user.target'}],
+                    },
+                },
+                'field_details': {'name': 'user', 'type': 'group', 'short': 'User.'},
+                'fields': {'name': {'field_details': {'name': 'name', 'type': 'keyword'}}},
+            },
+        }
+        report = validation_report.enable()
+        finalizer.perform_reuse(fields)
+        self.assertEqual(1, len(report.errors))
+        self.assertIn('Schema user is reused at missing.user, but there is no field set missing',
+                      report.errors[0]['message'])
+        self.assertIn('target', fields['user']['fields'])
+
+    def test_otel_collects_all_invalid_mappings(self):
+        generator = otel.OTelGenerator.__new__(otel.OTelGenerator)
+        generator.semconv_version = 'v1.0.0'
+        generator.attributes = {'host.name': {'stability': 'stable'}}
+        generator.otel_attribute_names = ['host.name']
+        generator.metrics = {}
+        generator.otel_metric_names = []
+        fields = {
+            'host': {
+                'schema_details': {},
+                'field_details': {'name': 'host'},
+                'fields': {
+                    'name': {'field_details': {'flat_name': 'host.name'}},
+                    'id': {'field_details': {'flat_name': 'host.id', 'otel': [{'relation': 'bogus'}, {}]}},
+                    'ip': {'field_details': {'flat_name': 'host.ip', 'otel': [{'relation': 'metric'}]}},
+                },
+            }
+        }
+        report = validation_report.enable()
+        generator.validate_otel_mapping(fields)
+        self.assertEqual(3, len(report.errors))
+        self.assertEqual(['otel'], list(set(entry['stage'] for entry in report.entries)))
+        self.assertIn('exactly the same name', report.warnings[0]['message'])
+
+    def test_write_and_combine(self):
+        first = validation_report.ValidationReport('v8.11.0')
+        first.error('cleaner', 'first problem')
+        second = validation_report.ValidationReport('main')
+        second.warning('otel', 'second problem')
+        combined = validation_report.combine([first, second])
+        tmpdir = tempfile.mkdtemp()
+        try:
+            combined.write(os.path.join(tmpdir, 'report.json'))
+            with open(os.path.join(tmpdir, 'report.json')) as f:
+                written = json.load(f)
+            combined.write(os.path.join(tmpdir, 'report.txt'))
+            with open(os.path.join(tmpdir, 'report.txt')) as f:
+                text = f.read()
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(1, written['errors'])
+        self.assertEqual(1, written['warnings'])
+        self.assertEqual(['v8.11.0', 'main'], [entry['ref'] for entry in written['entries']])
+        self.assertIn('ERROR [cleaner @ v8.11.0]\nfirst problem', text)
+        self.assertTrue(text.endswith('1 error(s), 1 warning(s)\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# Licensed to Elasticsearch B.V. under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Elasticsearch B.V. licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from schema import visitor
+from schema.visitor import FieldCallback
+
+
+class TestSchemaVisitor(unittest.TestCase):
+
+    def fields(self):
+        return {
+            'base': {
+                'schema_details': {'root': True},
+                'field_details': {'name': 'base'},
+                'fields': {'message': {'field_details': {'name': 'message'}}},
+            },
+            'process': {
+                'schema_details': {'root': False},
+                'field_details': {'name': 'process'},
+                'fields': {
+                    'parent': {
+                        'field_details': {'name': 'parent'},
+                        'fields': {'pid': {'field_details': {'name': 'pid'}}},
+                    },
+                    'pid': {'field_details': {'name': 'pid'}},
+                },
+            },
+        }
+
+    def test_visit_all(self):
+        calls = []
+        memo = []
+        visitor.visit_all(self.fields(), [
+            FieldCallback(lambda details: calls.append(('fieldset', details['field_details']['name'])),
+                          fieldsets=True, fields=False),
+            FieldCallback(lambda details, path: calls.append(('.'.join(path), details['field_details']['name'])),
+                          path=True),
+            FieldCallback(lambda details, memo: memo.append(details['field_details']['name']), memo=memo),
+        ])
+        self.assertEqual([
+            ('fieldset', 'base'),
+            ('', 'message'),
+            ('fieldset', 'process'),
+            ('process', 'parent'),
+            ('process.parent', 'pid'),
+            ('process', 'pid'),
+        ], calls)
+        self.assertEqual(['message', 'parent', 'pid', 'pid'], memo)
+
+    def test_visit_fields_with_path(self):
+        paths = []
+        visitor.visit_fields_with_path(self.fields(), lambda details, path: paths.append(list(path)), ['ecs'])
+        self.assertEqual([['ecs'], ['ecs'], ['ecs'], ['ecs', 'process'], ['ecs', 'process', 'parent'],
+                          ['ecs', 'process']], paths)
+
+    def test_visit_fields_without_fieldset_func(self):
+        names = []
+        visitor.visit_fields(self.fields(), field_func=lambda details: names.append(details['field_details']['name']))
+        self.assertEqual(['base', 'message', 'process', 'parent', 'pid', 'pid'], names)
+
+    def test_callbacks_can_add_nested_fields(self):
+        def nest(details):
+            if details['field_details']['name'] == 'pid' and 'fields' not in details:
+                details['fields'] = {'value': {'field_details': {'name': 'value'}}}
+        names = []
+        visitor.visit_all(self.fields(), [
+            FieldCallback(nest),
+            FieldCallback(lambda details, path: names.append('.'.join(path + [details['field_details']['name']])),
+                          path=True),
+        ])
+        self.assertEqual(['message', 'process.parent', 'process.parent.pid', 'process.parent.pid.value',
+                          'process.pid', 'process.pid.value'], names)
+
+    def test_no_recursion_limit(self):
+        fields = leaf = {}
+        depth = sys.getrecursionlimit() * 2
+        for level in range(depth):
+            leaf['level'] = {'field_details': {'name': 'level'}, 'fields': {}}
+            leaf = leaf['level']['fields']
+        count = {'fields': 0}
+
+        def counter(details, memo):
+            memo['fields'] += 1
+        visitor.visit_fields_with_memo(fields, counter, count)
+        self.assertEqual(depth, count['fields'])
+
+
+if __name__ == '__main__':
+    unittest.main()